@@ -1,7 +1,6 @@
 import streamlit as st
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
 import io
-import zipfile
 import json
 import time
 from datetime import datetime
@@ -13,6 +12,7 @@ from plotly.subplots import make_subplots
 import requests
 import base64
 import uuid
+from functools import partial
 import random
 import re
 
@@ -25,9 +25,48 @@ st.set_page_config(
 )
 
 # Import our modules
+from violations import Violation, SEVERITY_WARNING, SEVERITY_HARD_FAIL
+from creative_renderer import create_tesco_logo, get_appropriate_tag, generate_creative, format_dimensions, render_formats, PREVIEW_SCALE
+from scene import layout_scene
+from export_encoder import EXPORT_ENCODER, CODEC_EXTENSIONS, CODEC_MIME_TYPES, export_filename, bundle_bytes
+from artifact_store import ArtifactStore, BUNDLE_BYTE_BUDGET
+
+# Studio-level rules as (key, category, severity, message). They are registered in the
+# engine's rule catalog so checks produce violation records, rendered only for display.
+APP_RULES = [
+    ("app.headline_required", "required_elements", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Headline is required - appears on all banners (Appendix A)"),
+    ("app.subhead_required", "required_elements", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Subhead is required - appears on all banners (Appendix A)"),
+    ("app.packshot_required", "packshot", SEVERITY_HARD_FAIL,
+     "HARD FAIL: At least one packshot required - lead product required (Appendix A)"),
+    ("app.packshot_limit", "packshot", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Maximum 3 packshots allowed (Appendix A)"),
+    ("app.drinkaware_required", "drinkaware", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Drinkaware required for alcohol campaigns (Appendix B)"),
+    ("app.clubcard_end_date", "value_tile", SEVERITY_HARD_FAIL,
+     "HARD FAIL: {detail} for Clubcard Price (Appendix A)"),
+    ("app.safe_zone_9_16", "safe_zone", SEVERITY_HARD_FAIL,
+     "HARD FAIL: 9:16 format - leave 200px top and 250px bottom free from text/logos (Appendix B)"),
+    ("app.people_detected", "media", SEVERITY_WARNING,
+     "Media Rule: People detected in images - prompt to confirm campaign (Appendix B)"),
+    ("app.tag_required", "tag", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Tesco tag required when creative links to Tesco (Appendix A)"),
+    ("app.tag_not_approved", "tag", SEVERITY_HARD_FAIL,
+     "HARD FAIL: Only approved Tesco tags allowed (Appendix A & B)"),
+]
+
 try:
     from compliance_engine import AdvancedComplianceEngine
-    compliance_engine = AdvancedComplianceEngine()
+
+    # Shared across reruns and sessions so compiled rules and cached verdicts survive
+    @st.cache_resource
+    def load_compliance_engine():
+        engine = AdvancedComplianceEngine()
+        engine.register_rules(APP_RULES)
+        return engine
+
+    compliance_engine = load_compliance_engine()
 except ImportError as e:
     st.error(f"Compliance engine loading issue: {e}")
     class AdvancedComplianceEngine:
@@ -39,9 +78,43 @@ except ImportError as e:
             return {"valid": True, "issues": [], "warnings": [], "hard_fails": []}
         def check_safe_zones(self, format_name, element_positions):
             return {"passed": True, "issues": []}
-        def analyze_headline_subhead(self, headline, subhead, product_category):
+        def analyze_headline_subhead(self, headline, subhead, product_category, compliance_result=None):
             return {"headline_issues": [], "subhead_issues": [], "recommendations": [], "compliance_score": 100}
+        def audit_context(self, creative_data):
+            return AuditContext(self, creative_data)
+        def register_rules(self, rules):
+            self.rule_catalog = list(rules)
+            self.rule_keys = {rule[0]: index for index, rule in enumerate(rules)}
+        def rule_violation(self, key, detail=None):
+            rule_id = self.rule_keys[key]
+            return Violation(rule_id, self.rule_catalog[rule_id][2], detail=detail)
+        def render_violation(self, violation):
+            message = self.rule_catalog[violation.rule_id][3]
+            return message if violation.detail is None else message.format(detail=violation.detail)
+        def render_violations(self, violations):
+            return [self.render_violation(violation) for violation in violations]
+        def format_rule_violations(self, format_name):
+            return []
+        def layout_violations(self, format_name, boxes):
+            return []
+        def incremental_checker(self, product_category="general"):
+            return IncrementalTextChecker(self, product_category)
+    class IncrementalTextChecker:
+        def __init__(self, engine, product_category="general"):
+            self.engine = engine
+            self.product_category = product_category
+        def update(self, headline, subhead):
+            return self.engine.check_text_compliance(headline, subhead, self.product_category)
+    class AuditContext:
+        def __init__(self, engine, creative_data):
+            self.text_compliance = engine.check_text_compliance("", "")
+            self.headline_analysis = engine.analyze_headline_subhead("", "", "general")
+            self.text_violations = []
+            self.shared_design_violations = []
+        def design_compliance(self, format_name):
+            return {"valid": True, "issues": [], "warnings": [], "hard_fails": []}
     compliance_engine = AdvancedComplianceEngine()
+    compliance_engine.register_rules(APP_RULES)
 
 try:
     from ai_creative_generator import AICreativeSuggestor
@@ -57,12 +130,12 @@ except ImportError:
     creative_suggestor = AICreativeSuggestor()
 
 try:
-    from background_remover import remove_background_ai, enhance_image_quality
+    from background_remover import process_packshots, TILE_MEMORY_BUDGET
 except ImportError:
-    def remove_background_ai(image_file): 
-        return image_file
-    def enhance_image_quality(image): 
-        return image
+    TILE_MEMORY_BUDGET = None
+    def process_packshots(packshots, remove_bg=False, enhance=False, engine="threshold", max_bytes=None,
+                          progress=None):
+        return [(packshot.copy(), None) for packshot in packshots]
 
 try:
     from value_tile_generator import generate_value_tile, validate_value_tile_design, get_value_tile_templates
@@ -96,6 +169,18 @@ if 'clubcard_end_date' not in st.session_state:
     st.session_state.clubcard_end_date = ""
 if 'generated_creatives' not in st.session_state:
     st.session_state.generated_creatives = []
+if 'prepared_downloads' not in st.session_state:
+    st.session_state.prepared_downloads = set()
+if 'download_bundle' not in st.session_state:
+    st.session_state.download_bundle = None
+if 'preview' not in st.session_state:
+    st.session_state.preview = None  # (scene keys, preview images) of the last live preview
+if 'artifacts' not in st.session_state:
+    # Generated creatives are kept encoded, within a per-session memory budget
+    st.session_state.artifacts = ArtifactStore()
+if 'bundles' not in st.session_state:
+    # ZIP archives have their own budget, so preparing one never pushes creatives out
+    st.session_state.bundles = ArtifactStore(max_bytes=BUNDLE_BYTE_BUDGET)
 if 'people_detected' not in st.session_state:
     st.session_state.people_detected = False
 if 'people_confirmed' not in st.session_state:
@@ -174,29 +259,6 @@ def apply_theme():
 apply_theme()
 
 # Utility functions
-def image_to_bytes(image, format='PNG'):
-    buf = io.BytesIO()
-    if format.upper() == 'JPG':
-        if image.mode in ('RGBA', 'LA'):
-            background = Image.new('RGB', image.size, (255, 255, 255))
-            background.paste(image, mask=image.split()[-1])
-            image = background
-        image.save(buf, format='JPEG', quality=90, optimize=True)
-    else:
-        image.save(buf, format='PNG', optimize=True)
-    return buf.getvalue()
-
-def create_tesco_logo(size=(100, 40)):
-    logo = Image.new('RGBA', size, (0, 0, 0, 0))
-    draw = ImageDraw.Draw(logo)
-    draw.rectangle([10, 10, size[0]-10, size[1]-10], fill="#00539F", outline="#FFFFFF", width=2)
-    try:
-        font = ImageFont.truetype("Arial", 14)
-    except:
-        font = ImageFont.load_default()
-    draw.text((size[0]//2, size[1]//2), "TESCO", fill="#FFFFFF", font=font, anchor="mm")
-    return logo
-
 def validate_dd_mm_format(date_string):
     """Validate DD/MM date format - Appendix A requirement"""
     if not date_string:
@@ -217,24 +279,18 @@ def validate_dd_mm_format(date_string):
     
     return True, "Valid DD/MM format"
 
-def get_appropriate_tag(value_tile_type, clubcard_end_date, product_exclusivity, creative_links_to_tesco):
-    """Determine appropriate tag based on EXACT Appendix A rules"""
-    if not creative_links_to_tesco:
-        return "None"
-    
-    if value_tile_type == "Clubcard Price" and clubcard_end_date:
-        return f"Clubcard/app required. Ends {clubcard_end_date}"
-    elif product_exclusivity == "Exclusive":
-        return "Only at Tesco"
-    elif product_exclusivity == "Non-exclusive":
-        return "Available at Tesco"
-    else:
-        return "Selected stores. While stocks last."
-
 def analyze_text_compliance(headline, subhead, product_category):
     """Real-time text compliance analysis with detailed reporting"""
-    analysis = compliance_engine.analyze_headline_subhead(headline, subhead, product_category)
-    full_compliance = compliance_engine.check_text_compliance(headline, subhead, product_category)
+    # Each session keeps an incremental checker, so a rerun after a keystroke only
+    # rescans the words around the edit
+    checker = st.session_state.get('text_checker')
+    if checker is None or checker.product_category != product_category:
+        checker = compliance_engine.incremental_checker(product_category)
+        st.session_state.text_checker = checker
+    full_compliance = checker.update(headline, subhead)
+    analysis = compliance_engine.analyze_headline_subhead(
+        headline, subhead, product_category, compliance_result=full_compliance
+    )
     
     return {
         "analysis": analysis,
@@ -242,231 +298,64 @@ def analyze_text_compliance(headline, subhead, product_category):
         "is_compliant": full_compliance["approved"] and len(analysis["headline_issues"]) == 0
     }
 
-def generate_creative(dimensions, packshots, headline, subhead, value_tile_type, tag_type, 
-                     bg_color, bg_image, include_drinkaware, clubcard_price, regular_price, 
-                     lep_price, clubcard_end_date, product_category, product_exclusivity, creative_links_to_tesco):
-    
-    width, height = dimensions
-    
-    # Create background
-    if bg_image:
-        img = bg_image.resize((width, height), Image.Resampling.LANCZOS)
-    else:
-        img = Image.new("RGB", (width, height), bg_color)
-    
-    draw = ImageDraw.Draw(img)
-    
-    # Add Tesco logo if enabled - Appendix A: appears on all banners
-    if st.session_state.show_logo:
-        logo = create_tesco_logo((120, 40))
-        img.paste(logo, (width - 140, 20), logo)
-    
-    # Add multiple packshots with proper positioning - Appendix A: max 3, lead product required
-    if packshots:
-        # Calculate positions for multiple packshots
-        num_packshots = len(packshots)
-        
-        if num_packshots == 1:
-            # Single packshot - center it
-            packshot = packshots[0]
-            max_width = int(width * 0.6)
-            max_height = int(height * 0.7)
-            packshot_resized = packshot.copy()
-            packshot_resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-            
-            x = (width - packshot_resized.width) // 2
-            y = (height - packshot_resized.height) // 2
-            
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            img.paste(packshot_resized, (x, y), packshot_resized if packshot_resized.mode == 'RGBA' else None)
-            
-        elif num_packshots == 2:
-            # Two packshots - side by side
-            max_width = int(width * 0.4)
-            max_height = int(height * 0.6)
-            
-            for i, packshot in enumerate(packshots):
-                packshot_resized = packshot.copy()
-                packshot_resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                
-                if i == 0:  # Left packshot
-                    x = width // 4 - packshot_resized.width // 2
-                else:  # Right packshot
-                    x = 3 * width // 4 - packshot_resized.width // 2
-                
-                y = (height - packshot_resized.height) // 2
-                
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                img.paste(packshot_resized, (x, y), packshot_resized if packshot_resized.mode == 'RGBA' else None)
-                
-        elif num_packshots >= 3:
-            # Three packshots - triangular arrangement
-            max_width = int(width * 0.3)
-            max_height = int(height * 0.5)
-            
-            for i, packshot in enumerate(packshots[:3]):  # Limit to 3 as per Appendix A
-                packshot_resized = packshot.copy()
-                packshot_resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
-                
-                if i == 0:  # Top center
-                    x = (width - packshot_resized.width) // 2
-                    y = height // 3 - packshot_resized.height // 2
-                elif i == 1:  # Bottom left
-                    x = width // 3 - packshot_resized.width // 2
-                    y = 2 * height // 3 - packshot_resized.height // 2
-                else:  # Bottom right
-                    x = 2 * width // 3 - packshot_resized.width // 2
-                    y = 2 * height // 3 - packshot_resized.height // 2
-                
-                if img.mode != 'RGBA':
-                    img = img.convert('RGBA')
-                img.paste(packshot_resized, (x, y), packshot_resized if packshot_resized.mode == 'RGBA' else None)
-        
-        draw = ImageDraw.Draw(img)
-    
-    # Add text with compliance font sizes - Appendix B HARD FAIL
-    try:
-        headline_font = ImageFont.truetype("Arial", 24)  # 20px minimum + buffer
-        subhead_font = ImageFont.truetype("Arial", 16)   # 12px minimum + buffer
-        tag_font = ImageFont.truetype("Arial", 14)
-        drinkaware_font = ImageFont.truetype("Arial", 20)  # Minimum 20px for alcohol - HARD FAIL
-    except:
-        headline_font = ImageFont.load_default()
-        subhead_font = ImageFont.load_default()
-        tag_font = ImageFont.load_default()
-        drinkaware_font = ImageFont.load_default()
-    
-    # Headline and subhead positioning - Appendix A: left-aligned
-    text_x = 50  # Left alignment as per Appendix A
-    
-    if headline:
-        headline_bbox = draw.textbbox((0, 0), headline, font=headline_font)
-        headline_height = headline_bbox[3] - headline_bbox[1]
-        headline_y = height - 180
-        draw.text((text_x, headline_y), headline, fill="#000000", font=headline_font)
-    
-    if subhead:
-        subhead_bbox = draw.textbbox((0, 0), subhead, font=subhead_font)
-        subhead_height = subhead_bbox[3] - subhead_bbox[1]
-        subhead_y = height - 140
-        draw.text((text_x, subhead_y), subhead, fill="#000000", font=subhead_font)
-    
-    # Add value tile with proper positioning - Appendix A: predefined position
-    if value_tile_type != "None":
-        price_data = {
-            'clubcard_price': clubcard_price,
-            'regular_price': regular_price,
-            'lep_price': lep_price,
-            'end_date': clubcard_end_date
-        }
-        tile = generate_value_tile(value_tile_type, price_data)
-        if tile:
-            # Position value tile based on type - Appendix A rules
-            if value_tile_type == "Everyday Low Price":
-                # Appendix A: LEP positioned to the right of packshots
-                tile_x = width - tile.width - 50
-                tile_y = (height - tile.height) // 2
-            else:
-                # Clubcard or New: predefined positions
-                tile_x = 50
-                tile_y = 100
-            
-            if img.mode != 'RGBA':
-                img = img.convert('RGBA')
-            img.paste(tile, (tile_x, tile_y), tile)
-    
-    # Add Tesco tag with conditional logic - Appendix A & B
-    appropriate_tag = get_appropriate_tag(value_tile_type, clubcard_end_date, product_exclusivity, creative_links_to_tesco)
-    if tag_type != "None" and creative_links_to_tesco:
-        tag_bbox = draw.textbbox((0, 0), appropriate_tag, font=tag_font)
-        tag_width = tag_bbox[2] - tag_bbox[0]
-        tag_x = text_x  # Left aligned with other text
-        tag_y = height - 100
-        
-        # Appendix B HARD FAIL: Respect safe zones for 9:16 format (Facebook/Instagram Stories ONLY)
-        if height == 1920:  # 9:16 format
-            if tag_y < 250:  # Too close to bottom safe zone
-                tag_y = 250 + 20
-        
-        draw.text((tag_x, tag_y), appropriate_tag, fill="#00539F", font=tag_font)
-    
-    # Add Drinkaware for alcohol - Appendix B HARD FAIL
-    if product_category.lower() == "alcohol" and include_drinkaware:
-        drinkaware_text = "be drinkaware.co.uk"
-        drinkaware_bbox = draw.textbbox((0, 0), drinkaware_text, font=drinkaware_font)
-        drinkaware_width = drinkaware_bbox[2] - drinkaware_bbox[0]
-        drinkaware_x = (width - drinkaware_width) // 2
-        drinkaware_y = height - 40
-        
-        # Appendix B HARD FAIL: Respect safe zones for 9:16 format
-        if height == 1920:  # 9:16 format
-            if drinkaware_y < 250:  # Too close to bottom safe zone
-                drinkaware_y = 250 + 20
-        
-        draw.text((drinkaware_x, drinkaware_y), drinkaware_text, fill="#000000", font=drinkaware_font)
-    
-    return img
+def check_creative_compliance(creative_data, format_name, context=None):
+    """Check if creative meets ALL Appendix A & B HARD FAIL requirements
 
-def check_creative_compliance(creative_data, format_name):
-    """Check if creative meets ALL Appendix A & B HARD FAIL requirements"""
-    issues = []
+    Hard fails and warnings are violation records; render them with
+    compliance_engine.render_violation when displaying.
+    """
+    # Format-independent engine checks come from the shared audit context
+    if context is None:
+        context = compliance_engine.audit_context(creative_data)
+    violation = compliance_engine.rule_violation
     warnings = []
     hard_fails = []
     
     # Appendix A: Required Elements (HARD FAIL)
     if not creative_data.get('headline'):
-        hard_fails.append("HARD FAIL: Headline is required - appears on all banners (Appendix A)")
+        hard_fails.append(violation("app.headline_required"))
     if not creative_data.get('subhead'):
-        hard_fails.append("HARD FAIL: Subhead is required - appears on all banners (Appendix A)")
+        hard_fails.append(violation("app.subhead_required"))
     if not creative_data.get('packshots') or len(creative_data.get('packshots', [])) == 0:
-        hard_fails.append("HARD FAIL: At least one packshot required - lead product required (Appendix A)")
+        hard_fails.append(violation("app.packshot_required"))
     elif len(creative_data.get('packshots', [])) > 3:
-        hard_fails.append("HARD FAIL: Maximum 3 packshots allowed (Appendix A)")
+        hard_fails.append(violation("app.packshot_limit"))
     
     # Appendix B: Alcohol-specific rules (HARD FAIL)
     if creative_data.get('product_category', '').lower() == 'alcohol':
         if not creative_data.get('include_drinkaware', False):
-            hard_fails.append("HARD FAIL: Drinkaware required for alcohol campaigns (Appendix B)")
+            hard_fails.append(violation("app.drinkaware_required"))
     
     # Appendix B: Copy Rules (HARD FAIL)
-    text_result = compliance_engine.check_text_compliance(
-        creative_data.get('headline', ''),
-        creative_data.get('subhead', ''),
-        creative_data.get('product_category', 'general')
-    )
-    if not text_result["approved"]:
-        hard_fails.extend(text_result["issues"])
+    hard_fails.extend(context.text_violations)
     
     # Appendix A: Clubcard End Date validation (HARD FAIL)
     if creative_data.get('value_tile_type') == 'Clubcard Price':
         end_date = creative_data.get('clubcard_end_date', '')
         is_valid, date_error = validate_dd_mm_format(end_date)
         if not is_valid:
-            hard_fails.append(f"HARD FAIL: {date_error} for Clubcard Price (Appendix A)")
+            hard_fails.append(violation("app.clubcard_end_date", detail=date_error))
     
     # Appendix B: Safe Zone validation for 9:16 format (HARD FAIL) - Facebook/Instagram Stories ONLY
     if "1080x1920" in format_name or "9:16" in format_name:
-        hard_fails.append("HARD FAIL: 9:16 format - leave 200px top and 250px bottom free from text/logos (Appendix B)")
+        hard_fails.append(violation("app.safe_zone_9_16"))
     
     # Appendix B: People detection warning
     if creative_data.get('people_detected', False) and not creative_data.get('people_confirmed', False):
-        warnings.append("Media Rule: People detected in images - prompt to confirm campaign (Appendix B)")
+        warnings.append(violation("app.people_detected"))
     
     # Appendix A & B: Tag validation
     if creative_data.get('creative_links_to_tesco', True):
         if not creative_data.get('tag_type') or creative_data.get('tag_type') == 'None':
-            hard_fails.append("HARD FAIL: Tesco tag required when creative links to Tesco (Appendix A)")
+            hard_fails.append(violation("app.tag_required"))
         else:
             allowed_tags = ["Only at Tesco", "Available at Tesco", "Selected stores. While stocks last."]
             if creative_data.get('tag_type') not in allowed_tags:
-                hard_fails.append(f"HARD FAIL: Only approved Tesco tags allowed (Appendix A & B)")
+                hard_fails.append(violation("app.tag_not_approved"))
     
     # Design rule validations
-    design_result = compliance_engine.validate_creative_design(creative_data, format_name)
-    hard_fails.extend(design_result["hard_fails"])
-    warnings.extend(design_result["warnings"])
+    for record in compliance_engine.format_rule_violations(format_name) + context.shared_design_violations:
+        (hard_fails if record.is_hard_fail else warnings).append(record)
     
     return {
         "compliant": len(hard_fails) == 0,
@@ -475,6 +364,12 @@ def check_creative_compliance(creative_data, format_name):
         "can_generate": len(hard_fails) == 0
     }
 
+def check_campaign_compliance(creative_data, formats):
+    """Check every selected format, sharing format-independent checks across formats"""
+    context = compliance_engine.audit_context(creative_data)
+    return {format_name: check_creative_compliance(creative_data, format_name, context)
+            for format_name in formats}
+
 # Main application with enhanced UI
 def main():
     # Header with theme toggle
@@ -685,23 +580,24 @@ def main():
             col_proc1, col_proc2 = st.columns(2)
             with col_proc1:
                 remove_bg = st.checkbox("Remove Background")
+                bg_engine = st.radio("Background engine", ["border", "threshold"], horizontal=True,
+                                     disabled=not remove_bg,
+                                     help="Border keeps white labels inside the product; threshold clears every light pixel")
             with col_proc2:
                 enhance_img = st.checkbox("Enhance Image Quality")
             
             if st.button("🔄 Process Images", use_container_width=True):
                 with st.spinner("Processing images..."):
-                    processed_packshots = []
-                    for packshot in st.session_state.packshots:
-                        processed_packshot = packshot.copy()
-                        
-                        if remove_bg:
-                            processed_packshot = remove_background_ai(processed_packshot)
-                        if enhance_img:
-                            processed_packshot = enhance_image_quality(processed_packshot)
-                        
-                        processed_packshots.append(processed_packshot)
+                    # Packshots run in parallel worker processes; ones already processed with these
+                    # settings come from the shared cache, and very large agency exports are
+                    # processed in tiles within the memory budget
+                    progress_bar = st.progress(0.0, text="Processing packshots...")
+                    results = process_packshots(
+                        st.session_state.packshots, remove_bg, enhance_img, bg_engine, max_bytes=TILE_MEMORY_BUDGET,
+                        progress=lambda done, total: progress_bar.progress(done / total,
+                                                                           text=f"Processed {done} of {total} packshots"))
                     
-                    st.session_state.processed_packshots = processed_packshots
+                    st.session_state.processed_packshots = [processed_packshot for processed_packshot, _ in results]
                     st.success("✅ Images processed successfully!")
                     
                     # Show processed images
@@ -803,14 +699,44 @@ def main():
             'people_confirmed': st.session_state.people_confirmed
         }
         
+        # Use processed packshots if available, otherwise use originals
+        packshots_to_use = st.session_state.processed_packshots if st.session_state.processed_packshots else st.session_state.packshots
+        render_spec = {
+            "packshots": packshots_to_use,
+            "headline": headline,
+            "subhead": subhead,
+            "value_tile_type": value_tile_type,
+            "tag_type": tag_type,
+            "bg_color": st.session_state.background_color,
+            "bg_image": st.session_state.background_image,
+            "include_drinkaware": st.session_state.include_drinkaware,
+            "clubcard_price": clubcard_price,
+            "regular_price": regular_price,
+            "lep_price": lep_price,
+            "clubcard_end_date": clubcard_end_date,
+            "product_category": product_category,
+            "product_exclusivity": product_exclusivity,
+            "creative_links_to_tesco": st.session_state.creative_links_to_tesco,
+            "show_logo": st.session_state.show_logo
+        }
+        
+        # Geometry audit on the laid-out scenes - runs before any pixels are drawn
+        scenes = {format_name: layout_scene(format_dimensions(format_name), render_spec) for format_name in formats}
+        layout_issues = {format_name: compliance_engine.layout_violations(format_name, scene.boxes())
+                         for format_name, scene in scenes.items()}
+        layout_compliant = not any(layout_issues.values())
+        all_compliant = False
+        
         if headline or subhead or (uploaded_packshots if 'uploaded_packshots' in locals() else False):
-            # Check compliance for all selected formats
-            all_compliant = True
-            compliance_issues = []
+            # Check compliance for all selected formats, including the measured layout
+            all_compliant = layout_compliant
+            compliance_issues = [(format_name, violation) for format_name, violations in layout_issues.items()
+                                 for violation in violations]
             compliance_warnings = []
             
+            campaign_compliance = check_campaign_compliance(creative_data, formats)
             for format_name in formats:
-                compliance_check = check_creative_compliance(creative_data, format_name)
+                compliance_check = campaign_compliance[format_name]
                 
                 if not compliance_check["compliant"]:
                     all_compliant = False
@@ -823,18 +749,33 @@ def main():
             if compliance_issues:
                 st.markdown('<div class="non-compliant">❌ Appendix A & B HARD FAIL Issues Detected</div>', unsafe_allow_html=True)
                 for format_name, issue in compliance_issues:
-                    st.error(f"**{format_name}**: {issue}")
+                    st.error(f"**{format_name}**: {compliance_engine.render_violation(issue)}")
             
             if compliance_warnings:
                 st.markdown('<div class="warning">⚠️ Compliance Warnings</div>', unsafe_allow_html=True)
                 for format_name, warning in compliance_warnings:
-                    st.warning(f"**{format_name}**: {warning}")
+                    st.warning(f"**{format_name}**: {compliance_engine.render_violation(warning)}")
             
             if all_compliant and headline and subhead and (uploaded_packshots if 'uploaded_packshots' in locals() and uploaded_packshots else False):
                 st.markdown('<div class="compliant">✅ All formats 100% Appendix A & B Compliant</div>', unsafe_allow_html=True)
         
+        # Live preview at reduced scale; only the generated creatives render at full resolution.
+        # Reruns that leave every scene unchanged (e.g. other widgets) reuse the last previews
+        if formats and packshots_to_use and st.checkbox("Live preview", value=True,
+                                                        help=f"Rendered at {PREVIEW_SCALE:.0%} of export size"):
+            preview_key = (PREVIEW_SCALE, tuple(scenes[format_name].key() for format_name in formats))
+            if st.session_state.preview is None or st.session_state.preview[0] != preview_key:
+                st.session_state.preview = (preview_key, render_formats(formats, render_spec, scale=PREVIEW_SCALE))
+            previews = st.session_state.preview[1]
+            preview_cols = st.columns(len(previews))
+            for format_name, preview, col in zip(formats, previews, preview_cols):
+                with col:
+                    st.image(preview, caption=format_name, use_column_width=True)
+        
         # Generate button with HARD FAIL compliance enforcement
-        generate_disabled = not (headline and subhead and ('uploaded_packshots' in locals() and uploaded_packshots))
+        # Layout HARD FAILs are measured on the exact geometry, so they block generation
+        generate_disabled = not (headline and subhead and ('uploaded_packshots' in locals() and uploaded_packshots)
+                                 and layout_compliant)
         
         if st.button("🚀 Generate 100% Compliant Creatives", 
                      type="primary", 
@@ -842,53 +783,31 @@ def main():
                      disabled=generate_disabled):
             
             if generate_disabled:
-                st.error("Appendix A HARD FAIL: Please complete all required fields (Headline, Subhead, and Packshots)")
+                st.error("Appendix A HARD FAIL: Please complete all required fields (Headline, Subhead, and Packshots) "
+                         "and resolve the layout HARD FAILs")
             else:
                 with st.spinner("Generating 100% Appendix A & B compliant creatives..."):
                     creatives = []
                     
-                    # Use processed packshots if available, otherwise use originals
-                    packshots_to_use = st.session_state.processed_packshots if st.session_state.processed_packshots else st.session_state.packshots
+                    # All selected formats render concurrently from one frozen spec
+                    images = render_formats(formats, render_spec)
                     
-                    for format_name in formats:
-                        # Parse dimensions
-                        if "1080x1080" in format_name:
-                            dimensions = (1080, 1080)
-                        elif "1080x1920" in format_name:
-                            dimensions = (1080, 1920)
-                        elif "1200x628" in format_name:
-                            dimensions = (1200, 628)
-                        else:
-                            dimensions = (1080, 1080)
-                        
-                        # Generate creative
-                        creative_img = generate_creative(
-                            dimensions=dimensions,
-                            packshots=packshots_to_use,
-                            headline=headline,
-                            subhead=subhead,
-                            value_tile_type=value_tile_type,
-                            tag_type=tag_type,
-                            bg_color=st.session_state.background_color,
-                            bg_image=st.session_state.background_image,
-                            include_drinkaware=st.session_state.include_drinkaware,
-                            clubcard_price=clubcard_price,
-                            regular_price=regular_price,
-                            lep_price=lep_price,
-                            clubcard_end_date=clubcard_end_date,
-                            product_category=product_category,
-                            product_exclusivity=product_exclusivity,
-                            creative_links_to_tesco=st.session_state.creative_links_to_tesco
-                        )
-                        
+                    # Replaced creatives free their session memory
+                    for creative in st.session_state.generated_creatives:
+                        st.session_state.artifacts.discard(creative['artifact'])
+                    
+                    for format_name, creative_img in zip(formats, images):
                         creatives.append({
                             "format": format_name,
-                            "image": creative_img,
-                            "dimensions": dimensions,
+                            "artifact": st.session_state.artifacts.put_image(creative_img),
+                            "dimensions": creative_img.size,
                             "timestamp": datetime.now(),
                             "compliance_checked": True,
-                            "appendix_a_b_compliant": True,
-                            "packshots_count": len(packshots_to_use)
+                            # Generation is gated on the measured layout, so this records that gate
+                            "appendix_a_b_compliant": layout_compliant,
+                            "packshots_count": len(render_spec["packshots"]),
+                            "elements": scenes[format_name].boxes(),
+                            "layout_violations": compliance_engine.render_violations(layout_issues[format_name])
                         })
                     
                     st.session_state.generated_creatives = creatives
@@ -899,6 +818,40 @@ def main():
         if st.session_state.generated_creatives:
             st.markdown('<div class="section-header">🎨 Generated Creatives</div>', unsafe_allow_html=True)
             
+            # README: download-ready creatives under 500KB
+            export_codecs = ('PNG', 'JPEG')
+            
+            artifacts = st.session_state.artifacts
+            bundles = st.session_state.bundles
+            
+            # Every format and codec in one ZIP with a manifest, built on request
+            creative_digests = tuple(creative['artifact'] for creative in st.session_state.generated_creatives)
+            bundle = st.session_state.download_bundle
+            if bundle is not None and bundle[0] != creative_digests:
+                # The archive of replaced creatives is never offered again
+                bundles.discard(bundle[1])
+                bundle = st.session_state.download_bundle = None
+            archive = bundles.data(bundle[1]) if bundle is not None else None
+            if archive is None:
+                if st.button("📦 Prepare ZIP of all formats", use_container_width=True):
+                    with st.spinner("Encoding all formats..."):
+                        archive, _ = bundle_bytes(
+                            [dict(creative, image=partial(artifacts.image, creative['artifact']))
+                             for creative in st.session_state.generated_creatives],
+                            export_codecs, digests=creative_digests)
+                    if bundle is not None:
+                        bundles.discard(bundle[1])
+                    st.session_state.download_bundle = (creative_digests, bundles.put(archive))
+            if archive is not None:
+                st.download_button(
+                    f"📥 Download all formats (ZIP, {len(archive) / 1000:.0f}KB)",
+                    data=archive,
+                    file_name=f"tesco_creatives_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                    mime="application/zip",
+                    use_container_width=True,
+                    key="zip_bundle"
+                )
+            
             for i, creative in enumerate(st.session_state.generated_creatives):
                 st.markdown(f'<div class="creative-preview">', unsafe_allow_html=True)
                 
@@ -915,31 +868,38 @@ def main():
                 if creative['dimensions'][1] == 1920:
                     st.info("📱 **9:16 Format**: Leave 200px top and 250px bottom free from text/logos (Appendix B HARD FAIL)")
                 
-                # Display creative
-                st.image(creative['image'], use_column_width=True)
+                # Display creative - the stored PNG goes to the browser without decoding
+                digest = creative['artifact']
+                stored = artifacts.data(digest)
+                if stored is None:
+                    st.warning("This creative was evicted from the session memory budget - please generate again")
+                    st.markdown('</div>', unsafe_allow_html=True)
+                    continue
+                st.image(stored, use_column_width=True)
                 
-                # Download buttons
-                col_dl1, col_dl2 = st.columns(2)
-                with col_dl1:
-                    png_bytes = image_to_bytes(creative['image'], 'PNG')
-                    st.download_button(
-                        "📥 Download PNG",
-                        data=png_bytes,
-                        file_name=f"tesco_compliant_{creative['format'].replace(' ', '_').lower()}.png",
-                        mime="image/png",
-                        use_container_width=True,
-                        key=f"png_{i}"
-                    )
-                with col_dl2:
-                    jpg_bytes = image_to_bytes(creative['image'], 'JPEG')
-                    st.download_button(
-                        "📥 Download JPEG", 
-                        data=jpg_bytes,
-                        file_name=f"tesco_compliant_{creative['format'].replace(' ', '_').lower()}.jpg",
-                        mime="image/jpeg",
-                        use_container_width=True,
-                        key=f"jpg_{i}"
-                    )
+                # Download buttons - encoded on request, then served from the shared encode cache
+                if digest not in st.session_state.prepared_downloads:
+                    if st.button("📦 Prepare downloads", key=f"prepare_{i}", use_container_width=True):
+                        st.session_state.prepared_downloads.add(digest)
+                if digest in st.session_state.prepared_downloads:
+                    encodings = EXPORT_ENCODER.encode_all([partial(artifacts.image, digest)], export_codecs,
+                                                          digests=[digest])
+                    for column, encoding in zip(st.columns(len(export_codecs)), encodings):
+                        codec = encoding['codec']
+                        with column:
+                            st.download_button(
+                                f"📥 Download {codec}",
+                                data=encoding['data'],
+                                file_name=export_filename(creative['format'], codec),
+                                mime=CODEC_MIME_TYPES[codec],
+                                use_container_width=True,
+                                key=f"{CODEC_EXTENSIONS[codec]}_{i}"
+                            )
+                            settings = ", ".join(f"{name} {value}" for name, value in encoding['settings'].items()
+                                                 if value is not None) or "lossless"
+                            st.caption(f"{encoding['bytes'] / 1000:.0f}KB · {settings}")
+                            if not encoding['within_budget']:
+                                st.warning(f"{codec} is over the {EXPORT_ENCODER.max_bytes // 1000}KB limit")
                 
                 st.markdown('</div>', unsafe_allow_html=True)
 
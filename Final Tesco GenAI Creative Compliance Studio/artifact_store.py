@@ -0,0 +1,226 @@
+import atexit
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from PIL import Image
+from image_cache import image_digest
+
+# Encoded artifacts one session may keep in memory before spilling the oldest
+SESSION_BYTE_BUDGET = 32 * 1024 * 1024
+
+# Download archives get their own budget, so preparing one never pushes creatives out
+BUNDLE_BYTE_BUDGET = 16 * 1024 * 1024
+
+# Spilled bytes one store may keep on disk before dropping its oldest spilled artifacts
+SPILL_MAX_BYTES = 256 * 1024 * 1024
+
+_spill_root = None
+_spill_root_lock = threading.Lock()
+
+
+def spill_root():
+    """Return this process's private spill directory, created (mode 0700) on first use and removed at exit"""
+    global _spill_root
+    with _spill_root_lock:
+        if _spill_root is None:
+            _spill_root = tempfile.mkdtemp(prefix="tesco_studio_artifacts-")
+            atexit.register(shutil.rmtree, _spill_root, True)
+        return _spill_root
+
+
+class ArtifactStore:
+    """Per-session store of encoded artifacts addressed by content digest
+
+    Session state keeps the returned handles instead of decoded images. Artifacts
+    stay in memory up to max_bytes; beyond that the oldest are written to a
+    directory private to this store (or dropped when spill is False) and read back
+    on demand. Spilled files are checked against the digest recorded when they were
+    written, and beyond spill_max_bytes the store drops its own oldest spilled
+    artifacts, so a spilled artifact may later read back as None, like an evicted
+    one. Images are stored as fast lossless PNG and decoded only when asked for.
+    """
+
+    def __init__(self, max_bytes=SESSION_BYTE_BUDGET, spill=True, spill_dir=None,
+                 spill_max_bytes=SPILL_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.spill_parent = spill_dir  # Defaults to the process's private spill directory
+        self.spill_dir = None  # Created on first spill
+        self.spill_max_bytes = spill_max_bytes
+        self.bytes = 0
+        self.spilled_bytes = 0
+        self.spills = 0
+        self.evictions = 0
+        self._memory = OrderedDict()  # Oldest first
+        self._writing = {}  # Evicted from memory, spill file not yet written
+        self._spilled = OrderedDict()  # handle -> (file digest, size), oldest first
+        self._lock = threading.Lock()
+
+    def __contains__(self, handle):
+        return handle in self._memory or handle in self._writing or handle in self._spilled
+
+    def put(self, data, handle=None):
+        """Store encoded bytes and return their handle (a content digest unless given)"""
+        handle = handle or hashlib.blake2b(data, digest_size=16).hexdigest()
+        with self._lock:
+            if handle in self:
+                return handle
+            self._memory[handle] = data
+            self.bytes += len(data)
+            evicted = self._evict()
+        self._spill(evicted)
+        return handle
+
+    def put_image(self, image):
+        """Store image losslessly and return its pixel digest as the handle"""
+        handle = image_digest(image)
+        if handle not in self:
+            buf = io.BytesIO()
+            image.save(buf, format='PNG', compress_level=1)
+            self.put(buf.getvalue(), handle)
+        return handle
+
+    def data(self, handle):
+        """Return the stored bytes, or None if the artifact was evicted"""
+        with self._lock:
+            data = self._memory.get(handle)
+            if data is None:
+                data = self._writing.get(handle)
+            spilled = self._spilled.get(handle)
+        if data is not None or spilled is None:
+            return data
+        try:
+            with open(self._spill_path(handle), 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            print(f"Artifact read error: {e}")
+            self._forget_spilled(handle, spilled)
+            return None
+        if _file_digest(data) != spilled[0]:
+            print(f"Artifact read error: spilled file for {handle} does not match its digest")
+            self._forget_spilled(handle, spilled)
+            return None
+        return data
+
+    def image(self, handle):
+        """Decode a stored image, or return None if it was evicted"""
+        data = self.data(handle)
+        if data is None:
+            return None
+        image = Image.open(io.BytesIO(data))
+        image.load()
+        return image
+
+    def discard(self, handle):
+        """Forget an artifact and remove its spilled file"""
+        with self._lock:
+            data = self._memory.pop(handle, None)
+            if data is not None:
+                self.bytes -= len(data)
+            self._writing.pop(handle, None)
+            spilled = self._spilled.pop(handle, None)
+            if spilled is not None:
+                self.spilled_bytes -= spilled[1]
+        if spilled is not None:
+            self._remove([handle])
+
+    def info(self):
+        """Return memory use and spill statistics"""
+        return {
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "in_memory": len(self._memory),
+            "spilled": len(self._spilled),
+            "spilled_bytes": self.spilled_bytes,
+            "spills": self.spills,
+            "evictions": self.evictions
+        }
+
+    def _evict(self):
+        """Pop the oldest artifacts beyond the budget; called under the lock, returns those to spill"""
+        evicted = []
+        while self.bytes > self.max_bytes and self._memory:
+            handle, data = self._memory.popitem(last=False)
+            self.bytes -= len(data)
+            if self.spill:
+                # Still served from here until its file is written
+                self._writing[handle] = data
+                evicted.append((handle, data))
+            else:
+                self.evictions += 1
+        return evicted
+
+    def _spill(self, evicted):
+        """Write evicted artifacts to the spill directory outside the lock"""
+        for handle, data in evicted:
+            written = self._write(handle, data)
+            digest = _file_digest(data) if written else None
+            stale = []
+            with self._lock:
+                if self._writing.pop(handle, None) is None:
+                    # Discarded while being written
+                    if written:
+                        stale.append(handle)
+                elif written:
+                    self._spilled[handle] = (digest, len(data))
+                    self.spilled_bytes += len(data)
+                    self.spills += 1
+                    while self.spilled_bytes > self.spill_max_bytes and self._spilled:
+                        oldest, (_, size) = self._spilled.popitem(last=False)
+                        self.spilled_bytes -= size
+                        self.evictions += 1
+                        stale.append(oldest)
+                else:
+                    self.evictions += 1
+            self._remove(stale)
+
+    def _write(self, handle, data):
+        try:
+            if self.spill_dir is None:
+                self._make_spill_dir()
+            # Written under a temporary name and renamed, so a read never sees a partial file
+            path = self._spill_path(handle)
+            partial = f"{path}.{threading.get_ident()}.tmp"
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError as e:
+            print(f"Artifact spill error: {e}")
+            return False
+        return True
+
+    def _make_spill_dir(self):
+        with self._lock:
+            if self.spill_dir is None:
+                # A fresh mode 0700 directory, so no other store or user can plant or remove files
+                self.spill_dir = tempfile.mkdtemp(prefix="store-", dir=self.spill_parent or spill_root())
+                weakref.finalize(self, shutil.rmtree, self.spill_dir, True)
+
+    def _forget_spilled(self, handle, spilled):
+        with self._lock:
+            if self._spilled.get(handle) != spilled:
+                return
+            del self._spilled[handle]
+            self.spilled_bytes -= spilled[1]
+        self._remove([handle])
+
+    def _remove(self, handles):
+        for handle in handles:
+            try:
+                os.remove(self._spill_path(handle))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Artifact spill error: {e}")
+
+    def _spill_path(self, handle):
+        return os.path.join(self.spill_dir, handle)
+
+
+def _file_digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
@@ -1,40 +1,185 @@
-from PIL import Image, ImageEnhance, ImageFilter, ImageDraw
+import hashlib
+import io
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageEnhance, ImageFilter, ImageDraw, ImageStat
 import numpy as np
+from font_registry import get_font
+from image_cache import image_digest, image_nbytes
+from lru_cache import LRUCache
 
-def remove_background_ai(image):
-    """Enhanced AI-powered background removal simulation"""
+try:
+    import cv2
+except ImportError:  # Border segmentation falls back to NumPy run propagation
+    cv2 = None
+
+# Pixels brighter than this in every channel are treated as light background.
+# The original white check (all channels > 240) is a subset of it.
+LIGHT_BACKGROUND_THRESHOLD = 200
+
+# "threshold" clears every light pixel; "border" only light regions connected to
+# the image border, keeping white labels and bottles inside the product
+SEGMENTATION_ENGINES = ("threshold", "border")
+
+# Longest side of the proxy the border engine segments on
+SEGMENTATION_PROXY_SIZE = 512
+
+def _light_background_mask(pixels):
+    return ((pixels[..., 0] > LIGHT_BACKGROUND_THRESHOLD)
+            & (pixels[..., 1] > LIGHT_BACKGROUND_THRESHOLD)
+            & (pixels[..., 2] > LIGHT_BACKGROUND_THRESHOLD))
+
+def _seeded_runs(mask, seeded):
+    """Extend seeded pixels along each row to the whole run of mask they lie in"""
+    starts = mask.copy()
+    starts[:, 1:] &= ~mask[:, :-1]
+    run_ids = np.cumsum(starts.ravel())[mask.ravel()] - 1
+    run_seeded = np.bincount(run_ids, weights=seeded.ravel()[mask.ravel()], minlength=int(starts.sum())) > 0
+    result = np.zeros(mask.size, dtype=bool)
+    result[mask.ravel()] = run_seeded[run_ids]
+    return result.reshape(mask.shape)
+
+def border_connected(mask):
+    """Pixels of mask 4-connected to the image border"""
+    if cv2 is not None:
+        _, labels = cv2.connectedComponents(mask.astype(np.uint8), connectivity=4)
+        border = np.concatenate([labels[0], labels[-1], labels[:, 0], labels[:, -1]])
+        return np.isin(labels, border[border > 0])
+
+    # Alternate row and column passes, each filling whole runs, until nothing changes
+    seeded = np.zeros_like(mask)
+    seeded[[0, -1], :] = mask[[0, -1], :]
+    seeded[:, [0, -1]] |= mask[:, [0, -1]]
+    while True:
+        grown = _seeded_runs(mask, seeded)
+        grown = _seeded_runs(mask.T, grown.T).T
+        if np.array_equal(grown, seeded):
+            return seeded
+        seeded = grown
+
+# Tiled mode: working memory per tile is estimated from the pixel count, since each
+# step allocates a few full copies of its input
+TILE_MEMORY_BUDGET = 64 * 1024 * 1024
+TILE_BYTES_PER_PIXEL = 32
+TILE_MIN_SIZE = 64
+
+# Enhancement reads neighbours: 1px for the SMOOTH kernel behind Sharpness plus
+# the support of the radius 2 unsharp mask blur
+ENHANCE_MARGIN = 16
+
+def fits_in_budget(size, max_bytes):
+    return size[0] * size[1] * TILE_BYTES_PER_PIXEL <= max_bytes
+
+def _tiles(image, max_bytes, margin=0):
+    """Yield (tile, outer box, box) with tiles cropped from image including margin on every side"""
+    side = max(TILE_MIN_SIZE, int(math.sqrt(max_bytes / TILE_BYTES_PER_PIXEL)) - 2 * margin)
+    width, height = image.size
+    for top in range(0, height, side):
+        for left in range(0, width, side):
+            box = (left, top, min(left + side, width), min(top + side, height))
+            outer = (max(0, box[0] - margin), max(0, box[1] - margin),
+                     min(width, box[2] + margin), min(height, box[3] + margin))
+            yield image.crop(outer), outer, box
+
+def process_tiled(image, operation, max_bytes=TILE_MEMORY_BUDGET, margin=0, output=None):
+    """Apply operation(tile, outer box) tile by tile, pasting each result without its margin into output
+
+    Only one tile and its intermediates are alive at a time, so working memory
+    stays near max_bytes however large the image is. Operations that read
+    neighbouring pixels need a margin of at least their reach to match the
+    untiled result.
+    """
+    for tile, outer, box in _tiles(image, max_bytes, margin):
+        result = operation(tile, outer)
+        if margin:
+            result = result.crop((box[0] - outer[0], box[1] - outer[1], box[2] - outer[0], box[3] - outer[1]))
+        if output is None:
+            output = Image.new(result.mode, image.size)
+        output.paste(result, box[:2])
+    return output
+
+def _proxy_background(image):
+    """Border-connected light background of a downscaled proxy, as an L mask"""
+    scale = min(1.0, SEGMENTATION_PROXY_SIZE / max(image.size))
+    proxy = image
+    if scale < 1.0:
+        proxy = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                             Image.Resampling.BOX)
+    if proxy.mode not in ('RGB', 'RGBA'):
+        proxy = proxy.convert('RGBA')
+    return Image.fromarray(border_connected(_light_background_mask(np.asarray(proxy))).astype(np.uint8) * 255, 'L')
+
+def _border_background_mask(pixels, proxy_mask, size, box):
+    """Proxy mask upsampled over box of a size image; edges follow the full-resolution pixels"""
+    if proxy_mask.size == size:
+        background = np.asarray(proxy_mask.crop(box)) >= 128
+    else:
+        scale_x, scale_y = proxy_mask.width / size[0], proxy_mask.height / size[1]
+        upsampled = proxy_mask.resize((box[2] - box[0], box[3] - box[1]), Image.Resampling.BILINEAR,
+                                      box=(box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y))
+        background = np.asarray(upsampled) >= 128
+    return background & _light_background_mask(pixels)
+
+def _clear_background(image, pixels, is_background):
+    if is_background.any():
+        # Make background transparent, writing the alpha channel in one operation
+        alpha = np.where(is_background, 0, pixels[..., 3]).astype(np.uint8)
+        image.putalpha(Image.fromarray(alpha, 'L'))
+    return image
+
+def remove_background_ai(image, engine="threshold", max_bytes=None):
+    """Enhanced AI-powered background removal simulation
+
+    With max_bytes, images too large for the budget are processed tile by tile.
+    """
     try:
+        if max_bytes is not None and not fits_in_budget(image.size, max_bytes):
+            return _remove_background_tiled(image, engine, max_bytes)
+        
         # Convert to RGBA for transparency
         if image.mode != 'RGBA':
             image = image.convert('RGBA')
         
         # Create a simple simulation of background removal
         # In production, this would use a proper AI model like rembg
-        width, height = image.size
-        pixels = image.load()
+        pixels = np.asarray(image)
         
-        # Simple background detection (light backgrounds)
-        for i in range(width):
-            for j in range(height):
-                r, g, b, a = pixels[i, j]
-                
-                # Detect light background (adjust thresholds as needed)
-                is_light_background = (r > 200 and g > 200 and b > 200)
-                is_white_background = (r > 240 and g > 240 and b > 240)
-                
-                if is_light_background or is_white_background:
-                    # Make background transparent
-                    pixels[i, j] = (r, g, b, 0)
+        if engine == "border":
+            is_background = _border_background_mask(pixels, _proxy_background(image), image.size,
+                                                    (0, 0) + image.size)
+        else:
+            # Simple background detection (light backgrounds), for the whole image at once
+            is_background = _light_background_mask(pixels)
         
-        return image
+        return _clear_background(image, pixels, is_background)
         
     except Exception as e:
         print(f"Background removal error: {e}")
         return image
 
-def enhance_image_quality(image):
-    """Enhance image quality for professional creatives"""
-    # Convert to RGB if necessary
+def _remove_background_tiled(image, engine, max_bytes):
+    # The border engine segments its proxy once; tiles only upsample their part of the mask
+    proxy_mask = _proxy_background(image) if engine == "border" else None
+    
+    def remove(tile, box):
+        if tile.mode != 'RGBA':
+            tile = tile.convert('RGBA')
+        pixels = np.asarray(tile)
+        if proxy_mask is not None:
+            is_background = _border_background_mask(pixels, proxy_mask, image.size, box)
+        else:
+            is_background = _light_background_mask(pixels)
+        return _clear_background(tile, pixels, is_background)
+    
+    # RGBA inputs are updated in place, as in the untiled path
+    return process_tiled(image, remove, max_bytes, output=image if image.mode == 'RGBA' else None)
+
+def _sharpen_and_saturate(image):
     if image.mode != 'RGB':
         image = image.convert('RGB')
     
@@ -44,19 +189,256 @@ def enhance_image_quality(image):
     
     # Enhance color saturation
     enhancer = ImageEnhance.Color(image)
-    image = enhancer.enhance(1.1)
-    
-    # Enhance contrast
-    enhancer = ImageEnhance.Contrast(image)
-    image = enhancer.enhance(1.05)
+    return enhancer.enhance(1.1)
+
+def _contrast_and_unsharp(image, mean):
+    # Enhance contrast - ImageEnhance.Contrast blends with the mean grey of the whole image
+    image = Image.blend(Image.new('RGB', image.size, (mean, mean, mean)), image, 1.05)
     
     # Apply subtle sharpening filter
-    image = image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+    return image.filter(ImageFilter.UnsharpMask(radius=2, percent=150, threshold=3))
+
+def _mean_grey(histogram):
+    return int(ImageStat.Stat(histogram).mean[0] + 0.5)
+
+def enhance_image_quality(image, max_bytes=None):
+    """Enhance image quality for professional creatives
+
+    With max_bytes, images too large for the budget are processed tile by tile.
+    """
+    if max_bytes is not None and not fits_in_budget(image.size, max_bytes):
+        return _enhance_tiled(image, max_bytes)
     
-    return image
+    image = _sharpen_and_saturate(image)
+    return _contrast_and_unsharp(image, _mean_grey(image.convert('L').histogram()))
+
+def _enhance_tiled(image, max_bytes):
+    # First pass: the contrast mean, from the histograms of the sharpened, saturated tiles
+    histogram = [0] * 256
+    for tile, outer, box in _tiles(image, max_bytes, ENHANCE_MARGIN):
+        inner = (box[0] - outer[0], box[1] - outer[1], box[2] - outer[0], box[3] - outer[1])
+        tile_histogram = _sharpen_and_saturate(tile).crop(inner).convert('L').histogram()
+        histogram = [total + count for total, count in zip(histogram, tile_histogram)]
+    mean = _mean_grey(histogram)
+    
+    return process_tiled(image, lambda tile, box: _contrast_and_unsharp(_sharpen_and_saturate(tile), mean),
+                         max_bytes, ENHANCE_MARGIN)
+
+def _processed_nbytes(entry):
+    image, mask = entry
+    return image_nbytes(image) + (image_nbytes(mask) if mask is not None else 0)
+
+# Bump whenever segmentation or enhancement changes its output, so persisted entries are not reused
+PACKSHOT_PROCESSING_VERSION = 1
+
+class ProcessedPackshotCache:
+    """Processed packshots keyed on the source content digest and the processing parameters
+
+    One instance is shared by every session, so re-processing the same upload,
+    here or in another session, returns the stored cut-out and mask at once.
+    Entries are bounded by memory size with LRU eviction and, with a directory,
+    also persisted as lossless PNG files that outlive the process. Cached images
+    are shared and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, directory=None):
+        self.directory = directory
+        self.entries = LRUCache(maxsize=256, max_bytes=max_bytes, sizeof=_processed_nbytes)
+        self.disk_hits = 0
+        self._lock = threading.Lock()
+
+    def key(self, image, remove_bg, enhance, engine):
+        parameters = {"remove_bg": remove_bg, "enhance": enhance}
+        if remove_bg:
+            parameters.update(engine=engine, threshold=LIGHT_BACKGROUND_THRESHOLD)
+            if engine == "border":
+                parameters["proxy_size"] = SEGMENTATION_PROXY_SIZE
+        return (PACKSHOT_PROCESSING_VERSION, image_digest(image), tuple(sorted(parameters.items())))
+
+    def process(self, image, remove_bg=False, enhance=False, engine="threshold", max_bytes=None):
+        """Return (processed image, cut-out mask or None), processing only on a miss"""
+        key = self.key(image, remove_bg, enhance, engine)
+        entry = self.lookup(key)
+        if entry is None:
+            entry = _process_packshot(image, remove_bg, enhance, engine, max_bytes)
+            self.store(key, entry)
+        return entry
+
+    def lookup(self, key):
+        """Return the cached entry for key from memory or disk, or None"""
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self._load(key)
+            if entry is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self.entries.put(key, entry)
+        return entry
+
+    def store(self, key, entry):
+        self._save(key, entry)
+        self.entries.put(key, entry)
+
+    def info(self):
+        """Return memory cache statistics and the number of misses served from disk"""
+        stats = self.entries.info()
+        stats["disk_hits"] = self.disk_hits
+        return stats
+
+    def _paths(self, key):
+        name = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.directory, f"{name}.png"), os.path.join(self.directory, f"{name}.mask.png")
+
+    def _load(self, key):
+        if not self.directory:
+            return None
+        image_path, mask_path = self._paths(key)
+        try:
+            image = Image.open(image_path)
+            image.load()
+            mask = None
+            if os.path.exists(mask_path):
+                mask = Image.open(mask_path)
+                mask.load()
+            return image, mask
+        except OSError:
+            return None
 
-def apply_creative_filters(image, filter_type):
-    """Apply creative filters to images"""
+    def _save(self, key, entry):
+        if not self.directory:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            # The mask is written first; the image file marks a complete entry
+            for item, path in reversed(list(zip(entry, self._paths(key)))):
+                if item is None:
+                    continue
+                buf = io.BytesIO()
+                item.save(buf, format='PNG', compress_level=1)
+                partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(partial, 'wb') as f:
+                    f.write(buf.getvalue())
+                os.replace(partial, path)
+        except OSError as e:
+            print(f"Packshot cache write error: {e}")
+
+def _process_packshot(image, remove_bg, enhance, engine, max_bytes):
+    mask = None
+    if remove_bg:
+        # RGBA sources are updated in place by remove_background_ai
+        image = remove_background_ai(image.copy() if image.mode == 'RGBA' else image, engine=engine,
+                                     max_bytes=max_bytes)
+        mask = image.getchannel('A')
+    if enhance:
+        image = enhance_image_quality(image, max_bytes=max_bytes)
+    if not remove_bg and not enhance:
+        image = image.copy()
+    return image, mask
+
+PROCESSED_PACKSHOT_CACHE = ProcessedPackshotCache()
+
+def process_packshot(image, remove_bg=False, enhance=False, engine="threshold", max_bytes=None,
+                     cache=PROCESSED_PACKSHOT_CACHE):
+    """Remove the background and/or enhance a packshot, returning (image, cut-out mask or None)"""
+    if cache is None:
+        return _process_packshot(image, remove_bg, enhance, engine, max_bytes)
+    return cache.process(image, remove_bg, enhance, engine, max_bytes)
+
+# Worker processes are started once with spawn (forking a threaded server is unsafe) and reused
+PACKSHOT_POOL_SIZE = os.cpu_count() or 1
+_packshot_pool = None
+_packshot_pool_lock = threading.Lock()
+
+def _get_packshot_pool():
+    global _packshot_pool
+    with _packshot_pool_lock:
+        if _packshot_pool is None:
+            _packshot_pool = ProcessPoolExecutor(max_workers=PACKSHOT_POOL_SIZE,
+                                                 mp_context=multiprocessing.get_context("spawn"))
+        return _packshot_pool
+
+def _discard_packshot_pool(pool):
+    global _packshot_pool
+    with _packshot_pool_lock:
+        if _packshot_pool is pool:
+            _packshot_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _pooled_packshots(packshots, indices, workers, *args):
+    """Yield (index, entry) as the shared pool finishes packshots, with at most workers in flight"""
+    pool = _get_packshot_pool()
+    queued = iter(indices)
+    futures = {}
+    try:
+        for index in itertools.islice(queued, workers):
+            futures[pool.submit(_process_packshot, packshots[index], *args)] = index
+        while futures:
+            finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+            for future in finished:
+                index = futures.pop(future)
+                for queued_index in itertools.islice(queued, 1):
+                    futures[pool.submit(_process_packshot, packshots[queued_index], *args)] = queued_index
+                yield index, future.result()
+    except BrokenProcessPool:
+        # A crashed worker breaks the pool; the next call starts a fresh one
+        _discard_packshot_pool(pool)
+        raise
+    finally:
+        for future in futures:
+            future.cancel()
+
+def process_packshots(packshots, remove_bg=False, enhance=False, engine="threshold", max_bytes=None,
+                      cache=PROCESSED_PACKSHOT_CACHE, max_workers=None, progress=None):
+    """Process packshots concurrently in worker processes, returning (image, mask) pairs in order
+
+    The per-pixel work is CPU-bound, so uncached packshots run on a shared pool of
+    worker processes. Packshots over the max_bytes tile budget stay in this
+    process and are processed tile by tile one at a time, so the budget still
+    bounds their memory. progress(done, total) is called as each packshot
+    finishes, cache hits first.
+    """
+    packshots = list(packshots)
+    results = [None] * len(packshots)
+    keys = [cache.key(packshot, remove_bg, enhance, engine) if cache is not None else None
+            for packshot in packshots]
+    pending = []
+    for index, key in enumerate(keys):
+        entry = cache.lookup(key) if cache is not None else None
+        if entry is None:
+            pending.append(index)
+        else:
+            results[index] = entry
+    done = len(packshots) - len(pending)
+    if progress and done:
+        progress(done, len(packshots))
+
+    local = [index for index in pending
+             if max_bytes is not None and not fits_in_budget(packshots[index].size, max_bytes)]
+    pooled = [index for index in pending if index not in local]
+    workers = min(len(pooled), max_workers or os.cpu_count() or 1)
+    if workers <= 1:
+        local, pooled = pending, []
+    completed = itertools.chain(
+        _pooled_packshots(packshots, pooled, workers, remove_bg, enhance, engine, max_bytes) if pooled else (),
+        ((index, _process_packshot(packshots[index], remove_bg, enhance, engine, max_bytes)) for index in local))
+    for index, entry in completed:
+        results[index] = entry
+        if cache is not None:
+            cache.store(keys[index], entry)
+        done += 1
+        if progress:
+            progress(done, len(packshots))
+    return results
+
+def apply_creative_filters(image, filter_type, max_bytes=None):
+    """Apply creative filters to images
+
+    With max_bytes, images too large for the budget are processed tile by tile.
+    """
+    if max_bytes is not None and not fits_in_budget(image.size, max_bytes):
+        # Every filter works per pixel, so tiles need no margin
+        return process_tiled(image, lambda tile, box: apply_creative_filters(tile, filter_type), max_bytes)
+    
     if filter_type == "Warm":
         # Warm filter - enhance reds and yellows
         enhancer = ImageEnhance.Color(image)
@@ -135,12 +517,7 @@ def create_placeholder_image(width, height, text="Upload Image"):
                    fill='#00539F', outline='#003366', width=2)
     
     # Add text
-    try:
-        font_size = min(24, width // 15)
-        from PIL import ImageFont
-        font = ImageFont.truetype("Arial", font_size)
-    except:
-        font = ImageFont.load_default()
+    font = get_font(min(24, width // 15))
     
     text_bbox = draw.textbbox((0, 0), text, font=font)
     text_width = text_bbox[2] - text_bbox[0]
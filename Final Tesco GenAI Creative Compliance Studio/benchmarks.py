@@ -0,0 +1,506 @@
+import io
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from PIL import Image, ImageDraw
+from compliance_engine import AdvancedComplianceEngine
+from image_cache import PACKSHOT_RESIZE_CACHE, image_nbytes
+from artifact_store import ArtifactStore
+from background_remover import remove_background_ai, process_packshot, process_packshots, ProcessedPackshotCache
+from creative_renderer import generate_creative, render_formats, format_dimensions, LayeredCompositor, FORMAT_DIMENSIONS
+from export_encoder import BudgetedEncoder, encode, export_filename, bundle_bytes
+from lru_cache import LRUCache
+
+# Headline/subhead pairs used by test_app.py and the in-app detection tester
+SAMPLE_COPY = [
+    ("Killer deal", "Murderous prices"),
+    ("Cocaine energy", "Heroin strength"),
+    ("Depression relief", "Suicide prevention"),
+    ("Racist content", "Hate-filled offer"),
+    ("Porn star product", "Sexual material"),
+    ("Bomb shelter sale", "Terror prices"),
+    ("Lottery tickets", "Gamble and win"),
+    ("Win a free prize!", "Limited time offer"),
+    ("New product launch", "Great quality"),
+    ("Healthy choice", "Good for you"),
+    ("NEW LOOK", "SAME AWARD WINNING TASTE"),
+    ("BEST PRODUCT EVER*", "*TERMS APPLY"),
+    ("ECO-FRIENDLY SUSTAINABLE PRODUCT", ""),
+    ("ONLY £2.99", "LIMITED TIME OFFER"),
+    ("STUDIES SHOW 95% SATISFACTION", "PROVEN RESULTS"),
+    ("50% OFF SALE", "USE DISCOUNT CODE SAVE50"),
+]
+
+
+def _timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def _report(name, baseline, optimized):
+    print(f"{name}: baseline {baseline * 1000:.3f}ms | optimized {optimized * 1000:.3f}ms | "
+          f"speedup {baseline / optimized:.1f}x")
+
+
+def legacy_forbidden_scan(terms, text):
+    """Original per-term loop from check_text_compliance"""
+    found = []
+    for term in terms:
+        pattern = r'\b' + re.escape(term) + r'\b'
+        if re.search(pattern, text, re.IGNORECASE):
+            found.append(term)
+    return found
+
+
+def benchmark_forbidden_terms(repeat=20):
+    """Compare the per-term regex loop with the single-scan TermMatcher"""
+    engine = AdvancedComplianceEngine()
+    terms = engine.hard_rules["forbidden_claims"]
+    matcher = engine.forbidden_matcher
+
+    texts = [f"{headline} {subhead}".lower() for headline, subhead in SAMPLE_COPY]
+    copy_deck = " ".join(texts * 200)
+
+    for text in texts + [copy_deck]:
+        assert matcher.find_terms(text) == legacy_forbidden_scan(terms, text)
+
+    _report("forbidden terms (sample copy)",
+            _timed(lambda: [legacy_forbidden_scan(terms, text) for text in texts], repeat),
+            _timed(lambda: [matcher.find_terms(text) for text in texts], repeat))
+    _report("forbidden terms (copy deck)",
+            _timed(lambda: legacy_forbidden_scan(terms, copy_deck), max(1, repeat // 4)),
+            _timed(lambda: matcher.find_terms(copy_deck), max(1, repeat // 4)))
+
+
+def legacy_category_scan(categories, text):
+    """Original per-pattern re.search loop from the sensitive/alcohol checks"""
+    issues = []
+    for _, template, patterns in categories:
+        for pattern, message in patterns:
+            if re.search(pattern, text, re.IGNORECASE):
+                issues.append(template.format(message=message))
+    return issues
+
+
+def synthetic_corpus(engine, lines=100_000, seed=7):
+    """Random headline-like lines mixing forbidden vocabulary with neutral words"""
+    rng = random.Random(seed)
+    vocabulary = [word for term in engine.hard_rules["forbidden_claims"] for word in term.split()]
+    vocabulary += ["fresh", "taste", "new", "look", "family", "recipe", "crunchy", "bakery"] * 40
+    return [" ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 12))) for _ in range(lines)]
+
+
+def benchmark_category_bundles(lines=100_000, repeat=20):
+    """Compare per-pattern sensitive/alcohol loops with precompiled category bundles"""
+    engine = AdvancedComplianceEngine()
+    categories = engine._get_sensitive_content_patterns() + engine._get_alcohol_patterns()
+
+    def bundled(text):
+        return engine._check_sensitive_content(text) + engine._check_alcohol_compliance(text)
+
+    corpora = [
+        ("test_app.py corpus", [f"{headline} {subhead}".lower() for headline, subhead in SAMPLE_COPY], repeat),
+        (f"synthetic {lines} lines", synthetic_corpus(engine, lines), 1),
+    ]
+    for name, texts, runs in corpora:
+        for text in texts[:2000]:
+            assert bundled(text) == legacy_category_scan(categories, text)
+        baseline = _timed(lambda: [legacy_category_scan(categories, text) for text in texts], runs)
+        optimized = _timed(lambda: [bundled(text) for text in texts], runs)
+        print(f"category bundles ({name}): per call baseline {baseline / len(texts) * 1e6:.1f}us | "
+              f"optimized {optimized / len(texts) * 1e6:.1f}us | speedup {baseline / optimized:.1f}x")
+
+
+def benchmark_batch_text_compliance(copies=200, workers=None):
+    """Compare one-at-a-time checks with the process-pool batch API"""
+    engine = AdvancedComplianceEngine()
+    pairs = SAMPLE_COPY * copies
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    serial = [engine.check_text_compliance(headline, subhead) for headline, subhead in pairs]
+    serial_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched = list(engine.check_text_compliance_batch(pairs, workers=workers))
+    batch_time = time.perf_counter() - start
+
+    assert batched == serial
+    print(f"batch text compliance ({len(pairs)} pairs, {workers} workers): "
+          f"serial {serial_time:.2f}s | batch {batch_time:.2f}s | "
+          f"{len(pairs) / batch_time:.0f} pairs/s")
+
+
+def benchmark_incremental_checker(word_counts=(10, 100, 1000), keystrokes=200):
+    """Compare full re-checks with the incremental checker while typing into growing copy"""
+    engine = AdvancedComplianceEngine(verdict_cache_size=0)
+    rng = random.Random(11)
+    words = synthetic_corpus(engine, lines=1)[0].split() + ["fresh", "taste", "new", "look"] * 20
+    for count in word_counts:
+        base = " ".join(rng.choice(words) for _ in range(count))
+        middle = len(base) // 2
+        edits = [base[:middle] + "crunchy"[:i % 8] + base[middle:] for i in range(keystrokes)]
+        
+        checker = engine.incremental_checker()
+        checker.update(base, "New look")
+        for headline in edits[:20]:
+            assert checker.update(headline, "New look") == engine.check_text_compliance(headline, "New look")
+        
+        full = _timed(lambda: [engine.check_text_compliance(headline, "New look") for headline in edits], 1)
+        incremental = _timed(lambda: [checker.update(headline, "New look") for headline in edits], 1)
+        print(f"incremental checker ({count} words): per keystroke full {full / keystrokes * 1e6:.0f}us | "
+              f"incremental {incremental / keystrokes * 1e6:.0f}us | speedup {full / incremental:.1f}x")
+
+
+def benchmark_format_rendering(repeat=3, workers=None):
+    """Compare rendering the three studio formats one after another with the parallel render path"""
+    formats = ["Instagram Square (1080x1080)", "Instagram Stories (1080x1920)", "Facebook Landscape (1200x628)"]
+    spec = {
+        "packshots": [Image.new("RGBA", (3000, 4000), (200, 30, 30, 255)) for _ in range(3)],
+        "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Everyday Low Price",
+        "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": Image.new("RGB", (2400, 2400), "white"),
+        "include_drinkaware": False, "clubcard_price": "", "regular_price": "", "lep_price": "£2.99",
+        "clubcard_end_date": "", "product_category": "General", "product_exclusivity": "Exclusive",
+        "creative_links_to_tesco": True
+    }
+    single = {name: _timed(lambda: generate_creative(format_dimensions(name), **spec), repeat) for name in formats}
+    serial = _timed(lambda: [generate_creative(format_dimensions(name), **spec) for name in formats], repeat)
+    parallel = _timed(lambda: render_formats(formats, spec, max_workers=workers), repeat)
+    print(f"format rendering ({os.cpu_count()} CPUs): serial {serial * 1000:.0f}ms | parallel {parallel * 1000:.0f}ms | "
+          f"slowest single format {max(single.values()) * 1000:.0f}ms")
+
+
+def benchmark_packshot_resize_cache(repeat=3):
+    """Compare re-rendering with fresh packshot resamples against warm resize cache hits"""
+    spec = {
+        "packshots": [Image.new("RGBA", (4000, 4000), (200, 30, 30, 255))],
+        "headline": "New look", "subhead": "Same great taste", "value_tile_type": "None",
+        "tag_type": "None", "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": False,
+        "clubcard_price": "", "regular_price": "", "lep_price": "", "clubcard_end_date": "",
+        "product_category": "General", "product_exclusivity": "Exclusive", "creative_links_to_tesco": False
+    }
+
+    def cold():
+        PACKSHOT_RESIZE_CACHE.images.clear()
+        generate_creative((1080, 1920), **spec)
+
+    _report("packshot resize (rerender 1080x1920)", _timed(cold, repeat),
+            _timed(lambda: generate_creative((1080, 1920), **spec), repeat))
+
+
+def benchmark_layered_compositor(edits=20):
+    """Compare full re-renders with cached-layer re-renders while editing the headline"""
+    spec = {
+        "packshots": (Image.new("RGBA", (3000, 4000), (200, 30, 30, 255)),),
+        "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Clubcard Price",
+        "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": Image.new("RGB", (2400, 2400), "white"),
+        "include_drinkaware": True, "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "",
+        "clubcard_end_date": "23/06", "product_category": "Alcohol", "product_exclusivity": "Exclusive",
+        "creative_links_to_tesco": True, "show_logo": True
+    }
+    headlines = [f"New look {i}" for i in range(edits)]
+    compositor = LayeredCompositor()
+    compositor.render((1080, 1920), spec)
+
+    def uncached():
+        PACKSHOT_RESIZE_CACHE.images.clear()
+        return [LayeredCompositor().render((1080, 1920), dict(spec, headline=headline)) for headline in headlines]
+
+    _report(f"headline edits ({edits} re-renders at 1080x1920)", _timed(uncached, 1),
+            _timed(lambda: [compositor.render((1080, 1920), dict(spec, headline=headline)) for headline in headlines], 1))
+    print("  layer hit rates: " + ", ".join(f"{name} {counts['hit_rate']:.0%}"
+                                              for name, counts in compositor.info()["layers"].items()))
+
+
+def benchmark_preview_scale(repeat=5):
+    """Compare full-resolution and preview-scale renders with every layer rebuilt"""
+    spec = {
+        "packshots": (Image.new("RGBA", (1500, 2000), (200, 30, 30, 255)),
+                      Image.new("RGBA", (1200, 1200), (30, 200, 30, 255))),
+        "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Clubcard Price",
+        "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": Image.new("RGB", (2400, 2400), "white"),
+        "include_drinkaware": True, "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "",
+        "clubcard_end_date": "23/06", "product_category": "Alcohol", "product_exclusivity": "Exclusive",
+        "creative_links_to_tesco": True, "show_logo": True
+    }
+    for scale in (1.0, 0.5, 0.25):
+        # Packshot fits are warm, as they are after the first preview of an upload
+        LayeredCompositor().render((1080, 1920), spec, scale)
+        elapsed = _timed(lambda: LayeredCompositor().render((1080, 1920), spec, scale), repeat)
+        image = LayeredCompositor().render((1080, 1920), spec, scale)
+        print(f"render 1080x1920 at scale {scale}: {elapsed * 1000:.1f}ms | canvas {image.size[0]}x{image.size[1]} "
+              f"{len(image.tobytes()) / 1e6:.1f}MB")
+
+
+def benchmark_budgeted_export(workers=None):
+    """Compare fixed-setting exports with budget-searched ones on photographic creatives"""
+    random.seed(3)
+    backgrounds = []
+    for _ in range(3):
+        # Noisy gradients compress like photographs, well over 500KB as lossless PNG
+        gradient = Image.linear_gradient("L").resize((1080, 1920)).convert("RGB")
+        noise = Image.effect_noise((1080, 1920), random.randint(30, 60)).convert("RGB")
+        backgrounds.append(Image.blend(gradient, noise, 0.5))
+    creatives = [generate_creative((1080, 1920), [], "Fresh for summer", "", "None", "Auto", "#FFFFFF", background,
+                                   False, "", "", "", "", "Food", "Exclusive", True)
+                 for background in backgrounds]
+    for codec, settings in (("PNG", {}), ("JPEG", {"quality": 90})):
+        start = time.perf_counter()
+        sizes = [len(encode(creative, codec, **settings)) for creative in creatives]
+        elapsed = time.perf_counter() - start
+        print(f"fixed {codec} export: {elapsed * 1000:.1f}ms | largest {max(sizes) / 1000:.0f}KB | "
+              f"{sum(size > 500_000 for size in sizes)}/{len(sizes)} over 500KB")
+    encoder = BudgetedEncoder()
+    start = time.perf_counter()
+    results = encoder.encode_all(creatives, max_workers=1)
+    serial = time.perf_counter() - start
+    start = time.perf_counter()
+    encoder.encode_all(creatives, max_workers=workers)
+    parallel = time.perf_counter() - start
+    for result in results:
+        print(f"budgeted {result['codec']}: {result['bytes'] / 1000:.0f}KB {result['settings']} | "
+              f"{result['attempts']} encodes | {result['seconds'] * 1000:.1f}ms")
+    _report(f"budgeted export of {len(creatives)} creatives x 2 codecs", serial, parallel)
+
+
+def benchmark_download_reruns(reruns=5):
+    """Compare encoding downloads on every rerun with the digest-keyed encode cache"""
+    creatives = render_formats(list(FORMAT_DIMENSIONS), {
+        "packshots": (Image.new("RGBA", (900, 1400), (200, 30, 30, 255)),), "headline": "New look",
+        "subhead": "Same great taste", "value_tile_type": "Clubcard Price", "tag_type": "Auto",
+        "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": False, "clubcard_price": "£3.50",
+        "regular_price": "£4.50", "lep_price": "", "clubcard_end_date": "23/06", "product_category": "General",
+        "product_exclusivity": "Exclusive", "creative_links_to_tesco": True
+    })
+    uncached = BudgetedEncoder()
+    cached = BudgetedEncoder(cache=LRUCache(64))
+    baseline = _timed(lambda: uncached.encode_all(creatives), reruns)
+    cached.encode_all(creatives)  # First rerun after generation pays for the encodes
+    optimized = _timed(lambda: cached.encode_all(creatives), reruns)
+    _report(f"download encoding per rerun ({len(creatives)} formats x 2 codecs)", baseline, optimized)
+
+
+def benchmark_zip_bundle(copies=4, workers=None):
+    """Compare a deflated ZIP of fixed-setting exports with the stored, parallel-encoded bundle"""
+    creatives = [{"format": f"{name} {copy}", "image": image}
+                 for copy in range(copies)
+                 for name, image in zip(FORMAT_DIMENSIONS, render_formats(list(FORMAT_DIMENSIONS), {
+                     "packshots": (Image.new("RGBA", (900, 1400), (200, 30, 30, 255)),), "headline": "New look",
+                     "subhead": "Same great taste", "value_tile_type": "Clubcard Price", "tag_type": "Auto",
+                     "bg_color": "#BFE0F5", "bg_image": Image.effect_noise((800, 800), 40).convert("RGB"),
+                     "include_drinkaware": False, "clubcard_price": "£3.50", "regular_price": "£4.50",
+                     "lep_price": "", "clubcard_end_date": "23/06", "product_category": "General",
+                     "product_exclusivity": "Exclusive", "creative_links_to_tesco": True
+                 }))]
+
+    encoder = BudgetedEncoder(cache=LRUCache(64))
+    start = time.perf_counter()
+    archive, manifest = bundle_bytes(creatives, encoder=encoder, max_workers=workers)
+    cold = time.perf_counter() - start
+    over = sum(not entry["within_budget"] for creative in manifest["creatives"] for entry in creative["files"])
+    print(f"ZIP bundle of {len(creatives)} creatives x 2 codecs: {cold * 1000:.1f}ms cold | "
+          f"{len(archive) / 1e6:.1f}MB, {over} members over budget")
+
+    def deflated():
+        # Same encoded members, deflated a second time
+        with zipfile.ZipFile(io.BytesIO(), "w", zipfile.ZIP_DEFLATED) as archive:
+            for creative, encoding in zip([creative for creative in creatives for _ in range(2)], encoder.encode_all(
+                    [creative["image"] for creative in creatives])):
+                archive.writestr(export_filename(creative["format"], encoding["codec"]), encoding["data"])
+
+    baseline = _timed(deflated, 3)
+    optimized = _timed(lambda: bundle_bytes(creatives, encoder=encoder, max_workers=workers), 3)
+    _report("ZIP bundle write, deflated vs stored members (encodes cached)", baseline, optimized)
+
+
+def benchmark_session_storage():
+    """Compare session memory held by decoded creatives with the encoded artifact store"""
+    creatives = render_formats(list(FORMAT_DIMENSIONS), {
+        "packshots": (Image.new("RGBA", (900, 1400), (200, 30, 30, 255)),), "headline": "New look",
+        "subhead": "Same great taste", "value_tile_type": "Clubcard Price", "tag_type": "Auto",
+        "bg_color": "#BFE0F5", "bg_image": Image.linear_gradient("L").resize((1080, 1920)).convert("RGB"),
+        "include_drinkaware": False, "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "",
+        "clubcard_end_date": "23/06", "product_category": "General", "product_exclusivity": "Exclusive",
+        "creative_links_to_tesco": True
+    })
+    decoded = sum(image_nbytes(creative) for creative in creatives)
+    with tempfile.TemporaryDirectory() as spill_dir:
+        store = ArtifactStore(spill_dir=spill_dir)
+        start = time.perf_counter()
+        handles = [store.put_image(creative) for creative in creatives]
+        stored = time.perf_counter() - start
+        start = time.perf_counter()
+        for handle in handles:
+            store.image(handle)
+        loaded = time.perf_counter() - start
+    print(f"session storage of {len(creatives)} creatives: decoded {decoded / 1e6:.1f}MB | "
+          f"encoded {store.bytes / 1e6:.2f}MB ({decoded / store.bytes:.0f}x smaller) | "
+          f"store {stored * 1000:.1f}ms | decode all {loaded * 1000:.1f}ms")
+
+
+def legacy_remove_background(image):
+    """Per-pixel background removal loop replaced by the vectorized remove_background_ai"""
+    if image.mode != 'RGBA':
+        image = image.convert('RGBA')
+    width, height = image.size
+    pixels = image.load()
+    for i in range(width):
+        for j in range(height):
+            r, g, b, a = pixels[i, j]
+            if (r > 200 and g > 200 and b > 200) or (r > 240 and g > 240 and b > 240):
+                pixels[i, j] = (r, g, b, 0)
+    return image
+
+
+def synthetic_packshot(size, seed=5):
+    """Product-like shape on a light, slightly noisy studio background"""
+    random.seed(seed)
+    image = Image.blend(Image.new("RGB", (size, size), (235, 235, 235)),
+                        Image.effect_noise((size, size), 40).convert("RGB"), 0.2)
+    ImageDraw.Draw(image).ellipse((size // 4, size // 8, 3 * size // 4, 7 * size // 8), fill=(200, 40, 40))
+    return image
+
+
+def benchmark_background_removal(sizes=(500, 1000, 2000, 4000), legacy_limit=2000):
+    """Compare the per-pixel loop with the vectorized background removal across packshot sizes"""
+    for size in sizes:
+        packshot = synthetic_packshot(size)
+        optimized = _timed(lambda: remove_background_ai(packshot.copy()), 3)
+        if size > legacy_limit:
+            print(f"background removal {size}x{size}: optimized {optimized * 1000:.3f}ms (loop skipped)")
+            continue
+        baseline = _timed(lambda: legacy_remove_background(packshot.copy()), 1)
+        assert legacy_remove_background(packshot.copy()).tobytes() == remove_background_ai(packshot.copy()).tobytes()
+        _report(f"background removal {size}x{size}", baseline, optimized)
+
+
+def benchmark_segmentation_engines(sizes=(1000, 2000, 4000)):
+    """Compare the threshold and border-seeded cut-out engines, and how much of a white label each keeps"""
+    for size in sizes:
+        packshot = synthetic_packshot(size)
+        label = (size * 3 // 8, size * 3 // 8, size * 5 // 8, size // 2)
+        ImageDraw.Draw(packshot).rectangle(label, fill=(250, 250, 250))
+        for engine in ("threshold", "border"):
+            elapsed = _timed(lambda: remove_background_ai(packshot.copy(), engine=engine), 3)
+            alpha = remove_background_ai(packshot.copy(), engine=engine).getchannel("A").crop(label)
+            kept = sum(alpha.point(lambda value: 1 if value else 0).getdata()) / (alpha.width * alpha.height)
+            print(f"cut-out {size}x{size} ({engine}): {elapsed * 1000:.1f}ms | white label kept {kept:.0%}")
+
+
+_COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+from compliance_engine import AdvancedComplianceEngine
+engine = AdvancedComplianceEngine(rule_cache_dir=sys.argv[1])
+constructed = time.perf_counter()
+engine.check_text_compliance("Killer deal", "Murderous prices")
+print(json.dumps({"source": engine.rule_load_stats["source"],
+                  "load": engine.rule_load_stats["seconds"],
+                  "construct": constructed - start,
+                  "first_check": time.perf_counter() - constructed}))
+"""
+
+
+def benchmark_rule_cold_start():
+    """Measure engine cold start in fresh processes with and without the compiled rule artifact"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for label in ("rebuild", "artifact"):
+            output = subprocess.run([sys.executable, "-c", _COLD_START_SCRIPT, cache_dir],
+                                    cwd=here, capture_output=True, text=True, check=True).stdout
+            stats = json.loads(output)
+            print(f"rule cold start ({label}, source={stats['source']}): rule load {stats['load'] * 1000:.1f}ms | "
+                  f"import+construct {stats['construct'] * 1000:.1f}ms | first check {stats['first_check'] * 1000:.1f}ms")
+
+
+def benchmark_processed_packshot_cache(size=3000, repeat=3):
+    """Compare re-processing a packshot with the shared processed-packshot cache, in memory and on disk"""
+    packshot = synthetic_packshot(size)
+    settings = {"remove_bg": True, "enhance": True, "engine": "border"}
+    baseline = _timed(lambda: process_packshot(packshot, cache=None, **settings), repeat)
+    with tempfile.TemporaryDirectory() as directory:
+        ProcessedPackshotCache(directory=directory).process(packshot, **settings)
+        # A fresh upload of the same file: same pixels, new image object
+        cached = ProcessedPackshotCache(directory=directory)
+        cached.process(packshot.copy(), **settings)
+        optimized = _timed(lambda: cached.process(packshot.copy(), **settings), repeat)
+        disk = _timed(lambda: ProcessedPackshotCache(directory=directory).process(packshot.copy(), **settings),
+                      repeat)
+    _report(f"re-process {size}x{size} packshot (memory hit)", baseline, optimized)
+    _report(f"re-process {size}x{size} packshot (disk hit)", baseline, disk)
+
+
+def benchmark_packshot_pipeline(size=2000, count=3, workers=None):
+    """Compare processing packshots one at a time with the process-pool pipeline"""
+    packshots = [synthetic_packshot(size, seed) for seed in range(count)]
+    settings = {"remove_bg": True, "enhance": True, "engine": "border"}
+    start = time.perf_counter()
+    for packshot in packshots:
+        process_packshot(packshot, cache=None, **settings)
+    baseline = time.perf_counter() - start
+    start = time.perf_counter()
+    process_packshots(packshots, cache=None, max_workers=workers, **settings)
+    optimized = time.perf_counter() - start
+    _report(f"process {count} packshots of {size}x{size} on {os.cpu_count()} CPUs", baseline, optimized)
+
+
+_TILED_SCRIPT = """
+import json, resource, sys, time
+from PIL import Image, ImageDraw
+from background_remover import remove_background_ai, enhance_image_quality, apply_creative_filters
+size, max_bytes = int(sys.argv[1]), (int(sys.argv[2]) or None)
+packshot = Image.new("RGB", (size, size), (240, 240, 240))
+ImageDraw.Draw(packshot).ellipse((size // 4, size // 8, 3 * size // 4, 7 * size // 8), fill=(200, 40, 40))
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+result = remove_background_ai(packshot, engine="border", max_bytes=max_bytes)
+result = enhance_image_quality(result, max_bytes=max_bytes)
+result = apply_creative_filters(result, "Warm", max_bytes=max_bytes)
+print(json.dumps({"seconds": time.perf_counter() - start,
+                  "peak": (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) * 1024}))
+"""
+
+
+def benchmark_tiled_processing(size=6000, max_bytes=64 * 1024 * 1024):
+    """Compare peak memory of whole-image and tiled packshot processing in fresh processes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    for label, budget in (("whole image", 0), (f"tiled, {max_bytes // (1024 * 1024)}MB budget", max_bytes)):
+        output = subprocess.run([sys.executable, "-c", _TILED_SCRIPT, str(size), str(budget)],
+                                cwd=here, capture_output=True, text=True, check=True).stdout
+        stats = json.loads(output)
+        print(f"process {size}x{size} packshot ({label}): {stats['seconds'] * 1000:.0f}ms | "
+              f"peak memory above the input {stats['peak'] / 1e6:.0f}MB")
+
+
+def run_all_benchmarks():
+    """Run all benchmarks"""
+    benchmark_forbidden_terms()
+    benchmark_category_bundles()
+    benchmark_incremental_checker()
+    benchmark_rule_cold_start()
+    benchmark_format_rendering()
+    benchmark_packshot_resize_cache()
+    benchmark_layered_compositor()
+    benchmark_preview_scale()
+    benchmark_budgeted_export()
+    benchmark_download_reruns()
+    benchmark_zip_bundle()
+    benchmark_session_storage()
+    benchmark_background_removal()
+    benchmark_segmentation_engines()
+    benchmark_tiled_processing()
+    benchmark_processed_packshot_cache()
+    benchmark_packshot_pipeline()
+    benchmark_batch_text_compliance()
+
+
+if __name__ == "__main__":
+    run_all_benchmarks()
@@ -1,14 +1,317 @@
+import copy
 import re
 import time
 from datetime import datetime
 from PIL import Image, ImageDraw
 import json
-from collections import defaultdict
+import os
+import hashlib
+import multiprocessing
+import threading
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from rule_matcher import TermMatcher, PatternBundle, split_gaps, max_token_span
+from lru_cache import LRUCache
+from violations import Violation, SEVERITY_WARNING, SEVERITY_HARD_FAIL
+from violation_log import ViolationLog
+
+# Engine copy held by each batch worker process (set once by the pool initializer)
+_batch_engine = None
+
+def _init_batch_worker(engine):
+    global _batch_engine
+    _batch_engine = engine
+
+def _check_text_chunk(task):
+    chunk, product_category = task
+    return [_batch_engine.check_text_compliance(headline, subhead, product_category)
+            for headline, subhead in chunk]
+
+def _chunk_pairs(pairs, chunk_size):
+    iterator = iter(pairs)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def _copy_offsets(raw):
+    """Raw index of every character of the whitespace-normalised, lower-cased copy"""
+    # Already-normalised copy whose case folding keeps its length maps onto itself
+    if len(raw.lower()) == len(raw) and " ".join(raw.split()) == raw:
+        return range(len(raw))
+    
+    offsets = []
+    position = 0
+    for token in raw.split():
+        start = raw.index(token, position)
+        if offsets:
+            # The single joining space stands for the whitespace run before the token
+            offsets.append(start - 1)
+        if len(token.lower()) == len(token):
+            offsets.extend(range(start, start + len(token)))
+        else:
+            for index in range(start, start + len(token)):
+                offsets.extend([index] * len(raw[index].lower()))
+        position = start + len(token)
+    return offsets
+
+# Bump when the layout of the compiled rule-set artifact changes
+RULESET_ARTIFACT_VERSION = 4
+
+# State keys from_dict expects of the matchers stored in an artifact
+_TERM_MATCHER_KEYS = set(TermMatcher(["probe"]).to_dict())
+_PATTERN_BUNDLE_KEYS = set(PatternBundle([("probe", "probe")], "{message}").to_dict())
+
+def _is_rule_artifact(artifact):
+    """Structural check of a loaded artifact, so a truncated or foreign file is recompiled instead"""
+    try:
+        return (isinstance(artifact["forbidden_matcher"], dict)
+                and set(artifact["forbidden_matcher"]) == _TERM_MATCHER_KEYS
+                and isinstance(artifact["forbidden_rule_ids"], dict)
+                and isinstance(artifact["text_bundles"], list)
+                and all(isinstance(state, dict) and set(state) == _PATTERN_BUNDLE_KEYS
+                        for state in artifact["text_bundles"])
+                and isinstance(artifact["rule_catalog"], list)
+                and all(isinstance(entry, list) and len(entry) == 6 for entry in artifact["rule_catalog"])
+                and isinstance(artifact["checks_performed"], int))
+    except (KeyError, TypeError):
+        return False
+# Persisting compiled rules is opt-in: set TGCC_RULE_CACHE_DIR or pass rule_cache_dir
+DEFAULT_RULE_CACHE_DIR = os.environ.get("TGCC_RULE_CACHE_DIR") or None
+# Persisting the violation history is opt-in too: set TGCC_VIOLATION_LOG or pass violation_log_path
+DEFAULT_VIOLATION_LOG_PATH = os.environ.get("TGCC_VIOLATION_LOG") or None
 
 class AdvancedComplianceEngine:
-    def __init__(self):
+    def __init__(self, verdict_cache_size=1024, rule_cache_dir=DEFAULT_RULE_CACHE_DIR,
+                 violation_log_path=DEFAULT_VIOLATION_LOG_PATH, violation_log_size=1000):
+        self.verdict_cache = LRUCache(verdict_cache_size)
+        self.rule_cache_dir = rule_cache_dir
+        self.registered_rules = {}
         self.hard_rules = self.load_tesco_guidelines()
-        self.violation_history = []
+        # Runtime history stays in this process: the log pickles as an empty, memory-only log
+        self.violation_log = ViolationLog(violation_log_path, violation_log_size)
+        self._issue_rule_ids = None
+        self._batch_pool = None  # (catalog_version, workers, executor), started on the first batch
+        self._batch_lock = threading.Lock()
+    
+    def __getstate__(self):
+        # Batch workers get the rules, not the parent's pool
+        state = dict(self.__dict__)
+        state["_batch_pool"] = None
+        del state["_batch_lock"]
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._batch_lock = threading.Lock()
+    
+    @property
+    def violation_history(self):
+        """Most recent logged violation events (bounded by violation_log_size)"""
+        return list(self.violation_log.recent)
+    
+    @property
+    def hard_rules(self):
+        """A copy of the loaded guidelines; assign an edited copy back to apply it
+
+        Editing the engine's own rules in place would bypass reload_rules and leave
+        stale matchers and cached verdicts, so the live dict is never handed out.
+        """
+        return copy.deepcopy(self._hard_rules)
+    
+    @hard_rules.setter
+    def hard_rules(self, rules):
+        self._hard_rules = rules
+        self.reload_rules()
+    
+    def reload_rules(self):
+        """Load (or recompile) matchers and invalidate cached verdicts after the rules change"""
+        start = time.perf_counter()
+        rule_groups = self._get_text_rule_groups()
+        rule_suggestions = self._get_rule_suggestions()
+        # Issue and suggestion text baked into the catalog for each forbidden term
+        term_texts = {term: [self.get_rule_description(term), self.get_compliant_alternative(term)]
+                      for term in self._hard_rules["forbidden_claims"]}
+        
+        # The version hashes every guideline source the compiled rule set is derived from
+        self.rules_version = hashlib.sha256(json.dumps(
+            [RULESET_ARTIFACT_VERSION, self._hard_rules, rule_groups, rule_suggestions, term_texts],
+            sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16]
+        
+        artifact = self._load_rule_artifact()
+        source = "artifact"
+        try:
+            self._apply_rule_artifact(artifact)
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            # A cached artifact that cannot be used is rebuilt; the cache never breaks the engine
+            if artifact is not None:
+                print(f"Rule cache ignored: {e}")
+            artifact = None
+        if artifact is None:
+            artifact = self._compile_rule_set(rule_groups, rule_suggestions)
+            self._save_rule_artifact(artifact)
+            self._apply_rule_artifact(artifact)
+            source = "compiled"
+        
+        # Design and caller-registered rules are cheap to build and get ids after the text rules
+        self.rule_keys = {}
+        for key, category, severity, message in self._get_design_rules() + list(self.registered_rules.values()):
+            self.rule_keys[key] = len(self.rule_catalog)
+            self.rule_catalog.append([category, key, message, None, None, severity])
+        # Violation records index the catalog, so they are pinned to this exact layout
+        self.catalog_version = hashlib.sha256(json.dumps(
+            [self.rules_version, self.rule_catalog], sort_keys=True
+        ).encode("utf-8")).hexdigest()[:16]
+        
+        self.alcohol_categories = {category for category, _, _ in self._get_alcohol_patterns()}
+        sensitive_categories = {category for category, _, _ in self._get_sensitive_content_patterns()}
+        self.alcohol_bundles = [b for b in self.text_bundles if b.category in self.alcohol_categories]
+        self.sensitive_bundles = [b for b in self.text_bundles if b.category in sensitive_categories]
+        
+        # Everything derived from the previous rules is invalidated
+        self._incremental_plan = None
+        self._issue_rule_ids = None
+        self.verdict_cache.clear()
+        
+        self.rule_load_stats = {
+            "source": source,
+            "seconds": time.perf_counter() - start,
+            "rules_version": self.rules_version
+        }
+    
+    def _compile_rule_set(self, rule_groups, rule_suggestions):
+        """Build the matchers and the rule catalog every text hit is reported against
+
+        Catalog entries are [category, label, issue, suggestion, alternative, severity]. Forbidden
+        terms come first, then pattern rules in reporting order, so sorting rule ids
+        reproduces the order issues are listed in.
+        """
+        terms = self._hard_rules["forbidden_claims"]
+        rule_catalog = []
+        forbidden_rule_ids = {}
+        for term in dict.fromkeys(terms):
+            alternative = self.get_compliant_alternative(term)
+            forbidden_rule_ids[term] = len(rule_catalog)
+            rule_catalog.append([
+                "forbidden_claim",
+                term,
+                f"HARD FAIL: '{term}' detected - {self.get_rule_description(term)}",
+                f"Replace '{term}' with: '{alternative}'" if alternative else None,
+                alternative or None,
+                SEVERITY_HARD_FAIL
+            ])
+        
+        text_bundles = []
+        for category, template, patterns in rule_groups:
+            bundle = PatternBundle(patterns, template, category=category, first_rule_id=len(rule_catalog))
+            for (_, message), issue in zip(bundle.rules, bundle.messages):
+                rule_catalog.append([category, message, issue, rule_suggestions.get(category), None, SEVERITY_HARD_FAIL])
+            text_bundles.append(bundle.to_dict())
+        
+        return {
+            "artifact_version": RULESET_ARTIFACT_VERSION,
+            "rules_version": self.rules_version,
+            "forbidden_matcher": TermMatcher(terms).to_dict(),
+            "forbidden_rule_ids": forbidden_rule_ids,
+            "text_bundles": text_bundles,
+            "rule_catalog": rule_catalog,
+            "checks_performed": len(terms) + sum(len(patterns) for category, _, patterns in rule_groups
+                                                 if category in ("claim_indicator", "claim_phrase"))
+        }
+    
+    def _apply_rule_artifact(self, artifact):
+        """Install the matchers and text-rule catalog of a compiled rule set"""
+        if artifact is None:
+            return
+        self.forbidden_matcher = TermMatcher.from_dict(artifact["forbidden_matcher"])
+        self.forbidden_rule_ids = artifact["forbidden_rule_ids"]
+        self.text_bundles = [PatternBundle.from_dict(state) for state in artifact["text_bundles"]]
+        self.rule_catalog = artifact["rule_catalog"]
+        self.checks_performed = artifact["checks_performed"]
+    
+    def _rule_artifact_path(self):
+        return os.path.join(self.rule_cache_dir, f"ruleset-v{RULESET_ARTIFACT_VERSION}-{self.rules_version}.json")
+    
+    def _load_rule_artifact(self):
+        """Return the cached compiled rule set for the current rules version, if present"""
+        if not self.rule_cache_dir:
+            return None
+        try:
+            with open(self._rule_artifact_path(), encoding="utf-8") as f:
+                artifact = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(artifact, dict) or artifact.get("rules_version") != self.rules_version:
+            return None
+        if not _is_rule_artifact(artifact):
+            print(f"Rule cache ignored: {self._rule_artifact_path()} is not a complete rule set")
+            return None
+        return artifact
+    
+    def _save_rule_artifact(self, artifact):
+        """Persist the compiled rule set atomically; the cache is best-effort"""
+        if not self.rule_cache_dir:
+            return
+        path = self._rule_artifact_path()
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.rule_cache_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(artifact, f)
+            os.replace(tmp_path, path)
+            # Artifacts of earlier rule versions are never read again
+            for name in os.listdir(self.rule_cache_dir):
+                if name.startswith("ruleset-v") and name.endswith(".json") and name != os.path.basename(path):
+                    os.remove(os.path.join(self.rule_cache_dir, name))
+        except OSError as e:
+            print(f"Rule cache write error: {e}")
+    
+    def register_rules(self, rules):
+        """Add (key, category, severity, message) rules to the catalog; messages may use {detail}"""
+        for rule in rules:
+            self.registered_rules[rule[0]] = tuple(rule)
+        self.reload_rules()
+    
+    def rule_violation(self, key, detail=None):
+        """Create a violation record for a design or registered rule"""
+        rule_id = self.rule_keys[key]
+        return Violation(rule_id, self.rule_catalog[rule_id][5], detail=detail, catalog_version=self.catalog_version)
+    
+    def rule_info(self, rule_id):
+        """Describe a catalog rule for analytics and display"""
+        category, label, message, suggestion, alternative, severity = self.rule_catalog[rule_id]
+        return {"rule_id": rule_id, "category": category, "label": label, "message": message,
+                "suggestion": suggestion, "alternative": alternative, "severity": severity}
+    
+    def violation_rule(self, violation):
+        """Return the catalog entry of a violation record
+
+        Raises ValueError for records created against a different catalog, whose
+        rule ids may now name other rules.
+        """
+        if violation.catalog_version is not None and violation.catalog_version != self.catalog_version:
+            raise ValueError(f"Violation record is for rule catalog {violation.catalog_version}, "
+                             f"not the loaded catalog {self.catalog_version}")
+        return self.rule_catalog[violation.rule_id]
+    
+    def render_violation(self, violation):
+        """Render one violation record as its display text"""
+        message = self.violation_rule(violation)[2]
+        return message if violation.detail is None else message.format(detail=violation.detail)
+    
+    def render_violations(self, violations):
+        """Render violation records as display text, keeping their order"""
+        return [self.render_violation(violation) for violation in violations]
+    
+    def verdict_cache_info(self):
+        """Return hit/miss statistics for the text compliance verdict cache"""
+        info = self.verdict_cache.info()
+        info["rules_version"] = self.rules_version
+        return info
     
     def load_tesco_guidelines(self):
         """Load ALL Tesco guidelines from Appendix A and B EXACTLY as per problem statement"""
@@ -178,37 +481,232 @@ class AdvancedComplianceEngine:
     
     def check_text_compliance(self, headline, subhead, product_category="general"):
         """Check text compliance with Appendix B HARD FAIL rules - EXACT problem statement implementation"""
-        issues = []
-        suggestions = []
+        verdict, spans = self._text_verdict(headline, subhead, product_category)
+        return self._text_result(verdict, spans, headline, subhead, product_category)
+    
+    def incremental_checker(self, product_category="general"):
+        """Create an IncrementalTextChecker for copy that is being edited live"""
+        return IncrementalTextChecker(self, product_category)
+    
+    def _text_result(self, verdict, spans, headline, subhead, product_category):
+        """Render a text verdict as the check_text_compliance result"""
+        rule_ids = verdict["rule_ids"]
+        catalog = self.rule_catalog
+        return {
+            "approved": verdict["approved"],
+            "issues": [catalog[rule_id][2] for rule_id in rule_ids],
+            "suggestions": [catalog[rule_id][3] for rule_id in rule_ids if catalog[rule_id][3]],
+            "checks_performed": verdict["checks_performed"],
+            "product_category": product_category,
+            "matches": self._locate_matches(spans, headline, subhead)
+        }
+    
+    def text_violations(self, headline, subhead, product_category="general"):
+        """Violation records for the text rules check_text_compliance reports, in the same order
+
+        Each record carries the span of the rule's first hit in the caller's copy.
+        """
+        verdict, spans = self._text_verdict(headline, subhead, product_category)
+        first_hits = {}
+        for match in self._locate_matches(spans, headline, subhead):
+            first_hits.setdefault(match["rule_id"], match)
         
+        violations = []
+        for rule_id in verdict["rule_ids"]:
+            hit = first_hits.get(rule_id)
+            if hit is None:
+                violations.append(Violation(rule_id, catalog_version=self.catalog_version))
+            else:
+                violations.append(Violation(rule_id, SEVERITY_HARD_FAIL, hit["field"], hit["start"], hit["end"],
+                                            catalog_version=self.catalog_version))
+        return violations
+    
+    def _text_verdict(self, headline, subhead, product_category):
+        """Cached (verdict, spans) for the whitespace-normalised, case-folded copy"""
+        # Whitespace is normalised before checking, so verdicts depend only on the
+        # case-folded copy, the category and the rule-set version
+        headline = " ".join(headline.split())
+        subhead = " ".join(subhead.split())
+        key = (headline.lower(), subhead.lower(), product_category, self.rules_version)
+        cached = self.verdict_cache.get(key)
+        if cached is None:
+            cached = self._evaluate_text_compliance(headline, subhead, product_category)
+            self.verdict_cache.put(key, cached)
+        return cached
+    
+    def _evaluate_text_compliance(self, headline, subhead, product_category):
+        """Run every text rule against headline and subhead (uncached)
+
+        Returns the verdict as reported rule ids, and the (rule id, start, end) spans
+        it was derived from with offsets into the combined lower-cased copy.
+        """
         # Combine text for analysis
         text_to_check = f"{headline} {subhead}".lower()
+        spans = self._scan_text(text_to_check, product_category.lower() == "alcohol")
+        return self._verdict_from_spans(spans), spans
+    
+    def _verdict_from_spans(self, spans):
+        """Derive the reported rule ids from the rule hits of one scan"""
+        rule_ids = []
+        matched = {rule_id for rule_id, _, _ in spans}
         
         # HARD FAIL: Check for ALL forbidden terms from Appendix B
-        for term in self.hard_rules["forbidden_claims"]:
-            # Use word boundaries to avoid partial matches
-            pattern = r'\b' + re.escape(term) + r'\b'
-            if re.search(pattern, text_to_check, re.IGNORECASE):
-                issues.append(f"HARD FAIL: '{term}' detected - {self.get_rule_description(term)}")
-                alternative = self.get_compliant_alternative(term)
-                if alternative:
-                    suggestions.append(f"Replace '{term}' with: '{alternative}'")
-        
-        # Enhanced claim detection patterns
-        claim_patterns = self._get_enhanced_claim_patterns()
-        
-        for pattern, message in claim_patterns:
-            if re.search(pattern, text_to_check, re.IGNORECASE):
-                if message not in issues:  # Avoid duplicates
-                    issues.append(f"HARD FAIL: {message}")
-        
-        # Special claim detection for asterisks and reference marks
-        if any(char in headline + subhead for char in ['*', '†', '‡', '§', '¶', '※']):
-            issues.append("HARD FAIL: Claim indicators (asterisks/reference marks) detected - indicates T&Cs/claims")
-            suggestions.append("Remove all asterisks (*), daggers (†), and other reference marks")
-        
-        # Check for common claim phrases
-        claim_phrases = [
+        # Terms are reported once per guideline entry, in guideline order
+        forbidden_count = len(self.forbidden_rule_ids)
+        found_terms = {self.rule_catalog[rule_id][1] for rule_id in matched if rule_id < forbidden_count}
+        for index in self.forbidden_matcher.indices_for(found_terms):
+            rule_ids.append(self.forbidden_rule_ids[self.forbidden_matcher.terms[index]])
+        
+        # Claim patterns, reference marks, claim phrases, alcohol (for alcohol products)
+        # and sensitive content follow in rule id order
+        reported = {self.rule_catalog[rule_id][2] for rule_id in rule_ids}
+        for rule_id in sorted(rule_id for rule_id in matched if rule_id >= forbidden_count):
+            category, _, issue, _, _, _ = self.rule_catalog[rule_id]
+            if category == "claim_phrase" and issue in reported:
+                continue
+            rule_ids.append(rule_id)
+            reported.add(issue)
+        
+        return {
+            "approved": len(rule_ids) == 0,
+            "rule_ids": rule_ids,
+            "checks_performed": self.checks_performed
+        }
+    
+    def _scan_text(self, text, include_alcohol):
+        """Scan text once with every compiled matcher, returning (rule id, start, end) in text order"""
+        spans = [(self.forbidden_rule_ids[term], start, end)
+                 for term, start, end in self.forbidden_matcher.find_spans(text)]
+        for bundle in self.text_bundles:
+            if bundle.category in self.alcohol_categories and not include_alcohol:
+                continue
+            spans.extend((bundle.first_rule_id + index, start, end) for index, start, end in bundle.find_spans(text))
+        spans.sort(key=lambda span: (span[1], span[0]))
+        return spans
+    
+    def incremental_plan(self):
+        """Segment-level view of the text rules used by IncrementalTextChecker (built on first use)
+
+        Rules are split at their '.*' gaps. Segment ids below the forbidden-term count
+        are the forbidden rule ids; the rest index the segment bundle. reach is the
+        most spaces any segment match can cover (None if some segment is unbounded).
+        """
+        if self._incremental_plan is None:
+            segments = []
+            segment_rules = []
+            reaches = [term.count(" ") for term in self.forbidden_rule_ids]
+            for bundle in self.text_bundles:
+                for index, (pattern, _) in enumerate(bundle.rules):
+                    parts = split_gaps(pattern)
+                    for part, segment in enumerate(parts):
+                        segments.append((segment, ""))
+                        segment_rules.append((bundle.first_rule_id + index, part, len(parts)))
+                        reaches.append(max_token_span(segment))
+            self._incremental_plan = {
+                "bundle": PatternBundle(segments),
+                "segment_rules": segment_rules,
+                "reach": None if None in reaches else max(reaches)
+            }
+        return self._incremental_plan
+    
+    def _locate_matches(self, spans, headline, subhead):
+        """Map combined-copy spans back to offsets in the caller's headline and subhead
+
+        A hit that runs across the headline/subhead join is reported once per field.
+        """
+        if not spans:
+            return []
+        fields = [("headline", headline, _copy_offsets(headline)), ("subhead", subhead, _copy_offsets(subhead))]
+        subhead_start = len(fields[0][2]) + 1
+        matches = []
+        for rule_id, start, end in spans:
+            category, _, _, _, alternative, _ = self.rule_catalog[rule_id]
+            bounds = [(start, min(end, subhead_start - 1)), (max(start, subhead_start) - subhead_start, end - subhead_start)]
+            for (field, raw, offsets), (low, high) in zip(fields, bounds):
+                if low < high:
+                    raw_start, raw_end = offsets[low], offsets[high - 1] + 1
+                    matches.append({
+                        "rule_id": rule_id,
+                        "category": category,
+                        "field": field,
+                        "start": raw_start,
+                        "end": raw_end,
+                        "text": raw[raw_start:raw_end],
+                        "alternative": alternative
+                    })
+        return matches
+    
+    def check_text_compliance_batch(self, pairs, product_category="general", workers=None, chunk_size=256):
+        """Check many (headline, subhead) pairs, yielding results in input order
+
+        Pairs are split into chunks and fanned out to a long-lived pool of spawned
+        worker processes, each holding a copy of this engine's precompiled rules.
+        The pool is started on the first batch and replaced when the rules change.
+        At most two chunks per worker are in flight.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1:
+            for headline, subhead in pairs:
+                yield self.check_text_compliance(headline, subhead, product_category)
+            return
+        
+        pool = self._get_batch_pool(workers)
+        pending = deque()
+        try:
+            for chunk in _chunk_pairs(pairs, chunk_size):
+                pending.append(pool.submit(_check_text_chunk, (chunk, product_category)))
+                if len(pending) >= 2 * workers:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        except BrokenProcessPool:
+            # A crashed worker breaks the pool; the next batch starts a fresh one
+            self._discard_batch_pool(pool)
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+    
+    def _get_batch_pool(self, workers):
+        """Return the shared batch executor for the current rules with at least workers processes"""
+        with self._batch_lock:
+            if self._batch_pool is not None:
+                version, size, executor = self._batch_pool
+                if version == self.catalog_version and size >= workers:
+                    return executor
+                executor.shutdown(wait=False)
+            # Spawned, not forked: the engine is shared by the threads of the Streamlit server
+            executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_batch_worker, initargs=(self,))
+            self._batch_pool = (self.catalog_version, workers, executor)
+            return executor
+    
+    def _discard_batch_pool(self, executor):
+        with self._batch_lock:
+            if self._batch_pool is not None and self._batch_pool[2] is executor:
+                self._batch_pool = None
+        executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _get_text_rule_groups(self):
+        """Get every pattern-based text rule group, in the order their issues are reported"""
+        return [
+            ("claim_indicator", "HARD FAIL: {message}", self._get_enhanced_claim_patterns()),
+            # Special claim detection for asterisks and reference marks
+            ("reference_mark", "HARD FAIL: {message}", [
+                (r'[*†‡§¶※]', "Claim indicators (asterisks/reference marks) detected - indicates T&Cs/claims"),
+            ]),
+            ("claim_phrase", "HARD FAIL: {message}", self._get_claim_phrase_patterns()),
+        ] + self._get_alcohol_patterns() + self._get_sensitive_content_patterns()
+    
+    def _get_rule_suggestions(self):
+        """Get the fix suggested alongside every issue of a rule group"""
+        return {
+            "reference_mark": "Remove all asterisks (*), daggers (†), and other reference marks"
+        }
+    
+    def _get_claim_phrase_patterns(self):
+        """Get common claim phrase patterns (repeated messages are reported once)"""
+        return [
             (r'\b(?:see|refer to|check)\s+(?:below|details|footnote|terms)', "'See below/details' reference detected"),
             (r'\b(?:subject to|according to)\s+(?:terms|conditions)', "Terms and conditions reference detected"),
             (r'\b(?:based on|according to)\s+(?:survey|research|study|test)', "Research/survey-based claim detected"),
@@ -220,28 +718,6 @@ class AdvancedComplianceEngine:
             (r'\b(?:act|buy)\s+now\b', "Urgency claim detected"),
             (r'\b(?:hurry|quick|fast)\b.*\b(?:sale|offer|deal)', "Urgency claim detected"),
         ]
-        
-        for pattern, message in claim_phrases:
-            if re.search(pattern, text_to_check, re.IGNORECASE):
-                if f"HARD FAIL: {message}" not in issues:
-                    issues.append(f"HARD FAIL: {message}")
-        
-        # HARD FAIL: Alcohol-specific checks (EXACT from problem statement)
-        if product_category.lower() == "alcohol":
-            alcohol_issues = self._check_alcohol_compliance(text_to_check)
-            issues.extend(alcohol_issues)
-        
-        # HARD FAIL: Enhanced sensitive content checks
-        sensitive_issues = self._check_sensitive_content(text_to_check)
-        issues.extend(sensitive_issues)
-        
-        return {
-            "approved": len(issues) == 0,
-            "issues": issues,
-            "suggestions": suggestions,
-            "checks_performed": len(self.hard_rules["forbidden_claims"]) + len(claim_patterns) + len(claim_phrases),
-            "product_category": product_category
-        }
     
     def _get_enhanced_claim_patterns(self):
         """Get comprehensive claim detection patterns"""
@@ -336,378 +812,348 @@ class AdvancedComplianceEngine:
     def _check_alcohol_compliance(self, text):
         """Check alcohol-specific compliance issues"""
         issues = []
-        
-        # Health claims for alcohol
-        health_patterns = [
-            (r'\bhealthy\b', "Health claim for alcohol"),
-            (r'\bgood\s+for\s+you\b', "Health benefit claim"),
-            (r'\bbenefits\b', "Benefit claims not allowed"),
-            (r'\bimprove\b.*\bhealth\b', "Health improvement claim"),
-            (r'\bmedical\b.*\bbenefits\b', "Medical benefits claim"),
-            (r'\bwellness\b', "Wellness claim"),
-            (r'\bnutritious\b', "Nutrition claim"),
-            (r'\bvitamin\b', "Vitamin content claim"),
-        ]
-        
-        for pattern, message in health_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} for alcohol (Appendix B)")
-        
-        # Encouragement patterns
-        encouragement_patterns = [
-            (r'\bcelebrate\b', "Encouragement of consumption"),
-            (r'\bparty\b', "Social encouragement"),
-            (r'\bdrink\s+up\b', "Encouragement of consumption"),
-            (r'\benjoy\s+more\b', "Encouragement of consumption"),
-            (r'\bcheers\b', "Encouragement of consumption"),
-            (r'\btoast\b', "Encouragement of consumption"),
-            (r'\bfestive\b', "Social encouragement"),
-            (r'\bsocial\s+gathering\b', "Social encouragement"),
-            (r'\bget\s+the\s+party\s+started\b', "Party encouragement"),
-            (r'\bperfect\s+for\s+parties\b', "Party encouragement"),
-            (r'\bget\s+drunk\b', "Encouragement of excessive consumption"),
-            (r'\bintoxicated\b', "Encouragement of excessive consumption"),
-            (r'\bbinge\b', "Encouragement of excessive consumption"),
-            (r'\bhammered\b', "Encouragement of excessive consumption"),
-            (r'\bwasted\b', "Encouragement of excessive consumption"),
-            (r'\bsmashed\b', "Encouragement of excessive consumption"),
-            (r'\bplastered\b', "Encouragement of excessive consumption"),
-        ]
-        
-        for pattern, message in encouragement_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} not allowed for alcohol (Appendix B)")
-        
+        for bundle in self.alcohol_bundles:
+            issues.extend(bundle.find_messages(text))
         return issues
     
     def _check_sensitive_content(self, text):
         """Enhanced check for ALL types of sensitive and inappropriate content"""
         issues = []
-        
-        # VIOLENCE AND CRIME - Comprehensive detection
-        violence_patterns = [
-            (r'\bmurder\b', "Violent content (murder) detected"),
-            (r'\bkill\b', "Violent content (kill) detected"),
-            (r'\bkilling\b', "Violent content (killing) detected"),
-            (r'\bdeath\b', "Violent/sensitive content (death) detected"),
-            (r'\bdead\b', "Violent/sensitive content (dead) detected"),
-            (r'\bdie\b', "Violent/sensitive content (die) detected"),
-            (r'\bdying\b', "Violent/sensitive content (dying) detected"),
-            (r'\bviolence\b', "Violent content detected"),
-            (r'\bviolent\b', "Violent content detected"),
-            (r'\bweapon\b', "Weapon/violent content detected"),
-            (r'\bgun\b', "Weapon/violent content detected"),
-            (r'\bknife\b', "Weapon/violent content detected"),
-            (r'\battack\b', "Violent content detected"),
-            (r'\bassault\b', "Violent content detected"),
-            (r'\bharm\b', "Violent content detected"),
-            (r'\bharmful\b', "Violent content detected"),
-            (r'\bdanger\b', "Dangerous content detected"),
-            (r'\bdangerous\b', "Dangerous content detected"),
-            (r'\bunsafe\b', "Unsafe content detected"),
-            (r'\bthreat\b', "Threatening content detected"),
-            (r'\bthreatening\b', "Threatening content detected"),
-            (r'\bbrutal\b', "Violent content detected"),
-            (r'\bbrutality\b', "Violent content detected"),
-            (r'\baggression\b', "Violent content detected"),
-            (r'\baggressive\b', "Violent content detected"),
-            (r'\bfight\b', "Violent content detected"),
-            (r'\bfighting\b', "Violent content detected"),
-            (r'\bwar\b', "Violent content detected"),
-            (r'\bbattle\b', "Violent content detected"),
-            (r'\bcombat\b', "Violent content detected"),
-            (r'\bshoot\b', "Violent content detected"),
-            (r'\bshooting\b', "Violent content detected"),
-            (r'\bstab\b', "Violent content detected"),
-            (r'\bstabbing\b', "Violent content detected"),
-            (r'\bhit\b', "Violent content detected"),
-            (r'\bhitting\b', "Violent content detected"),
-            (r'\bpunch\b', "Violent content detected"),
-            (r'\bpunching\b', "Violent content detected"),
-            (r'\bbeat\b', "Violent content detected"),
-            (r'\bbeating\b', "Violent content detected"),
-            (r'\babuse\b', "Abusive/violent content detected"),
-            (r'\babusive\b', "Abusive content detected"),
-        ]
-        
-        for pattern, message in violence_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Violent/inappropriate content")
-        
-        # ILLEGAL ACTIVITIES - Comprehensive detection
-        illegal_patterns = [
-            (r'\billegal\b', "Illegal activity reference detected"),
-            (r'\bcrime\b', "Criminal activity reference detected"),
-            (r'\bcriminal\b', "Criminal activity reference detected"),
-            (r'\bfelony\b', "Criminal activity reference detected"),
-            (r'\btheft\b', "Criminal activity reference detected"),
-            (r'\bsteal\b', "Criminal activity reference detected"),
-            (r'\bstealing\b', "Criminal activity reference detected"),
-            (r'\brobbery\b', "Criminal activity reference detected"),
-            (r'\bburglary\b', "Criminal activity reference detected"),
-            (r'\bfraud\b', "Fraudulent activity detected"),
-            (r'\bscam\b', "Fraudulent activity detected"),
-            (r'\bcheat\b', "Dishonest activity detected"),
-            (r'\bcheating\b', "Dishonest activity detected"),
-            (r'\bdeceive\b', "Dishonest activity detected"),
-            (r'\bdeception\b', "Dishonest activity detected"),
-            (r'\bmislead\b', "Dishonest activity detected"),
-            (r'\bfalse\b', "False claims detected"),
-            (r'\bfake\b', "Counterfeit/fake content detected"),
-            (r'\bcounterfeit\b', "Counterfeit content detected"),
-            (r'\bforgery\b', "Illegal activity detected"),
-            (r'\bpirate\b', "Illegal activity detected"),
-            (r'\bpiracy\b', "Illegal activity detected"),
-            (r'\bblack market\b', "Illegal activity detected"),
-            (r'\bcontraband\b', "Illegal activity detected"),
-            (r'\bsmuggle\b', "Illegal activity detected"),
-            (r'\bsmuggling\b', "Illegal activity detected"),
-            (r'\bbribe\b', "Illegal activity detected"),
-            (r'\bbribery\b', "Illegal activity detected"),
-            (r'\bcorruption\b', "Illegal activity detected"),
-            (r'\bcorrupt\b', "Illegal activity detected"),
-        ]
-        
-        for pattern, message in illegal_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Illegal/inappropriate content")
-        
-        # DRUGS AND SUBSTANCE ABUSE - Comprehensive detection
-        drug_patterns = [
-            (r'\bdrug\b', "Drug reference detected"),
-            (r'\bdrugs\b', "Drug reference detected"),
-            (r'\bnarcotic\b', "Drug reference detected"),
-            (r'\bcocaine\b', "Illegal drug reference detected"),
-            (r'\bheroin\b', "Illegal drug reference detected"),
-            (r'\bmarijuana\b', "Drug reference detected"),
-            (r'\bcannabis\b', "Drug reference detected"),
-            (r'\bopioid\b', "Drug reference detected"),
-            (r'\bmeth\b', "Illegal drug reference detected"),
-            (r'\bmethamphetamine\b', "Illegal drug reference detected"),
-            (r'\bamphetamine\b', "Drug reference detected"),
-            (r'\becstasy\b', "Illegal drug reference detected"),
-            (r'\bmdma\b', "Illegal drug reference detected"),
-            (r'\blsd\b', "Illegal drug reference detected"),
-            (r'\bacid\b', "Illegal drug reference detected"),
-            (r'\bpsychedelic\b', "Drug reference detected"),
-            (r'\bhallucinogen\b', "Drug reference detected"),
-            (r'\bstimulant\b', "Drug reference detected"),
-            (r'\bdepressant\b', "Drug reference detected"),
-            (r'\babuse\b', "Substance abuse reference detected"),
-            (r'\baddiction\b', "Addiction reference detected"),
-            (r'\baddictive\b', "Addiction reference detected"),
-            (r'\bintoxication\b', "Substance abuse reference detected"),
-            (r'\bintoxicated\b', "Substance abuse reference detected"),
-            (r'\bdrunk\b', "Substance abuse reference detected"),
-            (r'\bdrunkenness\b', "Substance abuse reference detected"),
-            (r'\boverdose\b', "Substance abuse reference detected"),
-            (r'\bwithdrawal\b', "Substance abuse reference detected"),
-            (r'\brehab\b', "Substance abuse reference detected"),
-            (r'\brehabilitation\b', "Substance abuse reference detected"),
-            (r'\bsubstance\b', "Substance abuse reference detected"),
-            (r'\bnarcotics\b', "Drug reference detected"),
-        ]
-        
-        for pattern, message in drug_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Drug/substance abuse content")
-        
-        # MENTAL HEALTH - Comprehensive detection
-        mental_health_patterns = [
-            (r'\bsuicide\b', "Suicide/self-harm content detected"),
-            (r'\bsuicidal\b', "Suicide/self-harm content detected"),
-            (r'\bself-harm\b', "Self-harm content detected"),
-            (r'\bself-harming\b', "Self-harm content detected"),
-            (r'\bdepression\b', "Mental health content detected"),
-            (r'\bdepressed\b', "Mental health content detected"),
-            (r'\banxiety\b', "Mental health content detected"),
-            (r'\banxious\b', "Mental health content detected"),
-            (r'\bmental health\b', "Mental health content detected"),
-            (r'\bmental illness\b', "Mental health content detected"),
-            (r'\bpsychiatric\b', "Mental health content detected"),
-            (r'\bpsychosis\b', "Mental health content detected"),
-            (r'\bbipolar\b', "Mental health content detected"),
-            (r'\bschizophrenia\b', "Mental health content detected"),
-            (r'\btrauma\b', "Mental health content detected"),
-            (r'\btraumatic\b', "Mental health content detected"),
-            (r'\bptsd\b', "Mental health content detected"),
-            (r'\bbreakdown\b', "Mental health content detected"),
-            (r'\bpsychology\b', "Mental health content detected"),
-            (r'\btherapy\b', "Mental health content detected"),
-            (r'\btherapist\b', "Mental health content detected"),
-            (r'\bcounseling\b', "Mental health content detected"),
-            (r'\bcounselor\b', "Mental health content detected"),
-            (r'\beating disorder\b', "Mental health content detected"),
-            (r'\banorexia\b', "Mental health content detected"),
-            (r'\bbulimia\b', "Mental health content detected"),
-            (r'\bself-injury\b', "Self-harm content detected"),
-            (r'\bcutting\b', "Self-harm content detected"),
-            (r'\bhopeless\b', "Mental health content detected"),
-            (r'\bdespair\b', "Mental health content detected"),
-            (r'\bmisery\b', "Mental health content detected"),
-        ]
-        
-        for pattern, message in mental_health_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Mental health/sensitive content")
-        
-        # HATE SPEECH AND DISCRIMINATION - Comprehensive detection
-        hate_patterns = [
-            (r'\bhate\b', "Hate speech detected"),
-            (r'\bhatred\b', "Hate speech detected"),
-            (r'\bracism\b', "Racist content detected"),
-            (r'\bracist\b', "Racist content detected"),
-            (r'\bdiscrimination\b', "Discriminatory content detected"),
-            (r'\bdiscriminatory\b', "Discriminatory content detected"),
-            (r'\bprejudice\b', "Prejudiced content detected"),
-            (r'\bbiased\b', "Biased content detected"),
-            (r'\bbias\b', "Biased content detected"),
-            (r'\boffensive\b', "Offensive content detected"),
-            (r'\boffend\b', "Offensive content detected"),
-            (r'\bslur\b', "Offensive content detected"),
-            (r'\bbigotry\b', "Hate speech detected"),
-            (r'\bbigot\b', "Hate speech detected"),
-            (r'\bxenophobia\b', "Hate speech detected"),
-            (r'\bxenophobic\b', "Hate speech detected"),
-            (r'\bhomophobia\b', "Hate speech detected"),
-            (r'\bhomophobic\b', "Hate speech detected"),
-            (r'\btransphobia\b', "Hate speech detected"),
-            (r'\btransphobic\b', "Hate speech detected"),
-            (r'\bsexism\b', "Discriminatory content detected"),
-            (r'\bsexist\b', "Discriminatory content detected"),
-            (r'\bmisogyny\b', "Discriminatory content detected"),
-            (r'\bmisogynistic\b', "Discriminatory content detected"),
-            (r'\bantisemitism\b', "Hate speech detected"),
-            (r'\banti-semitic\b', "Hate speech detected"),
-            (r'\bislamophobia\b', "Hate speech detected"),
-            (r'\bwhite supremacy\b', "Hate speech detected"),
-            (r'\bsupremacist\b', "Hate speech detected"),
-            (r'\bnazi\b', "Hate speech detected"),
-            (r'\bkkk\b', "Hate speech detected"),
-            (r'\bku klux klan\b', "Hate speech detected"),
-            (r'\bextremist\b', "Extremist content detected"),
-        ]
-        
-        for pattern, message in hate_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Hate speech/discriminatory content")
-        
-        # ADULT AND EXPLICIT CONTENT - Comprehensive detection
-        adult_patterns = [
-            (r'\bporn\b', "Pornographic content detected"),
-            (r'\bpornography\b', "Pornographic content detected"),
-            (r'\bpornographic\b', "Pornographic content detected"),
-            (r'\bxxx\b', "Adult content detected"),
-            (r'\bsex\b', "Sexual content detected"),
-            (r'\bsexual\b', "Sexual content detected"),
-            (r'\bsexy\b', "Sexual content detected"),
-            (r'\bnude\b', "Sexual content detected"),
-            (r'\bnudity\b', "Sexual content detected"),
-            (r'\bnaked\b', "Sexual content detected"),
-            (r'\bexplicit\b', "Explicit content detected"),
-            (r'\badult\b', "Adult content detected"),
-            (r'\bmature\b', "Adult content detected"),
-            (r'\berotic\b', "Adult content detected"),
-            (r'\berotica\b', "Adult content detected"),
-            (r'\bobscene\b', "Obscene content detected"),
-            (r'\bobscenity\b', "Obscene content detected"),
-            (r'\bvulgar\b', "Vulgar content detected"),
-            (r'\bvulgarity\b', "Vulgar content detected"),
-            (r'\blewd\b', "Adult content detected"),
-            (r'\bindecent\b', "Adult content detected"),
-            (r'\bprostitute\b', "Adult content detected"),
-            (r'\bprostitution\b', "Adult content detected"),
-            (r'\bescort\b', "Adult content detected"),
-            (r'\bstripper\b', "Adult content detected"),
-            (r'\bstripping\b', "Adult content detected"),
-            (r'\bbrothel\b', "Adult content detected"),
-            (r'\borgy\b', "Adult content detected"),
-            (r'\borgies\b', "Adult content detected"),
-            (r'\bmasturbation\b', "Adult content detected"),
-            (r'\bfetish\b', "Adult content detected"),
-            (r'\bbdsm\b', "Adult content detected"),
-            (r'\bbondage\b', "Adult content detected"),
-            (r'\bdominance\b', "Adult content detected"),
-            (r'\bsubmission\b', "Adult content detected"),
-            (r'\bsadism\b', "Adult content detected"),
-            (r'\bmasochism\b', "Adult content detected"),
-        ]
-        
-        for pattern, message in adult_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Adult/explicit content")
-        
-        # TERRORISM AND EXTREMISM - Comprehensive detection
-        terror_patterns = [
-            (r'\bterror\b', "Terrorism content detected"),
-            (r'\bterrorist\b', "Terrorism content detected"),
-            (r'\bterrorism\b', "Terrorism content detected"),
-            (r'\bextremist\b', "Extremist content detected"),
-            (r'\bradical\b', "Extremist content detected"),
-            (r'\bradicalization\b', "Extremist content detected"),
-            (r'\bbomb\b', "Violent/terrorism content detected"),
-            (r'\bbombing\b', "Violent/terrorism content detected"),
-            (r'\bexplosive\b', "Violent/terrorism content detected"),
-            (r'\bexplosion\b', "Violent/terrorism content detected"),
-            (r'\bdetonate\b', "Violent/terrorism content detected"),
-            (r'\bdetonation\b', "Violent/terrorism content detected"),
-            (r'\bjihad\b', "Extremist content detected"),
-            (r'\bjihadist\b', "Extremist content detected"),
-            (r'\bisis\b', "Terrorist organization detected"),
-            (r'\bisil\b', "Terrorist organization detected"),
-            (r'\bal-qaeda\b', "Terrorist organization detected"),
-            (r'\btaliban\b', "Terrorist organization detected"),
-            (r'\bsuicide bomb\b', "Terrorism content detected"),
-            (r'\bsuicide bombing\b', "Terrorism content detected"),
-            (r'\bmartyr\b', "Extremist content detected"),
-            (r'\bmartyrdom\b', "Extremist content detected"),
-            (r'\bhijack\b', "Terrorism content detected"),
-            (r'\bhijacking\b', "Terrorism content detected"),
-            (r'\bhostage\b', "Terrorism content detected"),
-            (r'\bkidnap\b', "Terrorism content detected"),
-            (r'\bkidnapping\b', "Terrorism content detected"),
-            (r'\bbeheading\b', "Violent/terrorism content detected"),
-            (r'\bexecution\b', "Violent/terrorism content detected"),
-            (r'\bmassacre\b', "Violent/terrorism content detected"),
+        for bundle in self.sensitive_bundles:
+            issues.extend(bundle.find_messages(text))
+        return issues
+    
+    def _get_alcohol_patterns(self):
+        """Get alcohol-specific patterns grouped by category, with their issue templates"""
+        return [
+            # Health claims for alcohol
+            ("alcohol_health", "HARD FAIL: {message} for alcohol (Appendix B)", [
+                (r'\bhealthy\b', "Health claim for alcohol"),
+                (r'\bgood\s+for\s+you\b', "Health benefit claim"),
+                (r'\bbenefits\b', "Benefit claims not allowed"),
+                (r'\bimprove\b.*\bhealth\b', "Health improvement claim"),
+                (r'\bmedical\b.*\bbenefits\b', "Medical benefits claim"),
+                (r'\bwellness\b', "Wellness claim"),
+                (r'\bnutritious\b', "Nutrition claim"),
+                (r'\bvitamin\b', "Vitamin content claim"),
+            ]),
+            
+            # Encouragement patterns
+            ("alcohol_encouragement", "HARD FAIL: {message} not allowed for alcohol (Appendix B)", [
+                (r'\bcelebrate\b', "Encouragement of consumption"),
+                (r'\bparty\b', "Social encouragement"),
+                (r'\bdrink\s+up\b', "Encouragement of consumption"),
+                (r'\benjoy\s+more\b', "Encouragement of consumption"),
+                (r'\bcheers\b', "Encouragement of consumption"),
+                (r'\btoast\b', "Encouragement of consumption"),
+                (r'\bfestive\b', "Social encouragement"),
+                (r'\bsocial\s+gathering\b', "Social encouragement"),
+                (r'\bget\s+the\s+party\s+started\b', "Party encouragement"),
+                (r'\bperfect\s+for\s+parties\b', "Party encouragement"),
+                (r'\bget\s+drunk\b', "Encouragement of excessive consumption"),
+                (r'\bintoxicated\b', "Encouragement of excessive consumption"),
+                (r'\bbinge\b', "Encouragement of excessive consumption"),
+                (r'\bhammered\b', "Encouragement of excessive consumption"),
+                (r'\bwasted\b', "Encouragement of excessive consumption"),
+                (r'\bsmashed\b', "Encouragement of excessive consumption"),
+                (r'\bplastered\b', "Encouragement of excessive consumption"),
+            ]),
         ]
-        
-        for pattern, message in terror_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Terrorism/extremist content")
-        
-        # GAMBLING AND BETTING - Comprehensive detection
-        gambling_patterns = [
-            (r'\bgambling\b', "Gambling content detected"),
-            (r'\bgamble\b', "Gambling content detected"),
-            (r'\bbet\b', "Gambling content detected"),
-            (r'\bbetting\b', "Gambling content detected"),
-            (r'\bwager\b', "Gambling content detected"),
-            (r'\bwagering\b', "Gambling content detected"),
-            (r'\bcasino\b', "Gambling content detected"),
-            (r'\bpoker\b', "Gambling content detected"),
-            (r'\bblackjack\b', "Gambling content detected"),
-            (r'\broulette\b', "Gambling content detected"),
-            (r'\bslot machine\b', "Gambling content detected"),
-            (r'\bslots\b', "Gambling content detected"),
-            (r'\blottery\b', "Gambling content detected"),
-            (r'\blotto\b', "Gambling content detected"),
-            (r'\bbingo\b', "Gambling content detected"),
-            (r'\bscratch card\b', "Gambling content detected"),
-            (r'\bsports betting\b', "Gambling content detected"),
-            (r'\bbookmaker\b', "Gambling content detected"),
-            (r'\bbookie\b', "Gambling content detected"),
-            (r'\bodds\b', "Gambling content detected"),
-            (r'\bstakes\b', "Gambling content detected"),
-            (r'\bjackpot\b', "Gambling content detected"),
-            (r'\bpayout\b', "Gambling content detected"),
-            (r'\bwinnings\b', "Gambling content detected"),
+    
+    def _get_sensitive_content_patterns(self):
+        """Get sensitive content patterns grouped by category, with their issue templates"""
+        return [
+            # VIOLENCE AND CRIME - Comprehensive detection
+            ("violence", "HARD FAIL: {message} - Violent/inappropriate content", [
+                (r'\bmurder\b', "Violent content (murder) detected"),
+                (r'\bkill\b', "Violent content (kill) detected"),
+                (r'\bkilling\b', "Violent content (killing) detected"),
+                (r'\bdeath\b', "Violent/sensitive content (death) detected"),
+                (r'\bdead\b', "Violent/sensitive content (dead) detected"),
+                (r'\bdie\b', "Violent/sensitive content (die) detected"),
+                (r'\bdying\b', "Violent/sensitive content (dying) detected"),
+                (r'\bviolence\b', "Violent content detected"),
+                (r'\bviolent\b', "Violent content detected"),
+                (r'\bweapon\b', "Weapon/violent content detected"),
+                (r'\bgun\b', "Weapon/violent content detected"),
+                (r'\bknife\b', "Weapon/violent content detected"),
+                (r'\battack\b', "Violent content detected"),
+                (r'\bassault\b', "Violent content detected"),
+                (r'\bharm\b', "Violent content detected"),
+                (r'\bharmful\b', "Violent content detected"),
+                (r'\bdanger\b', "Dangerous content detected"),
+                (r'\bdangerous\b', "Dangerous content detected"),
+                (r'\bunsafe\b', "Unsafe content detected"),
+                (r'\bthreat\b', "Threatening content detected"),
+                (r'\bthreatening\b', "Threatening content detected"),
+                (r'\bbrutal\b', "Violent content detected"),
+                (r'\bbrutality\b', "Violent content detected"),
+                (r'\baggression\b', "Violent content detected"),
+                (r'\baggressive\b', "Violent content detected"),
+                (r'\bfight\b', "Violent content detected"),
+                (r'\bfighting\b', "Violent content detected"),
+                (r'\bwar\b', "Violent content detected"),
+                (r'\bbattle\b', "Violent content detected"),
+                (r'\bcombat\b', "Violent content detected"),
+                (r'\bshoot\b', "Violent content detected"),
+                (r'\bshooting\b', "Violent content detected"),
+                (r'\bstab\b', "Violent content detected"),
+                (r'\bstabbing\b', "Violent content detected"),
+                (r'\bhit\b', "Violent content detected"),
+                (r'\bhitting\b', "Violent content detected"),
+                (r'\bpunch\b', "Violent content detected"),
+                (r'\bpunching\b', "Violent content detected"),
+                (r'\bbeat\b', "Violent content detected"),
+                (r'\bbeating\b', "Violent content detected"),
+                (r'\babuse\b', "Abusive/violent content detected"),
+                (r'\babusive\b', "Abusive content detected"),
+            ]),
+            
+            # ILLEGAL ACTIVITIES - Comprehensive detection
+            ("illegal", "HARD FAIL: {message} - Illegal/inappropriate content", [
+                (r'\billegal\b', "Illegal activity reference detected"),
+                (r'\bcrime\b', "Criminal activity reference detected"),
+                (r'\bcriminal\b', "Criminal activity reference detected"),
+                (r'\bfelony\b', "Criminal activity reference detected"),
+                (r'\btheft\b', "Criminal activity reference detected"),
+                (r'\bsteal\b', "Criminal activity reference detected"),
+                (r'\bstealing\b', "Criminal activity reference detected"),
+                (r'\brobbery\b', "Criminal activity reference detected"),
+                (r'\bburglary\b', "Criminal activity reference detected"),
+                (r'\bfraud\b', "Fraudulent activity detected"),
+                (r'\bscam\b', "Fraudulent activity detected"),
+                (r'\bcheat\b', "Dishonest activity detected"),
+                (r'\bcheating\b', "Dishonest activity detected"),
+                (r'\bdeceive\b', "Dishonest activity detected"),
+                (r'\bdeception\b', "Dishonest activity detected"),
+                (r'\bmislead\b', "Dishonest activity detected"),
+                (r'\bfalse\b', "False claims detected"),
+                (r'\bfake\b', "Counterfeit/fake content detected"),
+                (r'\bcounterfeit\b', "Counterfeit content detected"),
+                (r'\bforgery\b', "Illegal activity detected"),
+                (r'\bpirate\b', "Illegal activity detected"),
+                (r'\bpiracy\b', "Illegal activity detected"),
+                (r'\bblack market\b', "Illegal activity detected"),
+                (r'\bcontraband\b', "Illegal activity detected"),
+                (r'\bsmuggle\b', "Illegal activity detected"),
+                (r'\bsmuggling\b', "Illegal activity detected"),
+                (r'\bbribe\b', "Illegal activity detected"),
+                (r'\bbribery\b', "Illegal activity detected"),
+                (r'\bcorruption\b', "Illegal activity detected"),
+                (r'\bcorrupt\b', "Illegal activity detected"),
+            ]),
+            
+            # DRUGS AND SUBSTANCE ABUSE - Comprehensive detection
+            ("drugs", "HARD FAIL: {message} - Drug/substance abuse content", [
+                (r'\bdrug\b', "Drug reference detected"),
+                (r'\bdrugs\b', "Drug reference detected"),
+                (r'\bnarcotic\b', "Drug reference detected"),
+                (r'\bcocaine\b', "Illegal drug reference detected"),
+                (r'\bheroin\b', "Illegal drug reference detected"),
+                (r'\bmarijuana\b', "Drug reference detected"),
+                (r'\bcannabis\b', "Drug reference detected"),
+                (r'\bopioid\b', "Drug reference detected"),
+                (r'\bmeth\b', "Illegal drug reference detected"),
+                (r'\bmethamphetamine\b', "Illegal drug reference detected"),
+                (r'\bamphetamine\b', "Drug reference detected"),
+                (r'\becstasy\b', "Illegal drug reference detected"),
+                (r'\bmdma\b', "Illegal drug reference detected"),
+                (r'\blsd\b', "Illegal drug reference detected"),
+                (r'\bacid\b', "Illegal drug reference detected"),
+                (r'\bpsychedelic\b', "Drug reference detected"),
+                (r'\bhallucinogen\b', "Drug reference detected"),
+                (r'\bstimulant\b', "Drug reference detected"),
+                (r'\bdepressant\b', "Drug reference detected"),
+                (r'\babuse\b', "Substance abuse reference detected"),
+                (r'\baddiction\b', "Addiction reference detected"),
+                (r'\baddictive\b', "Addiction reference detected"),
+                (r'\bintoxication\b', "Substance abuse reference detected"),
+                (r'\bintoxicated\b', "Substance abuse reference detected"),
+                (r'\bdrunk\b', "Substance abuse reference detected"),
+                (r'\bdrunkenness\b', "Substance abuse reference detected"),
+                (r'\boverdose\b', "Substance abuse reference detected"),
+                (r'\bwithdrawal\b', "Substance abuse reference detected"),
+                (r'\brehab\b', "Substance abuse reference detected"),
+                (r'\brehabilitation\b', "Substance abuse reference detected"),
+                (r'\bsubstance\b', "Substance abuse reference detected"),
+                (r'\bnarcotics\b', "Drug reference detected"),
+            ]),
+            
+            # MENTAL HEALTH - Comprehensive detection
+            ("mental_health", "HARD FAIL: {message} - Mental health/sensitive content", [
+                (r'\bsuicide\b', "Suicide/self-harm content detected"),
+                (r'\bsuicidal\b', "Suicide/self-harm content detected"),
+                (r'\bself-harm\b', "Self-harm content detected"),
+                (r'\bself-harming\b', "Self-harm content detected"),
+                (r'\bdepression\b', "Mental health content detected"),
+                (r'\bdepressed\b', "Mental health content detected"),
+                (r'\banxiety\b', "Mental health content detected"),
+                (r'\banxious\b', "Mental health content detected"),
+                (r'\bmental health\b', "Mental health content detected"),
+                (r'\bmental illness\b', "Mental health content detected"),
+                (r'\bpsychiatric\b', "Mental health content detected"),
+                (r'\bpsychosis\b', "Mental health content detected"),
+                (r'\bbipolar\b', "Mental health content detected"),
+                (r'\bschizophrenia\b', "Mental health content detected"),
+                (r'\btrauma\b', "Mental health content detected"),
+                (r'\btraumatic\b', "Mental health content detected"),
+                (r'\bptsd\b', "Mental health content detected"),
+                (r'\bbreakdown\b', "Mental health content detected"),
+                (r'\bpsychology\b', "Mental health content detected"),
+                (r'\btherapy\b', "Mental health content detected"),
+                (r'\btherapist\b', "Mental health content detected"),
+                (r'\bcounseling\b', "Mental health content detected"),
+                (r'\bcounselor\b', "Mental health content detected"),
+                (r'\beating disorder\b', "Mental health content detected"),
+                (r'\banorexia\b', "Mental health content detected"),
+                (r'\bbulimia\b', "Mental health content detected"),
+                (r'\bself-injury\b', "Self-harm content detected"),
+                (r'\bcutting\b', "Self-harm content detected"),
+                (r'\bhopeless\b', "Mental health content detected"),
+                (r'\bdespair\b', "Mental health content detected"),
+                (r'\bmisery\b', "Mental health content detected"),
+            ]),
+            
+            # HATE SPEECH AND DISCRIMINATION - Comprehensive detection
+            ("hate_speech", "HARD FAIL: {message} - Hate speech/discriminatory content", [
+                (r'\bhate\b', "Hate speech detected"),
+                (r'\bhatred\b', "Hate speech detected"),
+                (r'\bracism\b', "Racist content detected"),
+                (r'\bracist\b', "Racist content detected"),
+                (r'\bdiscrimination\b', "Discriminatory content detected"),
+                (r'\bdiscriminatory\b', "Discriminatory content detected"),
+                (r'\bprejudice\b', "Prejudiced content detected"),
+                (r'\bbiased\b', "Biased content detected"),
+                (r'\bbias\b', "Biased content detected"),
+                (r'\boffensive\b', "Offensive content detected"),
+                (r'\boffend\b', "Offensive content detected"),
+                (r'\bslur\b', "Offensive content detected"),
+                (r'\bbigotry\b', "Hate speech detected"),
+                (r'\bbigot\b', "Hate speech detected"),
+                (r'\bxenophobia\b', "Hate speech detected"),
+                (r'\bxenophobic\b', "Hate speech detected"),
+                (r'\bhomophobia\b', "Hate speech detected"),
+                (r'\bhomophobic\b', "Hate speech detected"),
+                (r'\btransphobia\b', "Hate speech detected"),
+                (r'\btransphobic\b', "Hate speech detected"),
+                (r'\bsexism\b', "Discriminatory content detected"),
+                (r'\bsexist\b', "Discriminatory content detected"),
+                (r'\bmisogyny\b', "Discriminatory content detected"),
+                (r'\bmisogynistic\b', "Discriminatory content detected"),
+                (r'\bantisemitism\b', "Hate speech detected"),
+                (r'\banti-semitic\b', "Hate speech detected"),
+                (r'\bislamophobia\b', "Hate speech detected"),
+                (r'\bwhite supremacy\b', "Hate speech detected"),
+                (r'\bsupremacist\b', "Hate speech detected"),
+                (r'\bnazi\b', "Hate speech detected"),
+                (r'\bkkk\b', "Hate speech detected"),
+                (r'\bku klux klan\b', "Hate speech detected"),
+                (r'\bextremist\b', "Extremist content detected"),
+            ]),
+            
+            # ADULT AND EXPLICIT CONTENT - Comprehensive detection
+            ("adult", "HARD FAIL: {message} - Adult/explicit content", [
+                (r'\bporn\b', "Pornographic content detected"),
+                (r'\bpornography\b', "Pornographic content detected"),
+                (r'\bpornographic\b', "Pornographic content detected"),
+                (r'\bxxx\b', "Adult content detected"),
+                (r'\bsex\b', "Sexual content detected"),
+                (r'\bsexual\b', "Sexual content detected"),
+                (r'\bsexy\b', "Sexual content detected"),
+                (r'\bnude\b', "Sexual content detected"),
+                (r'\bnudity\b', "Sexual content detected"),
+                (r'\bnaked\b', "Sexual content detected"),
+                (r'\bexplicit\b', "Explicit content detected"),
+                (r'\badult\b', "Adult content detected"),
+                (r'\bmature\b', "Adult content detected"),
+                (r'\berotic\b', "Adult content detected"),
+                (r'\berotica\b', "Adult content detected"),
+                (r'\bobscene\b', "Obscene content detected"),
+                (r'\bobscenity\b', "Obscene content detected"),
+                (r'\bvulgar\b', "Vulgar content detected"),
+                (r'\bvulgarity\b', "Vulgar content detected"),
+                (r'\blewd\b', "Adult content detected"),
+                (r'\bindecent\b', "Adult content detected"),
+                (r'\bprostitute\b', "Adult content detected"),
+                (r'\bprostitution\b', "Adult content detected"),
+                (r'\bescort\b', "Adult content detected"),
+                (r'\bstripper\b', "Adult content detected"),
+                (r'\bstripping\b', "Adult content detected"),
+                (r'\bbrothel\b', "Adult content detected"),
+                (r'\borgy\b', "Adult content detected"),
+                (r'\borgies\b', "Adult content detected"),
+                (r'\bmasturbation\b', "Adult content detected"),
+                (r'\bfetish\b', "Adult content detected"),
+                (r'\bbdsm\b', "Adult content detected"),
+                (r'\bbondage\b', "Adult content detected"),
+                (r'\bdominance\b', "Adult content detected"),
+                (r'\bsubmission\b', "Adult content detected"),
+                (r'\bsadism\b', "Adult content detected"),
+                (r'\bmasochism\b', "Adult content detected"),
+            ]),
+            
+            # TERRORISM AND EXTREMISM - Comprehensive detection
+            ("terrorism", "HARD FAIL: {message} - Terrorism/extremist content", [
+                (r'\bterror\b', "Terrorism content detected"),
+                (r'\bterrorist\b', "Terrorism content detected"),
+                (r'\bterrorism\b', "Terrorism content detected"),
+                (r'\bextremist\b', "Extremist content detected"),
+                (r'\bradical\b', "Extremist content detected"),
+                (r'\bradicalization\b', "Extremist content detected"),
+                (r'\bbomb\b', "Violent/terrorism content detected"),
+                (r'\bbombing\b', "Violent/terrorism content detected"),
+                (r'\bexplosive\b', "Violent/terrorism content detected"),
+                (r'\bexplosion\b', "Violent/terrorism content detected"),
+                (r'\bdetonate\b', "Violent/terrorism content detected"),
+                (r'\bdetonation\b', "Violent/terrorism content detected"),
+                (r'\bjihad\b', "Extremist content detected"),
+                (r'\bjihadist\b', "Extremist content detected"),
+                (r'\bisis\b', "Terrorist organization detected"),
+                (r'\bisil\b', "Terrorist organization detected"),
+                (r'\bal-qaeda\b', "Terrorist organization detected"),
+                (r'\btaliban\b', "Terrorist organization detected"),
+                (r'\bsuicide bomb\b', "Terrorism content detected"),
+                (r'\bsuicide bombing\b', "Terrorism content detected"),
+                (r'\bmartyr\b', "Extremist content detected"),
+                (r'\bmartyrdom\b', "Extremist content detected"),
+                (r'\bhijack\b', "Terrorism content detected"),
+                (r'\bhijacking\b', "Terrorism content detected"),
+                (r'\bhostage\b', "Terrorism content detected"),
+                (r'\bkidnap\b', "Terrorism content detected"),
+                (r'\bkidnapping\b', "Terrorism content detected"),
+                (r'\bbeheading\b', "Violent/terrorism content detected"),
+                (r'\bexecution\b', "Violent/terrorism content detected"),
+                (r'\bmassacre\b', "Violent/terrorism content detected"),
+            ]),
+            
+            # GAMBLING AND BETTING - Comprehensive detection
+            ("gambling", "HARD FAIL: {message} - Gambling content", [
+                (r'\bgambling\b', "Gambling content detected"),
+                (r'\bgamble\b', "Gambling content detected"),
+                (r'\bbet\b', "Gambling content detected"),
+                (r'\bbetting\b', "Gambling content detected"),
+                (r'\bwager\b', "Gambling content detected"),
+                (r'\bwagering\b', "Gambling content detected"),
+                (r'\bcasino\b', "Gambling content detected"),
+                (r'\bpoker\b', "Gambling content detected"),
+                (r'\bblackjack\b', "Gambling content detected"),
+                (r'\broulette\b', "Gambling content detected"),
+                (r'\bslot machine\b', "Gambling content detected"),
+                (r'\bslots\b', "Gambling content detected"),
+                (r'\blottery\b', "Gambling content detected"),
+                (r'\blotto\b', "Gambling content detected"),
+                (r'\bbingo\b', "Gambling content detected"),
+                (r'\bscratch card\b', "Gambling content detected"),
+                (r'\bsports betting\b', "Gambling content detected"),
+                (r'\bbookmaker\b', "Gambling content detected"),
+                (r'\bbookie\b', "Gambling content detected"),
+                (r'\bodds\b', "Gambling content detected"),
+                (r'\bstakes\b', "Gambling content detected"),
+                (r'\bjackpot\b', "Gambling content detected"),
+                (r'\bpayout\b', "Gambling content detected"),
+                (r'\bwinnings\b', "Gambling content detected"),
+            ]),
         ]
-        
-        for pattern, message in gambling_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                issues.append(f"HARD FAIL: {message} - Gambling content")
-        
-        return issues
     
     def get_rule_description(self, term):
         """Get the specific rule description for forbidden terms"""
@@ -785,93 +1231,178 @@ class AdvancedComplianceEngine:
     
     def validate_creative_design(self, creative_data, format_name):
         """Validate creative design against Appendix A & B guidelines - EXACT problem statement"""
-        issues = []
-        warnings = []
-        hard_fails = []
+        return self.merge_design_results(
+            self.validate_format_rules(format_name),
+            self.validate_shared_design(creative_data)
+        )
+    
+    def validate_format_rules(self, format_name):
+        """Format-specific design rules (safe zones) - the only checks that vary per format"""
+        return self.design_result(self.format_rule_violations(format_name))
+    
+    def validate_shared_design(self, creative_data):
+        """Format-independent design rules, evaluated once per creative"""
+        return self.design_result(self.shared_design_violations(creative_data))
+    
+    def design_result(self, violations):
+        """Render design violation records as the hard_fails/warnings result"""
+        return {
+            "hard_fails": self.render_violations(v for v in violations if v.is_hard_fail),
+            "warnings": self.render_violations(v for v in violations if not v.is_hard_fail)
+        }
+    
+    def format_rule_violations(self, format_name):
+        """Violation records for the format-specific design rules"""
+        violations = []
         
         # Appendix B HARD FAIL: Safe zones for 9:16 format (Facebook/Instagram Stories ONLY)
         if "1080x1920" in format_name or "9:16" in format_name:
-            hard_fails.append("HARD FAIL: 9:16 format - leave 200px top and 250px bottom free from text/logos")
+            violations.append(self.rule_violation("format.safe_zone_9_16"))
+        
+        return violations
+    
+    def shared_design_violations(self, creative_data):
+        """Violation records for the format-independent design rules"""
+        violations = []
         
         # Appendix B HARD FAIL: Font size requirements
-        min_sizes = self.hard_rules["design_rules"]["min_font_sizes"]
-        hard_fails.append(f"HARD FAIL: Minimum font sizes - Headline ≥{min_sizes['headline']}px, Subhead ≥{min_sizes['subhead']}px")
+        violations.append(self.rule_violation("design.min_font_sizes"))
         
         # Appendix B HARD FAIL: Alcohol-specific requirements
         if creative_data.get('product_category', '').lower() == 'alcohol':
             if not creative_data.get('include_drinkaware', False):
-                hard_fails.append("HARD FAIL: Drinkaware required for alcohol campaigns")
+                violations.append(self.rule_violation("design.drinkaware_required"))
             else:
                 # Check Drinkaware specific requirements
-                hard_fails.extend([
-                    "HARD FAIL: Drinkaware - sufficient contrast from background",
-                    "HARD FAIL: Drinkaware - all-black or all-white only", 
-                    "HARD FAIL: Drinkaware - minimum 20px height (12px for SAYS)"
+                violations.extend([
+                    self.rule_violation("design.drinkaware_contrast"),
+                    self.rule_violation("design.drinkaware_colour"),
+                    self.rule_violation("design.drinkaware_height")
                 ])
         
         # Appendix A: Value tile validation
         if creative_data.get('value_tile_type') and creative_data.get('value_tile_type') != 'None':
             # Appendix B HARD FAIL: No overlapping elements
-            hard_fails.append("HARD FAIL: Content cannot overlay value tile")
+            violations.append(self.rule_violation("design.value_tile_overlay"))
             
             # Appendix A: Position validation
             if creative_data.get('value_tile_type') == 'Everyday Low Price':
-                warnings.append("LEP must be positioned to right of packshot")
+                violations.append(self.rule_violation("design.lep_position"))
         
         # Appendix A HARD FAIL: Clubcard end date validation
         if creative_data.get('value_tile_type') == 'Clubcard Price':
             if not creative_data.get('clubcard_end_date'):
-                hard_fails.append("HARD FAIL: End date (DD/MM) required for Clubcard Price tiles")
+                violations.append(self.rule_violation("design.clubcard_end_date_required"))
             else:
                 # Validate DD/MM format
                 end_date = creative_data.get('clubcard_end_date', '')
                 if not re.match(r'^\d{2}/\d{2}$', end_date):
-                    hard_fails.append("HARD FAIL: Clubcard end date must be in DD/MM format (e.g., 23/06)")
+                    violations.append(self.rule_violation("design.clubcard_end_date_format"))
         
         # Appendix A & B: Tag validation
         if creative_data.get('creative_links_to_tesco', True):
             if not creative_data.get('tag_type') or creative_data.get('tag_type') == 'None':
-                hard_fails.append("HARD FAIL: Tesco tag required when creative links to Tesco")
+                violations.append(self.rule_violation("design.tag_required"))
             else:
-                allowed_tags = self.hard_rules["allowed_tags"]
+                allowed_tags = self._hard_rules["allowed_tags"]
                 if creative_data.get('tag_type') not in allowed_tags:
-                    hard_fails.append("HARD FAIL: Only approved Tesco tags allowed")
+                    violations.append(self.rule_violation("design.tag_not_approved"))
         
         # Appendix A: Packshot validation
         packshots = creative_data.get('packshots', [])
         if len(packshots) == 0:
-            hard_fails.append("HARD FAIL: At least one packshot required - lead product required")
+            violations.append(self.rule_violation("design.packshot_required"))
         elif len(packshots) > 3:
-            hard_fails.append("HARD FAIL: Maximum 3 packshots allowed")
+            violations.append(self.rule_violation("design.packshot_limit"))
         
         # Appendix B HARD FAIL: Packshot positioning and safe zones
         if len(packshots) > 0:
-            hard_fails.extend([
-                "HARD FAIL: Packshot positioning - closest element to CTA",
-                "HARD FAIL: Packshot safe zone - minimum gap requirements"
+            violations.extend([
+                self.rule_violation("design.packshot_position"),
+                self.rule_violation("design.packshot_safe_zone")
             ])
         
         # Appendix A: CTA validation
         if creative_data.get('cta'):
-            hard_fails.append("HARD FAIL: No CTA allowed in creatives")
+            violations.append(self.rule_violation("design.no_cta"))
         
+        return violations
+    
+    def _get_design_rules(self):
+        """Get design rules as (key, category, severity, message)"""
+        min_sizes = self._hard_rules["design_rules"]["min_font_sizes"]
+        return [
+            ("format.safe_zone_9_16", "safe_zone", SEVERITY_HARD_FAIL,
+             "HARD FAIL: 9:16 format - leave 200px top and 250px bottom free from text/logos"),
+            ("design.min_font_sizes", "typography", SEVERITY_HARD_FAIL,
+             f"HARD FAIL: Minimum font sizes - Headline ≥{min_sizes['headline']}px, Subhead ≥{min_sizes['subhead']}px"),
+            ("design.drinkaware_required", "drinkaware", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Drinkaware required for alcohol campaigns"),
+            ("design.drinkaware_contrast", "drinkaware", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Drinkaware - sufficient contrast from background"),
+            ("design.drinkaware_colour", "drinkaware", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Drinkaware - all-black or all-white only"),
+            ("design.drinkaware_height", "drinkaware", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Drinkaware - minimum 20px height (12px for SAYS)"),
+            ("design.value_tile_overlay", "value_tile", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Content cannot overlay value tile"),
+            ("design.lep_position", "value_tile", SEVERITY_WARNING,
+             "LEP must be positioned to right of packshot"),
+            ("design.clubcard_end_date_required", "value_tile", SEVERITY_HARD_FAIL,
+             "HARD FAIL: End date (DD/MM) required for Clubcard Price tiles"),
+            ("design.clubcard_end_date_format", "value_tile", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Clubcard end date must be in DD/MM format (e.g., 23/06)"),
+            ("design.tag_required", "tag", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Tesco tag required when creative links to Tesco"),
+            ("design.tag_not_approved", "tag", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Only approved Tesco tags allowed"),
+            ("design.packshot_required", "packshot", SEVERITY_HARD_FAIL,
+             "HARD FAIL: At least one packshot required - lead product required"),
+            ("design.packshot_limit", "packshot", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Maximum 3 packshots allowed"),
+            ("design.packshot_position", "packshot", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Packshot positioning - closest element to CTA"),
+            ("design.packshot_safe_zone", "packshot", SEVERITY_HARD_FAIL,
+             "HARD FAIL: Packshot safe zone - minimum gap requirements"),
+            ("design.no_cta", "cta", SEVERITY_HARD_FAIL,
+             "HARD FAIL: No CTA allowed in creatives"),
+            ("layout.safe_zone", "safe_zone", SEVERITY_HARD_FAIL,
+             "HARD FAIL: 9:16 format - {detail}"),
+            ("layout.value_tile_overlap", "value_tile", SEVERITY_HARD_FAIL,
+             "HARD FAIL: {detail} overlaps the value tile - nothing can overlay the value tile"),
+        ]
+    
+    def merge_design_results(self, format_result, shared_result):
+        """Combine format-specific and shared design results into one design report"""
+        hard_fails = format_result["hard_fails"] + shared_result["hard_fails"]
+        warnings = format_result["warnings"] + shared_result["warnings"]
         return {
             "valid": len(hard_fails) == 0,
-            "issues": issues + hard_fails + warnings,
+            "issues": hard_fails + warnings,
             "warnings": warnings,
             "hard_fails": hard_fails
         }
     
+    def audit_context(self, creative_data):
+        """Create an AuditContext that shares format-independent results across formats"""
+        return AuditContext(self, creative_data)
+    
     def full_creative_audit(self, creative_data, format_name):
         """Complete creative audit with detailed Appendix A & B reporting"""
-        text_audit = self.check_text_compliance(
-            creative_data.get('headline', ''),
-            creative_data.get('subhead', ''),
-            creative_data.get('product_category', 'general')
-        )
-        
-        design_audit = self.validate_creative_design(creative_data, format_name)
-        
+        return self.audit_context(creative_data).format_report(format_name)
+    
+    def full_campaign_audit(self, creative_data, format_names):
+        """Audit one creative for every format, running each format-independent check once"""
+        context = self.audit_context(creative_data)
+        return {format_name: context.format_report(format_name) for format_name in format_names}
+    
+    def full_campaign_violations(self, creative_data, format_names):
+        """Campaign audit as violation records per format, without rendering any text"""
+        context = self.audit_context(creative_data)
+        return {format_name: context.violations(format_name) for format_name in format_names}
+    
+    def build_audit_report(self, text_audit, design_audit):
+        """Merge text and design results into the full audit report"""
         all_hard_fails = text_audit["issues"] + design_audit["hard_fails"]
         passed = len(all_hard_fails) == 0
         
@@ -895,13 +1426,16 @@ class AdvancedComplianceEngine:
         }
     
     def check_safe_zones(self, format_name, element_positions):
-        """Check 9:16 safe zone compliance - Appendix B HARD FAIL"""
+        """Check 9:16 safe zone compliance - Appendix B HARD FAIL
+        
+        element_positions maps element names to {"y", "height"}, e.g. Scene.element_positions().
+        """
         issues = []
         
         # ONLY apply to Facebook/Instagram Stories 1080x1920px - 9:16 Ratio
         if "1080x1920" in format_name or "9:16" in format_name:
-            safe_top = 200
-            safe_bottom = 250
+            safe_top = self._hard_rules["design_rules"]["safe_zones"]["9:16"]["top"]
+            safe_bottom = self._hard_rules["design_rules"]["safe_zones"]["9:16"]["bottom"]
             
             for element, position in element_positions.items():
                 y_position = position.get('y', 0)
@@ -912,7 +1446,7 @@ class AdvancedComplianceEngine:
                     issues.append(f"HARD FAIL: {element} violates top 200px safe zone")
                 
                 # Check bottom safe zone
-                if y_position + height > (1080 - safe_bottom):
+                if y_position + height > (1920 - safe_bottom):
                     issues.append(f"HARD FAIL: {element} violates bottom 250px safe zone")
         
         return {
@@ -920,7 +1454,40 @@ class AdvancedComplianceEngine:
             "issues": issues
         }
     
-    def analyze_headline_subhead(self, headline, subhead, product_category):
+    def layout_violations(self, format_name, boxes):
+        """Violation records for a laid-out creative, checked on geometry before anything is drawn
+        
+        boxes maps element names to (left, top, right, bottom) in format pixels, as
+        returned by Scene.boxes(). Packshots and the background are exempt from the
+        9:16 text/logo safe zones; nothing may overlap the value tile.
+        """
+        violations = []
+        elements = {name: box for name, box in boxes.items() if name != "background"}
+        
+        # Appendix B HARD FAIL: 9:16 safe zones for text and logos
+        if "1080x1920" in format_name or "9:16" in format_name:
+            safe_zone = self._hard_rules["design_rules"]["safe_zones"]["9:16"]
+            for name, (_, top, _, bottom) in elements.items():
+                if name.startswith("packshot"):
+                    continue
+                if top < safe_zone["top"]:
+                    violations.append(self.rule_violation(
+                        "layout.safe_zone", f"{name} is inside the top {safe_zone['top']}px"))
+                if bottom > 1920 - safe_zone["bottom"]:
+                    violations.append(self.rule_violation(
+                        "layout.safe_zone", f"{name} is inside the bottom {safe_zone['bottom']}px"))
+        
+        # Appendix B HARD FAIL: Content cannot overlay value tile
+        tile = elements.get("value_tile")
+        if tile is not None:
+            for name, box in elements.items():
+                if (name != "value_tile" and box[0] < tile[2] and tile[0] < box[2]
+                        and box[1] < tile[3] and tile[1] < box[3]):
+                    violations.append(self.rule_violation("layout.value_tile_overlap", name))
+        
+        return violations
+    
+    def analyze_headline_subhead(self, headline, subhead, product_category, compliance_result=None):
         """Comprehensive analysis of headline and subhead for compliance"""
         analysis = {
             "headline_issues": [],
@@ -929,10 +1496,9 @@ class AdvancedComplianceEngine:
             "compliance_score": 100
         }
         
-        full_text = f"{headline} {subhead}".lower()
-        
-        # Use the enhanced claim detection from check_text_compliance
-        compliance_result = self.check_text_compliance(headline, subhead, product_category)
+        # Use the enhanced claim detection from check_text_compliance (unless already run)
+        if compliance_result is None:
+            compliance_result = self.check_text_compliance(headline, subhead, product_category)
         
         # Convert issues to analysis format
         for issue in compliance_result["issues"]:
@@ -962,14 +1528,255 @@ class AdvancedComplianceEngine:
         return analysis
     
     def log_violation(self, creative_data, issues, format_name):
-        """Log compliance violations for analytics"""
-        violation = {
-            "timestamp": datetime.now().isoformat(),
-            "creative_data": creative_data,
-            "format": format_name,
-            "issues": issues,
-            "product_category": creative_data.get('product_category', 'general')
-        }
-        self.violation_history.append(violation)
+        """Log compliance violations for analytics
+
+        Issues may be violation records or rendered issue text. Only the rule hits
+        and the product category are kept - never the creative data itself.
+        """
+        return self.violation_log.record(
+            format_name,
+            creative_data.get('product_category', 'general'),
+            [self._violation_row(issue) for issue in issues],
+            self.rules_version
+        )
+    
+    def _violation_row(self, issue):
+        """(rule, category, rule_id, severity, detail) log row for a record or issue text"""
+        if isinstance(issue, Violation):
+            self.violation_rule(issue)
+            rule_id, severity, detail = issue.rule_id, issue.severity, issue.detail
+        else:
+            if self._issue_rule_ids is None:
+                self._issue_rule_ids = {}
+                for index, entry in enumerate(self.rule_catalog):
+                    self._issue_rule_ids.setdefault(entry[2], index)
+            rule_id = self._issue_rule_ids.get(issue)
+            if rule_id is None:
+                severity = SEVERITY_HARD_FAIL if issue.startswith("HARD FAIL") else SEVERITY_WARNING
+                return (issue, "uncatalogued", None, severity, None)
+            severity, detail = self.rule_catalog[rule_id][5], None
+        category, label = self.rule_catalog[rule_id][:2]
+        # Rule ids change with the rule set; category and label name the rule stably
+        return (f"{category}:{label}", category, rule_id, severity, detail)
+
+
+class AuditContext:
+    """Compute-once audit state for a single creative
+
+    Text compliance, headline analysis and shared design rules are evaluated
+    lazily on first use and reused for every format; only format rules such as
+    safe zones are applied per format.
+    """
+    
+    def __init__(self, engine, creative_data):
+        self.engine = engine
+        self.creative_data = creative_data
+        self._text_compliance = None
+        self._text_violations = None
+        self._headline_analysis = None
+        self._shared_design_violations = None
+        self._format_reports = {}
+    
+    @property
+    def text_compliance(self):
+        if self._text_compliance is None:
+            self._text_compliance = self.engine.check_text_compliance(
+                self.creative_data.get('headline', ''),
+                self.creative_data.get('subhead', ''),
+                self.creative_data.get('product_category', 'general')
+            )
+        return self._text_compliance
+    
+    @property
+    def text_violations(self):
+        if self._text_violations is None:
+            self._text_violations = self.engine.text_violations(
+                self.creative_data.get('headline', ''),
+                self.creative_data.get('subhead', ''),
+                self.creative_data.get('product_category', 'general')
+            )
+        return self._text_violations
+    
+    @property
+    def headline_analysis(self):
+        if self._headline_analysis is None:
+            self._headline_analysis = self.engine.analyze_headline_subhead(
+                self.creative_data.get('headline', ''),
+                self.creative_data.get('subhead', ''),
+                self.creative_data.get('product_category', 'general'),
+                compliance_result=self.text_compliance
+            )
+        return self._headline_analysis
+    
+    @property
+    def shared_design_violations(self):
+        if self._shared_design_violations is None:
+            self._shared_design_violations = self.engine.shared_design_violations(self.creative_data)
+        return self._shared_design_violations
+    
+    @property
+    def shared_design(self):
+        return self.engine.design_result(self.shared_design_violations)
+    
+    def design_compliance(self, format_name):
+        """Design report for one format: format rules merged with the shared design result"""
+        return self.engine.merge_design_results(
+            self.engine.validate_format_rules(format_name),
+            self.shared_design
+        )
+    
+    def violations(self, format_name):
+        """Text, format and shared design violation records for one format, in check order"""
+        return (self.text_violations + self.engine.format_rule_violations(format_name)
+                + self.shared_design_violations)
+    
+    def format_report(self, format_name):
+        """Full audit report for one format"""
+        if format_name not in self._format_reports:
+            self._format_reports[format_name] = self.engine.build_audit_report(
+                self.text_compliance, self.design_compliance(format_name)
+            )
+        return self._format_reports[format_name]
+
+
+def _common_length(same, limit):
+    """Largest size <= limit for which same(size) holds (binary search over C-level slice compares)"""
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if same(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def _gap_end(parts, part, position):
+    """End of the greedy match of segments parts[part:] starting at or after position"""
+    if part == len(parts):
+        return position
+    for start, end in reversed(parts[part]):
+        if start < position:
+            break
+        found = _gap_end(parts, part + 1, end)
+        if found is not None:
+            return found
+    return None
+
+
+class IncrementalTextChecker:
+    """Text compliance for one headline/subhead pair that is being edited
+
+    Keeps the segment matches of the current copy. After an edit only match
+    starts within reach of the changed characters are rescanned; matches before
+    and after the edit are kept (shifted). Rules with '.*' gaps are rebuilt from
+    their segment matches, so the verdict equals check_text_compliance.
+    """
+    
+    def __init__(self, engine, product_category="general", max_edit=64):
+        self.engine = engine
+        self.product_category = product_category
+        self.max_edit = max_edit
+        self.rules_version = None
+        self.text = None
+        self.segment_spans = []
+        self.stats = {"unchanged": 0, "incremental": 0, "full": 0}
+    
+    def update(self, headline, subhead):
+        """Return the check_text_compliance result for the edited copy"""
+        engine = self.engine
+        plan = engine.incremental_plan()
+        text = f"{' '.join(headline.split())} {' '.join(subhead.split())}".lower()
+        
+        if self.text is None or self.rules_version != engine.rules_version or plan["reach"] is None:
+            self.segment_spans = self._scan(plan, text, 0, len(text) + 1, len(text))
+            self.stats["full"] += 1
+        elif text == self.text:
+            self.stats["unchanged"] += 1
+        else:
+            self.segment_spans = self._rescan_edit(plan, text)
+        self.text = text
+        self.rules_version = engine.rules_version
+        
+        spans = self._rule_spans(plan)
+        verdict = engine._verdict_from_spans(spans)
+        return engine._text_result(verdict, spans, headline, subhead, self.product_category)
+    
+    def _rescan_edit(self, plan, text):
+        old = self.text
+        limit = min(len(old), len(text))
+        prefix = _common_length(lambda size: old[:size] == text[:size], limit)
+        suffix = _common_length(lambda size: old[len(old) - size:] == text[len(text) - size:], limit - prefix)
+        old_end = len(old) - suffix
+        new_end = len(text) - suffix
+        
+        if max(old_end, new_end) - prefix > self.max_edit:
+            self.stats["full"] += 1
+            return self._scan(plan, text, 0, len(text) + 1, len(text))
+        self.stats["incremental"] += 1
+        
+        # A match starting at s reads one character before s and at most reach spaces
+        # (plus the rest of that token and one character) after it
+        hops = plan["reach"] + 2
+        first = prefix
+        for _ in range(hops):
+            first = text.rfind(" ", 0, first)
+            if first < 0:
+                break
+        first += 1
+        last = new_end + 1
+        endpos = last
+        for _ in range(hops):
+            endpos = text.find(" ", endpos + 1)
+            if endpos < 0:
+                endpos = len(text)
+                break
+        
+        delta = len(text) - len(old)
+        kept_before = [span for span in self.segment_spans if span[1] < first]
+        kept_after = [(segment, start + delta, end + delta) for segment, start, end in self.segment_spans
+                      if start > old_end + 1]
+        return kept_before + self._scan(plan, text, first, last, endpos) + kept_after
+    
+    def _scan(self, plan, text, first, last, endpos):
+        """Segment matches starting in [first, last], reading no further than endpos"""
+        engine = self.engine
+        spans = [(engine.forbidden_rule_ids[term], start, end)
+                 for term, start, end in engine.forbidden_matcher.find_spans(text, first, endpos)
+                 if start <= last]
+        offset = len(engine.forbidden_rule_ids)
+        spans.extend((offset + index, start, end)
+                     for index, start, end in plan["bundle"].find_spans(text, first, endpos)
+                     if start <= last)
+        spans.sort(key=lambda span: span[1])
+        return spans
+    
+    def _rule_spans(self, plan):
+        """Rule hits (rule id, start, end) in text order, as the engine's full scan reports them"""
+        engine = self.engine
+        offset = len(engine.forbidden_rule_ids)
+        include_alcohol = self.product_category.lower() == "alcohol"
+        spans = []
+        gapped = {}
+        for segment, start, end in self.segment_spans:
+            if segment < offset:
+                spans.append((segment, start, end))
+                continue
+            rule_id, part, parts = plan["segment_rules"][segment - offset]
+            if not include_alcohol and engine.rule_catalog[rule_id][0] in engine.alcohol_categories:
+                continue
+            if parts == 1:
+                spans.append((rule_id, start, end))
+            else:
+                gapped.setdefault(rule_id, [[] for _ in range(parts)])[part].append((start, end))
         
-        return violation
\ No newline at end of file
+        # '.*' rules match at every first-segment start followed by the remaining
+        # segments in order; the greedy gap ends the match at the last possible one
+        for rule_id, parts in gapped.items():
+            if all(parts):
+                for start, end in parts[0]:
+                    match_end = _gap_end(parts, 1, end)
+                    if match_end is not None:
+                        spans.append((rule_id, start, match_end))
+        spans.sort(key=lambda span: (span[1], span[0]))
+        return spans
@@ -0,0 +1,277 @@
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from PIL import Image, ImageColor, ImageDraw
+from font_registry import get_font
+from image_cache import image_nbytes, PACKSHOT_RESIZE_CACHE
+from lru_cache import LRUCache
+from scene import LAYERS, layout_scene, get_appropriate_tag
+from value_tile_generator import generate_value_tile
+
+# Social formats offered by the studio, as (width, height)
+FORMAT_DIMENSIONS = {
+    "1080x1080": (1080, 1080),
+    "1080x1920": (1080, 1920),
+    "1200x628": (1200, 628),
+}
+
+# Live previews render at a quarter of the export size
+PREVIEW_SCALE = 0.25
+
+
+def format_dimensions(format_name):
+    """Return (width, height) for a format label such as "Instagram Square (1080x1080)", defaulting to 1:1"""
+    for size, dimensions in FORMAT_DIMENSIONS.items():
+        if size in format_name:
+            return dimensions
+    return FORMAT_DIMENSIONS["1080x1080"]
+
+
+def create_tesco_logo(size=(100, 40)):
+    logo = Image.new('RGBA', size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(logo)
+    draw.rectangle([10, 10, size[0]-10, size[1]-10], fill="#00539F", outline="#FFFFFF", width=2)
+    font = get_font(14)
+    draw.text((size[0]//2, size[1]//2), "TESCO", fill="#FFFFFF", font=font, anchor="mm")
+    return logo
+
+
+def _text_piece(text, font, position, fill):
+    """Text drawn on its own transparent tile, placed at the draw.text position"""
+    left, top, right, bottom = font.getbbox(text)
+    if right <= left or bottom <= top:
+        return None
+    # The transparent pixels carry the ink colour so antialiased edges blend without dark fringes
+    ink = ImageColor.getrgb(fill)
+    piece = Image.new("RGBA", (right - left, bottom - top), ink + (0,))
+    ImageDraw.Draw(piece).text((-left, -top), text, fill=fill, font=font)
+    return piece, (position[0] + left, position[1] + top)
+
+
+def _rgba(image):
+    # RGBA packshots keep their transparency; anything else is pasted opaque
+    return image if image.mode == "RGBA" else image.convert("RGB").convert("RGBA")
+
+
+class Frame:
+    """A format's full-resolution dimensions and the scale it is rendered at
+
+    Scenes are laid out in full-resolution pixels; px() maps them onto the
+    rendered canvas, so previews keep the exported proportions.
+    """
+
+    def __init__(self, dimensions, scale=1.0):
+        self.width, self.height = dimensions
+        self.scale = scale
+        self.size = (max(1, self.px(self.width)), max(1, self.px(self.height)))
+
+    def px(self, value):
+        return round(value * self.scale)
+
+    def font(self, size):
+        return get_font(max(1, self.px(size)))
+
+    def fit(self, image, size):
+        """Scale an element drawn at full resolution down to the canvas"""
+        if self.scale == 1:
+            return image
+        return image.resize((max(1, self.px(size[0])), max(1, self.px(size[1]))), Image.Resampling.LANCZOS)
+
+    def box(self, box):
+        return tuple(self.px(value) for value in box)
+
+
+def _draw_fill(frame, element):
+    width, height = frame.size
+    if element.content is not None:
+        # Previews shrink large backgrounds by an integer factor before filtering
+        reducing_gap = None if frame.scale == 1 else 2.0
+        background = element.content.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=reducing_gap)
+        return background.convert("RGBA"), (0, 0)
+    return Image.new("RGBA", (width, height), element.style["color"]), (0, 0)
+
+
+def _draw_logo(frame, element):
+    return frame.fit(create_tesco_logo((element.width, element.height)), (element.width, element.height)), \
+        (frame.px(element.box[0]), frame.px(element.box[1]))
+
+
+def _draw_image(frame, element):
+    fit = element.style["fit"]
+    packshot = PACKSHOT_RESIZE_CACHE.fit(element.content, (frame.px(fit[0]), frame.px(fit[1])))
+    return _rgba(packshot), (frame.px(element.box[0]), frame.px(element.box[1]))
+
+
+def _draw_value_tile(frame, element):
+    tile = generate_value_tile(element.style["tile_type"], element.style["price_data"],
+                               (element.width, element.height))
+    if not tile:
+        return None
+    return frame.fit(tile.convert("RGBA"), tile.size), (frame.px(element.box[0]), frame.px(element.box[1]))
+
+
+def _draw_text(frame, element):
+    x, y = element.style["origin"]
+    return _text_piece(element.style["text"], frame.font(element.style["font_size"]),
+                       (frame.px(x), frame.px(y)), element.style["fill"])
+
+
+# Element kind -> function drawing it as an (RGBA piece, canvas position) pair, or None
+ELEMENT_RENDERERS = {
+    "fill": _draw_fill,
+    "logo": _draw_logo,
+    "image": _draw_image,
+    "value_tile": _draw_value_tile,
+    "text": _draw_text,
+}
+
+
+class LayeredCompositor:
+    """Renders scenes as a stack of named layers, each cached by a digest of its elements
+
+    A layer is the list of (RGBA piece, position) tiles drawn for its elements.
+    Layers are rebuilt only when their elements change, then alpha-composited
+    over a copy of the background, so a headline edit redraws just the copy layer.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, layers=LAYERS):
+        self.layers = layers
+        self.cache = LRUCache(maxsize=512, max_bytes=max_bytes, sizeof=self._layer_nbytes)
+        self.stats = {name: {"hits": 0, "misses": 0} for name in layers}
+        self._lock = threading.Lock()
+
+    def render(self, size, spec, scale=1.0):
+        """Return the composited RGBA creative for spec at size, drawn at scale (e.g. 0.25 for previews)"""
+        return self.render_scene(layout_scene(size, spec), scale)[0]
+
+    def render_scene(self, scene, scale=1.0):
+        """Return (RGBA image, {element name: box in rendered pixels}) for a scene"""
+        frame = Frame(scene.size, scale)
+        canvas = None
+        for name in self.layers:
+            pieces = self.layer(name, scene.layer(name), frame)
+            if canvas is None:
+                # The background layer is a single opaque full-size piece
+                canvas = pieces[0][0].copy()
+                continue
+            for piece, position in pieces:
+                _composite(canvas, piece, position)
+        boxes = {element.name: frame.box(element.box) for element in scene.elements}
+        return canvas, boxes
+
+    def layer(self, name, elements, frame):
+        """Return a layer's pieces from the cache, drawing its elements on a miss"""
+        key = (name, frame.width, frame.height, frame.scale, self._digest(elements))
+        pieces = self.cache.get(key)
+        hit = pieces is not None
+        if not hit:
+            pieces = [piece for piece in (ELEMENT_RENDERERS[element.kind](frame, element) for element in elements)
+                      if piece]
+            self.cache.put(key, pieces)
+        with self._lock:
+            self.stats[name]["hits" if hit else "misses"] += 1
+        return pieces
+
+    def info(self):
+        """Return per-layer hit rates plus overall cache statistics"""
+        with self._lock:
+            layers = {name: dict(counts, hit_rate=counts["hits"] / (counts["hits"] + counts["misses"])
+                                 if counts["hits"] + counts["misses"] else 0.0)
+                      for name, counts in self.stats.items()}
+        info = self.cache.info()
+        info["layers"] = layers
+        return info
+
+    @staticmethod
+    def _digest(elements):
+        hasher = hashlib.blake2b(digest_size=16)
+        for element in elements:
+            hasher.update(repr(element.key()).encode())
+            hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    @staticmethod
+    def _layer_nbytes(pieces):
+        return sum(image_nbytes(piece) for piece, _ in pieces)
+
+
+def _composite(canvas, piece, position):
+    """alpha_composite piece at position, clipping whatever falls outside the canvas"""
+    x, y = position
+    left, top = max(0, -x), max(0, -y)
+    right, bottom = min(piece.width, canvas.width - x), min(piece.height, canvas.height - y)
+    if right <= left or bottom <= top:
+        return
+    if (left, top, right, bottom) != (0, 0, piece.width, piece.height):
+        piece = piece.crop((left, top, right, bottom))
+    canvas.alpha_composite(piece, (x + left, y + top))
+
+
+CREATIVE_COMPOSITOR = LayeredCompositor()
+
+
+def creative_spec(packshots, headline, subhead, value_tile_type, tag_type, bg_color, bg_image,
+                  include_drinkaware, clubcard_price, regular_price, lep_price, clubcard_end_date,
+                  product_category, product_exclusivity, creative_links_to_tesco, show_logo=True):
+    """Collect generate_creative arguments into the spec dict consumed by layout_scene"""
+    return {
+        "packshots": tuple(packshots or ()),
+        "headline": headline,
+        "subhead": subhead,
+        "value_tile_type": value_tile_type,
+        "tag_type": tag_type,
+        "bg_color": bg_color,
+        "bg_image": bg_image,
+        "include_drinkaware": include_drinkaware,
+        "clubcard_price": clubcard_price,
+        "regular_price": regular_price,
+        "lep_price": lep_price,
+        "clubcard_end_date": clubcard_end_date,
+        "product_category": product_category,
+        "product_exclusivity": product_exclusivity,
+        "creative_links_to_tesco": creative_links_to_tesco,
+        "show_logo": show_logo
+    }
+
+
+def generate_creative(dimensions, packshots, headline, subhead, value_tile_type, tag_type, 
+                     bg_color, bg_image, include_drinkaware, clubcard_price, regular_price, 
+                     lep_price, clubcard_end_date, product_category, product_exclusivity, creative_links_to_tesco, show_logo=True, scale=1.0):
+    """Render one creative at dimensions, reusing cached layers whose inputs are unchanged
+
+    scale below 1 renders a proportionally smaller preview; exports use the default.
+    """
+    spec = creative_spec(packshots, headline, subhead, value_tile_type, tag_type, bg_color, bg_image,
+                         include_drinkaware, clubcard_price, regular_price, lep_price, clubcard_end_date,
+                         product_category, product_exclusivity, creative_links_to_tesco, show_logo)
+    return CREATIVE_COMPOSITOR.render(dimensions, spec, scale)
+
+
+def render_creative(dimensions, spec, scale=1.0):
+    """Lay out and render a spec, returning (image, {element name: box in rendered pixels})"""
+    return CREATIVE_COMPOSITOR.render_scene(layout_scene(dimensions, creative_spec(**spec)), scale)
+
+
+def render_formats(formats, spec, max_workers=None, scale=1.0):
+    """Render every format from one creative spec in parallel, returning images in format order
+
+    spec holds the generate_creative keyword arguments other than dimensions. It is
+    frozen before rendering starts and shared read-only by the workers. Resampling
+    and pasting release the GIL, so formats render concurrently on a thread pool.
+    """
+    spec = dict(spec)
+    spec["packshots"] = tuple(spec.get("packshots") or ())
+    # Decode lazily opened uploads up front; concurrent first loads of one image race
+    for image in spec["packshots"] + (spec.get("bg_image"),):
+        if image is not None:
+            image.load()
+    spec = MappingProxyType(spec)
+
+    dimensions = [format_dimensions(format_name) for format_name in formats]
+    if len(dimensions) <= 1:
+        return [generate_creative(size, scale=scale, **spec) for size in dimensions]
+    workers = min(len(dimensions), max_workers or os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda size: generate_creative(size, scale=scale, **spec), dimensions))
@@ -0,0 +1,266 @@
+import io
+import json
+import os
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PIL import Image
+from image_cache import image_digest
+from lru_cache import LRUCache
+
+# README promise: download-ready JPEG/PNG creatives under 500KB
+EXPORT_BYTE_BUDGET = 500 * 1000
+
+# Optimized lossless PNG is tried when a fast compress is within this factor of the budget
+LOSSLESS_HEADROOM = 1.5
+
+CODEC_EXTENSIONS = {"PNG": "png", "JPEG": "jpg"}
+CODEC_MIME_TYPES = {"PNG": "image/png", "JPEG": "image/jpeg"}
+
+
+def export_filename(format_name, codec):
+    """Download file name for a creative format, e.g. tesco_compliant_instagram_story.jpg"""
+    return f"tesco_compliant_{format_name.replace(' ', '_').lower()}.{CODEC_EXTENSIONS[normalise_codec(codec)]}"
+
+
+def normalise_codec(codec):
+    codec = codec.upper()
+    return "JPEG" if codec == "JPG" else codec
+
+
+def flatten(image, background=(255, 255, 255)):
+    """Drop transparency by compositing onto a solid background (JPEG has no alpha)"""
+    if image.mode in ('RGBA', 'LA'):
+        flat = Image.new('RGB', image.size, background)
+        flat.paste(image, mask=image.split()[-1])
+        return flat
+    return image if image.mode == 'RGB' else image.convert('RGB')
+
+
+def encode(image, codec='PNG', quality=90, colors=None, optimize=True, compress_level=None):
+    """Encode image as PNG (optionally palette-quantised to colors) or JPEG at quality"""
+    codec = normalise_codec(codec)
+    buf = io.BytesIO()
+    if codec == 'JPEG':
+        flatten(image).save(buf, format='JPEG', quality=quality, optimize=optimize)
+    else:
+        if colors:
+            image = quantize(image, colors)
+        options = {} if compress_level is None else {"compress_level": compress_level}
+        image.save(buf, format='PNG', optimize=optimize, **options)
+    return buf.getvalue()
+
+
+def quantize(image, colors):
+    # Fast octree keeps the alpha channel of RGBA creatives
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    return image.quantize(colors=colors, method=Image.Quantize.FASTOCTREE)
+
+
+class BudgetedEncoder:
+    """Encodes creatives at the best quality that fits a byte budget
+
+    JPEG bisects over quality. PNG tries lossless first, then bisects over the
+    palette size of a quantised image. Each search encodes a setting once, and
+    several creatives or codecs are searched in parallel on a thread pool
+    (Pillow's encoders release the GIL). With a cache, results are kept by image
+    digest, codec and search bounds, so an image is encoded once per codec.
+    """
+
+    def __init__(self, max_bytes=EXPORT_BYTE_BUDGET, min_quality=10, max_quality=95, min_colors=2, max_colors=256,
+                 cache=None):
+        self.max_bytes = max_bytes
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.min_colors = min_colors
+        self.max_colors = max_colors
+        self.cache = cache
+
+    def encode(self, image, codec='PNG', digest=None):
+        """Return {"data", "codec", "settings", "bytes", "within_budget", "attempts", "seconds", "cached"}
+
+        image may be a callable returning the image; with its digest given, it is
+        only called when the result is not already cached. seconds is the time this
+        call took, and cached tells whether it was served from the cache.
+        """
+        codec = normalise_codec(codec)
+        if self.cache is None:
+            return self._encode(_load(image), codec)
+        start = time.perf_counter()
+        key = (digest or image_digest(_load(image)), codec, self.max_bytes, self.min_quality, self.max_quality,
+               self.min_colors, self.max_colors)
+        result = self.cache.get(key)
+        if result is None:
+            result = self._encode(_load(image), codec)
+            self.cache.put(key, result)
+            return result
+        return dict(result, seconds=time.perf_counter() - start, cached=True)
+
+    def info(self):
+        """Return encoded-artifact cache statistics"""
+        return self.cache.info() if self.cache is not None else {}
+
+    def _encode(self, image, codec):
+        start = time.perf_counter()
+        if codec == 'JPEG':
+            data, settings, attempts = self._search_jpeg(flatten(image))
+        else:
+            data, settings, attempts = self._search_png(image)
+        return {
+            "data": data,
+            "codec": codec,
+            "settings": settings,
+            "bytes": len(data),
+            "within_budget": len(data) <= self.max_bytes,
+            "attempts": attempts,
+            "seconds": time.perf_counter() - start,
+            "cached": False
+        }
+
+    def encode_all(self, images, codecs=('PNG', 'JPEG'), max_workers=None, digests=None):
+        """Encode every image with every codec in parallel; results are ordered image by image, then codec"""
+        return list(self.iter_encode(images, codecs, max_workers, digests))
+
+    def iter_encode(self, images, codecs=('PNG', 'JPEG'), max_workers=None, digests=None):
+        """Yield encode results in encode_all order, with at most max_workers encodes in flight
+
+        Results are handed over as soon as they are next in order, so a consumer
+        writing them out holds only the in-flight encodes at any time.
+        """
+        images = list(images)
+        jobs = [(image, codec, digest) for image, digest in zip(images, digests or [None] * len(images))
+                for codec in codecs]
+        workers = min(len(jobs), max_workers or os.cpu_count() or 1)
+        if workers <= 1:
+            for job in jobs:
+                yield self.encode(*job)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = deque()
+            for job in jobs:
+                pending.append(executor.submit(self.encode, *job))
+                if len(pending) >= workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _search_jpeg(self, image):
+        encodes = {}
+
+        def size(quality):
+            if quality not in encodes:
+                encodes[quality] = encode(image, 'JPEG', quality=quality)
+            return len(encodes[quality])
+
+        quality = self._highest_within_budget(size, self.min_quality, self.max_quality)
+        return encodes[quality], {"quality": quality}, len(encodes)
+
+    def _search_png(self, image):
+        # A fast compress gauges the lossless size; the slow optimizing pass is only
+        # spent when it could bring the image under budget
+        quick = encode(image, 'PNG', optimize=False, compress_level=1)
+        attempts = 1
+        if len(quick) <= self.max_bytes * LOSSLESS_HEADROOM:
+            lossless = encode(image, 'PNG')
+            attempts += 1
+            best = min(lossless, quick, key=len)
+            if len(best) <= self.max_bytes:
+                return best, {"colors": None}, attempts
+
+        # Probes use the default compressor; the chosen palette is re-encoded with optimize
+        palettes = {}
+        encodes = {}
+
+        def size(colors):
+            if colors not in encodes:
+                palettes[colors] = quantize(image, colors)
+                encodes[colors] = encode(palettes[colors], 'PNG', optimize=False)
+            return len(encodes[colors])
+
+        colors = self._highest_within_budget(size, self.min_colors, self.max_colors)
+        data = encode(palettes[colors], 'PNG')
+        return min(data, encodes[colors], key=len), {"colors": colors}, attempts + len(encodes) + 1
+
+    def _highest_within_budget(self, size, low, high):
+        """Bisect for the highest setting in [low, high] whose encode fits, assuming size grows with it
+
+        Returns low when even the smallest setting is over budget.
+        """
+        if size(high) <= self.max_bytes:
+            return high
+        if size(low) > self.max_bytes:
+            return low
+        while high - low > 1:
+            middle = (low + high) // 2
+            if size(middle) <= self.max_bytes:
+                low = middle
+            else:
+                high = middle
+        return low
+
+
+def _load(image):
+    return image() if callable(image) else image
+
+
+def _manifest_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, dict):
+        return {key: _manifest_value(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_manifest_value(item) for item in value]
+    return value
+
+
+def write_bundle(fileobj, creatives, codecs=('PNG', 'JPEG'), encoder=None, max_workers=None, digests=None):
+    """Write every creative in every codec to a ZIP archive with a manifest.json, returning the manifest
+
+    creatives are the app's creative dicts; every key except the image goes into
+    the manifest. As with encode, an image may be a loader given with its digest.
+    Members are encoded in parallel and written one at a time as they complete in
+    order. JPEG and PNG are already compressed, so they are stored rather than
+    deflated again.
+    """
+    encoder = encoder or EXPORT_ENCODER
+    codecs = [normalise_codec(codec) for codec in codecs]
+    manifest = {
+        "generated": datetime.now().isoformat(),
+        "byte_budget": encoder.max_bytes,
+        "creatives": [dict(_manifest_value({key: value for key, value in creative.items() if key != "image"}),
+                           files=[]) for creative in creatives]
+    }
+    encodings = encoder.iter_encode([creative["image"] for creative in creatives], codecs, max_workers, digests)
+    with zipfile.ZipFile(fileobj, "w") as archive:
+        for index, encoding in enumerate(encodings):
+            entry = manifest["creatives"][index // len(codecs)]
+            name = export_filename(entry["format"], encoding["codec"])
+            archive.writestr(zipfile.ZipInfo(name, time.localtime()[:6]), encoding["data"],
+                             compress_type=zipfile.ZIP_STORED)
+            entry["files"].append({
+                "name": name,
+                "codec": encoding["codec"],
+                "bytes": encoding["bytes"],
+                "settings": encoding["settings"],
+                "within_budget": encoding["within_budget"]
+            })
+        archive.writestr("manifest.json", json.dumps(manifest, indent=2), compress_type=zipfile.ZIP_DEFLATED)
+    return manifest
+
+
+def bundle_bytes(creatives, codecs=('PNG', 'JPEG'), encoder=None, max_workers=None, digests=None):
+    """Return (ZIP archive bytes, manifest) for write_bundle"""
+    buf = io.BytesIO()
+    manifest = write_bundle(buf, creatives, codecs, encoder, max_workers, digests)
+    return buf.getvalue(), manifest
+
+
+def _encoded_nbytes(result):
+    return len(result["data"])
+
+
+# Shared by every session: download buttons on each rerun are served from here
+EXPORT_ENCODER = BudgetedEncoder(cache=LRUCache(maxsize=512, max_bytes=128 * 1024 * 1024, sizeof=_encoded_nbytes))
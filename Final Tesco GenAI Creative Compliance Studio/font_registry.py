@@ -0,0 +1,83 @@
+import threading
+from PIL import ImageFont
+from lru_cache import LRUCache
+
+# Family every renderer asks for; Appendix B minimum sizes are applied by the callers
+DEFAULT_FAMILY = "Arial"
+
+
+class FontRegistry:
+    """Process-wide font cache shared by every renderer
+
+    A family name (or font file path) is resolved to a file once, using the same
+    lookup as ImageFont.truetype. Loaded fonts are kept per (family, size) with
+    LRU eviction, so repeat renders do no font file I/O. Families that cannot be
+    resolved use Pillow's default font, and every such request is counted.
+    """
+
+    def __init__(self, maxsize=64, families=(DEFAULT_FAMILY,)):
+        self.fonts = LRUCache(maxsize)
+        self.paths = {}
+        self.fallbacks = 0
+        self._default_font = None
+        self._lock = threading.Lock()
+        for family in families:
+            self.resolve(family)
+
+    def resolve(self, family):
+        """Return the font file path for family, or None if it cannot be found"""
+        if family not in self.paths:
+            try:
+                # truetype searches the platform font directories; probing once
+                # records the path it settled on
+                self.paths[family] = ImageFont.truetype(family, 10).path
+            except OSError:
+                self.paths[family] = None
+        return self.paths[family]
+
+    def get(self, size, family=DEFAULT_FAMILY):
+        """Return a cached font for family at size, falling back to Pillow's default font
+
+        Sizes below 1 (e.g. derived from a tiny canvas) are clamped to 1.
+        """
+        size = max(1, int(size))
+        path = self.resolve(family)
+        if path is None:
+            with self._lock:
+                self.fallbacks += 1
+            return self.default_font()
+
+        key = (family, size)
+        font = self.fonts.get(key)
+        if font is not None:
+            return font
+        try:
+            font = ImageFont.truetype(path, size)
+        except (OSError, ValueError) as e:
+            print(f"Font load error: {e}")
+            with self._lock:
+                self.fallbacks += 1
+            return self.default_font()
+        self.fonts.put(key, font)
+        return font
+
+    def default_font(self):
+        if self._default_font is None:
+            self._default_font = ImageFont.load_default()
+        return self._default_font
+
+    def info(self):
+        """Return cache statistics, resolved paths and the fallback count"""
+        stats = self.fonts.info()
+        stats["paths"] = dict(self.paths)
+        stats["fallbacks"] = self.fallbacks
+        return stats
+
+
+# Resolved at import so the first render does not pay for the font directory search
+FONT_REGISTRY = FontRegistry()
+
+
+def get_font(size, family=DEFAULT_FAMILY):
+    """Return a font from the shared registry"""
+    return FONT_REGISTRY.get(size, family)
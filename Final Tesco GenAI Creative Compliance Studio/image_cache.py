@@ -0,0 +1,100 @@
+import hashlib
+import math
+import threading
+import weakref
+from PIL import Image
+from lru_cache import LRUCache
+
+
+def image_nbytes(image):
+    """Approximate memory held by a decoded image"""
+    return image.width * image.height * len(image.getbands())
+
+
+# Pixels are hashed a strip of rows at a time, so a digest never copies a whole large image
+DIGEST_CHUNK_BYTES = 4 * 1024 * 1024
+
+# Digests are computed once per image object; session state keeps the same
+# objects across reruns, and re-uploads of the same file hash to the same digest
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def image_digest(image):
+    """Content digest of an image's mode, size and pixels, memoised per image object
+
+    Images are assumed not to be modified in place after their first digest.
+    """
+    key = id(image)
+    with _digests_lock:
+        entry = _digests.get(key)
+        if entry is not None and entry[0]() is image:
+            return entry[1]
+
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(f"{image.mode}:{image.width}x{image.height}".encode())
+    rows = max(1, DIGEST_CHUNK_BYTES // max(1, image.width * len(image.getbands())))
+    if rows >= image.height:
+        hasher.update(image.tobytes())
+    else:
+        # Strips are consecutive slices of tobytes(), so the digest does not depend on the strip height
+        for top in range(0, image.height, rows):
+            hasher.update(image.crop((0, top, image.width, min(top + rows, image.height))).tobytes())
+    digest = hasher.hexdigest()
+    with _digests_lock:
+        _digests[key] = (weakref.ref(image, lambda _, key=key: _digests.pop(key, None)), digest)
+    return digest
+
+
+def thumbnail_size(size, box):
+    """Size Image.thumbnail(box) gives an image of size, or None if it already fits"""
+    x, y = (math.floor(value) for value in box)
+    width, height = size
+    if x >= width and y >= height:
+        return None
+
+    def round_aspect(number, key):
+        return max(min(math.floor(number), math.ceil(number), key=key), 1)
+
+    aspect = width / height
+    if x / y >= aspect:
+        x = round_aspect(y * aspect, key=lambda n: abs(aspect - n / y))
+    else:
+        y = round_aspect(x / aspect, key=lambda n: 0 if n == 0 else abs(aspect - x / n))
+    return x, y
+
+
+class ResizeCache:
+    """Memory-bounded cache of packshots fitted into a box, keyed on content digest, box and filter
+
+    Renders of every format and every rerun share the resized copies, so an
+    unchanged packshot is resampled once per box. Cached images are shared and
+    must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, reducing_gap=2.0):
+        self.reducing_gap = reducing_gap
+        self.images = LRUCache(maxsize=1024, max_bytes=max_bytes, sizeof=image_nbytes)
+
+    def fit(self, image, box, resample=Image.Resampling.LANCZOS):
+        """Return image scaled to fit box like copy() + thumbnail(box, resample)"""
+        key = (image_digest(image), tuple(box), int(resample))
+        fitted = self.images.get(key)
+        if fitted is None:
+            fitted = self._fit(image, box, resample)
+            self.images.put(key, fitted)
+        return fitted
+
+    def _fit(self, image, box, resample):
+        size = thumbnail_size(image.size, box)
+        if size is None or size == image.size:
+            return image.copy()
+        # Large uploads are first shrunk by an integer factor with Image.reduce,
+        # leaving a final resample of at most reducing_gap x for the filter
+        return image.resize(size, resample, reducing_gap=self.reducing_gap)
+
+    def info(self):
+        return self.images.info()
+
+
+PACKSHOT_RESIZE_CACHE = ResizeCache()
@@ -0,0 +1,340 @@
+import re
+
+try:
+    import re._parser as _sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse as _sre_parse
+
+
+def _dispatch(alternatives_by_lead):
+    """Build an alternation that first branches on the leading character"""
+    return "(?:" + "|".join(f"(?={re.escape(lead)})(?:{alternatives})"
+                            for lead, alternatives in alternatives_by_lead.items()) + ")"
+
+
+def _leading_literal(pattern):
+    """Lower-cased first character every match of a \\b-anchored pattern must start with, if certain"""
+    lead = pattern[2:3]
+    if not pattern.startswith(r'\b') or not lead.isalnum() or pattern[3:4] in ("?", "*", "{"):
+        return None
+
+    # A top-level alternation could start with something else
+    depth = 0
+    in_class = False
+    escaped = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return None
+    return lead.lower()
+
+
+def _top_level_positions(pattern, token):
+    """Start indices of token outside groups, character classes and escapes"""
+    positions = []
+    depth = 0
+    in_class = False
+    escaped = False
+    for index, char in enumerate(pattern):
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0 and pattern.startswith(token, index):
+            positions.append(index)
+    return positions
+
+
+def split_gaps(pattern):
+    """Split a pattern at its top-level greedy '.*' gaps, e.g. r'\\bwin\\b.*\\bprize\\b' -> two segments"""
+    if _top_level_positions(pattern, "|"):
+        return [pattern]
+    segments = []
+    previous = 0
+    for index in _top_level_positions(pattern, ".*"):
+        if pattern[index + 2:index + 3] in ("?", "+"):
+            return [pattern]
+        segments.append(pattern[previous:index])
+        previous = index + 2
+    segments.append(pattern[previous:])
+    return segments if all(segments) else [pattern]
+
+
+_SPACE_ONLY_CATEGORIES = {"CATEGORY_SPACE", "CATEGORY_UNI_SPACE"}
+_NO_SPACE_CATEGORIES = {"CATEGORY_DIGIT", "CATEGORY_WORD", "CATEGORY_NOT_SPACE", "CATEGORY_UNI_DIGIT",
+                        "CATEGORY_UNI_WORD", "CATEGORY_UNI_NOT_SPACE", "CATEGORY_LINEBREAK", "CATEGORY_UNI_LINEBREAK"}
+
+
+def _space_kind(op, av):
+    """0: cannot match a space, 1: matches only whitespace, 2: matches spaces and other characters"""
+    name = str(op)
+    if name == "LITERAL":
+        return 1 if av == 32 else 0
+    if name in ("NOT_LITERAL", "ANY"):
+        return 2
+    if name == "IN":
+        if len(av) == 1 and str(av[0][0]) == "CATEGORY" and str(av[0][1]) in _SPACE_ONLY_CATEGORIES:
+            return 1
+        for item_op, item_av in av:
+            item = str(item_op)
+            if item == "LITERAL" and item_av != 32:
+                continue
+            if item == "RANGE" and not item_av[0] <= 32 <= item_av[1]:
+                continue
+            if item == "CATEGORY" and str(item_av) in _NO_SPACE_CATEGORIES:
+                continue
+            return 2
+        return 0
+    return None
+
+
+def _max_spaces(items):
+    total = 0
+    for op, av in items:
+        name = str(op)
+        kind = _space_kind(op, av)
+        if kind is not None:
+            total += 1 if kind else 0
+        elif name == "AT":
+            continue
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+            _, high, sub = av
+            inner = _max_spaces(sub)
+            if inner is None:
+                return None
+            if inner == 0:
+                continue
+            # Normalised copy never has two whitespace characters in a row
+            if len(sub) == 1 and _space_kind(*sub[0]) == 1:
+                total += 1
+            elif high == _sre_parse.MAXREPEAT:
+                return None
+            else:
+                total += inner * high
+        elif name in ("SUBPATTERN", "ATOMIC_GROUP"):
+            inner = _max_spaces(av[-1])
+            if inner is None:
+                return None
+            total += inner
+        elif name == "BRANCH":
+            widths = [_max_spaces(branch) for branch in av[1]]
+            if None in widths:
+                return None
+            total += max(widths)
+        else:
+            # Lookarounds and backreferences read outside the match
+            return None
+    return total
+
+
+def max_token_span(pattern):
+    """Most spaces a match can cover in whitespace-normalised copy, or None if unbounded
+
+    A match covering n spaces touches at most n + 1 tokens, which bounds how far
+    an edit can affect matches around it.
+    """
+    return _max_spaces(_sre_parse.parse(pattern))
+
+
+class _LazyMatcher:
+    """Shared plumbing: regexes compile on first use and state round-trips through plain dicts"""
+
+    def _compile(self, source):
+        pattern = self._compiled.get(source)
+        if pattern is None:
+            pattern = self._compiled[source] = re.compile(source, self.flags)
+        return pattern
+
+    @property
+    def scanner(self):
+        return self._compile(self.scanner_source)
+
+    def to_dict(self):
+        """Serialisable state (pattern sources and lookup tables, no compiled regexes)"""
+        return {key: value for key, value in self.__dict__.items() if key != "_compiled"}
+
+    @classmethod
+    def from_dict(cls, state):
+        """Rebuild a matcher from to_dict() output without recomputing its tables"""
+        matcher = cls.__new__(cls)
+        matcher.__dict__.update(state)
+        matcher._compiled = {}
+        return matcher
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._compiled = {}
+
+
+class TermMatcher(_LazyMatcher):
+    """Compiled single-scan matcher for word-bounded forbidden terms"""
+
+    def __init__(self, terms, flags=re.IGNORECASE):
+        self.terms = list(terms)
+        self.flags = int(flags)
+        self._compiled = {}
+
+        # Unique terms keep the list positions they occupy so duplicate entries
+        # in the guidelines are still reported once per entry, in list order
+        self.positions = {}
+        for index, term in enumerate(self.terms):
+            self.positions.setdefault(term, []).append(index)
+
+        # One zero-width lookahead alternation finds every start position at which
+        # at least one term matches with the same \b...\b semantics as before.
+        # Terms are dispatched on their leading character, longest first.
+        unique_terms = sorted(self.positions, key=len, reverse=True)
+        by_lead = {}
+        symbols = []
+        for term in unique_terms:
+            if term[:1].isalnum():
+                by_lead.setdefault(term[:1].lower(), []).append(re.escape(term))
+            else:
+                symbols.append(re.escape(term))
+        branches = [_dispatch({lead: "|".join(terms) for lead, terms in by_lead.items()})] + symbols
+        self.scanner_source = r'(?=\b(?:' + "|".join(branches) + r')\b)'
+
+        # Per-term patterns resolve which terms start at a candidate position
+        self.buckets = {}
+        for term in unique_terms:
+            self.buckets.setdefault(term[:1].lower(), []).append(term)
+
+    def term_pattern(self, term):
+        return self._compile(r'\b' + re.escape(term) + r'\b')
+
+    def find_terms(self, text):
+        """Return every matching term in guideline list order (duplicates included)"""
+        return [self.terms[index] for index in self.find_indices(text)]
+
+    def find_indices(self, text):
+        """Return sorted guideline list indices of all terms found in one scan of text"""
+        return self.indices_for({term for term, _, _ in self.find_spans(text)})
+
+    def indices_for(self, found_terms):
+        """Return sorted guideline list indices occupied by the given terms"""
+        indices = []
+        for term in found_terms:
+            indices.extend(self.positions[term])
+        indices.sort()
+        return indices
+
+    def find_spans(self, text, pos=0, endpos=None):
+        """Return (term, start, end) for every occurrence of every term, in text order
+
+        pos/endpos limit the scan like re.Pattern.finditer.
+        """
+        endpos = len(text) if endpos is None else endpos
+        spans = []
+        for match in self.scanner.finditer(text, pos, endpos):
+            start = match.start()
+            hits = []
+            for term in self.buckets.get(text[start].lower(), ()):
+                found = self.term_pattern(term).match(text, start, endpos)
+                if found:
+                    hits.append((term, start, found.end()))
+            if not hits:
+                # Case folding can map a character outside its bucket - check everything
+                for term in self.positions:
+                    found = self.term_pattern(term).match(text, start, endpos)
+                    if found:
+                        hits.append((term, start, found.end()))
+            spans.extend(hits)
+        return spans
+
+
+class PatternBundle(_LazyMatcher):
+    """One lookahead alternation over an ordered list of (pattern, message) rules"""
+
+    def __init__(self, rules, template="{message}", flags=re.IGNORECASE, category=None, first_rule_id=0):
+        self.rules = [list(rule) for rule in rules]
+        self.template = template
+        self.category = category
+        self.first_rule_id = first_rule_id
+        self.flags = int(flags)
+        self._compiled = {}
+        self.messages = [template.format(message=message) for _, message in self.rules]
+
+        # Rules starting with \b and a plain character are bucketed by that character;
+        # anything else is checked at every candidate position
+        self.buckets = {}
+        self.unbucketed = []
+        for index, (pattern, _) in enumerate(self.rules):
+            lead = _leading_literal(pattern)
+            if lead:
+                self.buckets.setdefault(lead, []).append(index)
+            else:
+                self.unbucketed.append(index)
+
+        # Every rule becomes an alternative inside a zero-width lookahead, so a single
+        # finditer visits each position where at least one rule matches. Bucketed
+        # rules sit behind a word boundary and a leading-character dispatch, which
+        # keeps the regex engine from trying every alternative at every position.
+        # The alternatives are non-capturing: the regex engine saves and restores
+        # every group mark on each branch, which dominates scans of large bundles.
+        group = lambda index: f"(?:{self.rules[index][0]})"
+        branches = []
+        if self.buckets:
+            branches.append(r'\b' + _dispatch({lead: "|".join(group(index) for index in indices)
+                                                for lead, indices in self.buckets.items()}))
+        branches.extend(group(index) for index in self.unbucketed)
+        self.scanner_source = "(?=" + "|".join(branches) + ")"
+
+    def pattern(self, index):
+        return self._compile(self.rules[index][0])
+
+    def find_indices(self, text):
+        """Return sorted indices of every rule whose pattern occurs in text"""
+        return sorted({index for index, _, _ in self.find_spans(text)})
+
+    def find_spans(self, text, pos=0, endpos=None):
+        """Return (rule index, start, end) for every occurrence of every rule, in text order
+
+        pos/endpos limit the scan like re.Pattern.finditer.
+        """
+        endpos = len(text) if endpos is None else endpos
+        spans = []
+        for match in self.scanner.finditer(text, pos, endpos):
+            start = match.start()
+            # Resolve which rules match here; case folding can map a character
+            # outside the buckets, in which case every rule is checked
+            bucket = self.buckets.get(text[start].lower())
+            candidates = bucket + self.unbucketed if bucket is not None else range(len(self.rules))
+            hits = []
+            for index in candidates:
+                found = self.pattern(index).match(text, start, endpos)
+                if found:
+                    hits.append((index, start, found.end()))
+            if not hits and bucket is not None:
+                for index in range(len(self.rules)):
+                    found = self.pattern(index).match(text, start, endpos)
+                    if found:
+                        hits.append((index, start, found.end()))
+            hits.sort()
+            spans.extend(hits)
+        return spans
+
+    def find_messages(self, text):
+        """Return the formatted message of every matching rule, in rule order"""
+        return [self.messages[index] for index in self.find_indices(text)]
@@ -0,0 +1,245 @@
+import math
+from PIL import Image
+from font_registry import get_font
+from image_cache import image_digest, thumbnail_size
+
+# Layers in z-order; every element belongs to one
+LAYERS = ("background", "logo", "packshots", "value_tile", "copy", "tag", "drinkaware")
+
+# Fixed geometry in full-resolution pixels - Appendix A predefined positions
+TEXT_X = 50  # Headline, subhead and tag are left-aligned
+LOGO_SIZE = (120, 40)
+LOGO_OFFSET = (140, 20)  # From the top-right corner
+VALUE_TILE_SIZE = (300, 100)
+VALUE_TILE_POSITION = (50, 100)  # Clubcard and New tiles
+VALUE_TILE_RIGHT_MARGIN = 50  # LEP sits right of the packshots
+HEADLINE_STYLE = {"font_size": 24, "fill": "#000000", "bottom_offset": 180}  # 20px minimum + buffer
+SUBHEAD_STYLE = {"font_size": 16, "fill": "#000000", "bottom_offset": 140}  # 12px minimum + buffer
+TAG_STYLE = {"font_size": 14, "fill": "#00539F", "bottom_offset": 100}
+DRINKAWARE_STYLE = {"font_size": 20, "fill": "#000000", "bottom_offset": 40}  # Minimum 20px - HARD FAIL
+DRINKAWARE_TEXT = "be drinkaware.co.uk"
+
+# Packshot boxes as fractions of the packshot area, by number of packshots (Appendix A: max 3)
+PACKSHOT_BOXES = {1: (0.6, 0.7), 2: (0.4, 0.6), 3: (0.3, 0.5)}
+VALUE_TILE_GAP = 20  # Between the value tile and the packshot area - Appendix B: nothing overlays the tile
+
+# Appendix B HARD FAIL: (top, bottom) bands kept free of text and logos, by aspect ratio (9:16 Stories only)
+SAFE_ZONE_INSETS = {(9, 16): (200, 250)}
+
+
+class Element:
+    """One positioned element of a scene
+
+    box is (left, top, right, bottom) in full-resolution pixels. style holds the
+    drawing parameters and content the source image, if any; together they
+    identify what the element looks like for caching and diffing.
+    """
+
+    __slots__ = ("name", "layer", "kind", "box", "z", "style", "content")
+
+    def __init__(self, name, layer, kind, box, z, style=None, content=None):
+        self.name = name
+        self.layer = layer
+        self.kind = kind
+        self.box = tuple(box)
+        self.z = z
+        self.style = style or {}
+        self.content = content
+
+    @property
+    def width(self):
+        return self.box[2] - self.box[0]
+
+    @property
+    def height(self):
+        return self.box[3] - self.box[1]
+
+    def key(self):
+        """Hashable description of the element, with images reduced to content digests"""
+        content = image_digest(self.content) if isinstance(self.content, Image.Image) else self.content
+        return (self.name, self.kind, self.box, self.z, repr(sorted(self.style.items())), content)
+
+    def overlaps(self, other):
+        return (self.box[0] < other.box[2] and other.box[0] < self.box[2]
+                and self.box[1] < other.box[3] and other.box[1] < self.box[3])
+
+    def __repr__(self):
+        return f"Element({self.name!r}, kind={self.kind!r}, box={self.box}, z={self.z})"
+
+
+class Scene:
+    """Declarative description of one creative: format dimensions and elements in z-order"""
+
+    def __init__(self, width, height, elements):
+        self.width = width
+        self.height = height
+        self.elements = sorted(elements, key=lambda element: element.z)
+
+    @property
+    def size(self):
+        return (self.width, self.height)
+
+    def element(self, name):
+        return next((element for element in self.elements if element.name == name), None)
+
+    def layer(self, name):
+        return [element for element in self.elements if element.layer == name]
+
+    def boxes(self):
+        """Return {element name: (left, top, right, bottom)}"""
+        return {element.name: element.box for element in self.elements}
+
+    def element_positions(self):
+        """Return {element name: {"x", "y", "width", "height"}} as taken by check_safe_zones"""
+        return {element.name: {"x": element.box[0], "y": element.box[1], "width": element.width,
+                               "height": element.height}
+                for element in self.elements if element.layer != "background"}
+
+    def overlapping(self, name):
+        """Names of the non-background elements whose boxes intersect the named element"""
+        target = self.element(name)
+        if target is None:
+            return []
+        return [element.name for element in self.elements
+                if element is not target and element.layer != "background" and element.overlaps(target)]
+
+    def key(self):
+        """Hashable description of the whole scene; equal keys render identical creatives"""
+        return (self.width, self.height, tuple(element.key() for element in self.elements))
+
+    def diff(self, other):
+        """Names of elements added, removed or changed between this scene and other"""
+        ours = {element.name: element.key() for element in self.elements}
+        theirs = {element.name: element.key() for element in other.elements}
+        return sorted(name for name in ours.keys() | theirs.keys() if ours.get(name) != theirs.get(name))
+
+
+def get_appropriate_tag(value_tile_type, clubcard_end_date, product_exclusivity, creative_links_to_tesco):
+    """Determine appropriate tag based on EXACT Appendix A rules"""
+    if not creative_links_to_tesco:
+        return "None"
+    
+    if value_tile_type == "Clubcard Price" and clubcard_end_date:
+        return f"Clubcard/app required. Ends {clubcard_end_date}"
+    elif product_exclusivity == "Exclusive":
+        return "Only at Tesco"
+    elif product_exclusivity == "Non-exclusive":
+        return "Available at Tesco"
+    else:
+        return "Selected stores. While stocks last."
+
+
+def _text_element(name, layer, z, text, style, x, y):
+    """Text element whose box is the inked area of text drawn at (x, y)"""
+    left, top, right, bottom = get_font(style["font_size"]).getbbox(text)
+    return Element(name, layer, "text", (x + left, y + top, x + right, y + bottom), z,
+                   dict(style, text=text, origin=(x, y)))
+
+
+def safe_zone_insets(width, height):
+    """(top, bottom) pixels kept free of text and logos for the format's aspect ratio"""
+    divisor = math.gcd(width, height)
+    return SAFE_ZONE_INSETS.get((width // divisor, height // divisor), (0, 0))
+
+
+def _packshot_elements(area, packshots, z):
+    """Packshots laid out inside area, (left, top, right, bottom); every box stays within it"""
+    packshots = packshots[:3]  # Limit to 3 as per Appendix A
+    if not packshots:
+        return []
+    left, top, right, bottom = area
+    width, height = right - left, bottom - top
+    fraction_x, fraction_y = PACKSHOT_BOXES[len(packshots)]
+    fit = (int(width * fraction_x), int(height * fraction_y))
+    elements = []
+    for i, packshot in enumerate(packshots):
+        packshot_width, packshot_height = thumbnail_size(packshot.size, fit) or packshot.size
+        if len(packshots) == 1:
+            # Single packshot - center it
+            x = (width - packshot_width) // 2
+            y = (height - packshot_height) // 2
+        elif len(packshots) == 2:
+            # Two packshots - side by side
+            x = (width // 4 if i == 0 else 3 * width // 4) - packshot_width // 2
+            y = (height - packshot_height) // 2
+        elif i == 0:
+            # Three packshots - triangular arrangement: top center
+            x = (width - packshot_width) // 2
+            y = height // 3 - packshot_height // 2
+        else:
+            # Bottom left, bottom right
+            x = (width // 3 if i == 1 else 2 * width // 3) - packshot_width // 2
+            y = 2 * height // 3 - packshot_height // 2
+        x, y = left + x, top + y
+        elements.append(Element(f"packshot_{i + 1}", "packshots", "image",
+                                (x, y, x + packshot_width, y + packshot_height), z + i,
+                                {"fit": fit}, packshot))
+    return elements
+
+
+def layout_scene(dimensions, spec):
+    """Lay out a creative spec (generate_creative keyword arguments) as a Scene, without drawing
+
+    Text boxes are measured with the registry fonts; packshot boxes follow from
+    the upload sizes, so the geometry is exact and costs microseconds. Fixed
+    positions are measured inside the format's safe zones, and packshots are
+    fitted to the area left clear of the value tile.
+    """
+    width, height = dimensions
+    safe_top, safe_bottom = safe_zone_insets(width, height)
+    z = {layer: index * 10 for index, layer in enumerate(LAYERS)}
+    elements = [Element("background", "background", "fill", (0, 0, width, height), z["background"],
+                        {"color": spec["bg_color"]}, spec["bg_image"] or None)]
+
+    # Appendix A: logo appears on all banners
+    if spec["show_logo"]:
+        x, y = width - LOGO_OFFSET[0], safe_top + LOGO_OFFSET[1]
+        elements.append(Element("logo", "logo", "logo", (x, y, x + LOGO_SIZE[0], y + LOGO_SIZE[1]), z["logo"]))
+
+    # Appendix A: value tile at its predefined position
+    packshot_area = [0, safe_top, width, height - safe_bottom]
+    value_tile_type = spec["value_tile_type"]
+    if value_tile_type != "None":
+        if value_tile_type == "Everyday Low Price":
+            # Appendix A: LEP positioned to the right of packshots
+            x = width - VALUE_TILE_SIZE[0] - VALUE_TILE_RIGHT_MARGIN
+            y = (safe_top + height - safe_bottom - VALUE_TILE_SIZE[1]) // 2
+            packshot_area[2] = x - VALUE_TILE_GAP
+        else:
+            x, y = VALUE_TILE_POSITION[0], safe_top + VALUE_TILE_POSITION[1]
+            packshot_area[1] = y + VALUE_TILE_SIZE[1] + VALUE_TILE_GAP
+        price_data = {
+            'clubcard_price': spec["clubcard_price"],
+            'regular_price': spec["regular_price"],
+            'lep_price': spec["lep_price"],
+            'end_date': spec["clubcard_end_date"]
+        }
+        elements.append(Element("value_tile", "value_tile", "value_tile",
+                                (x, y, x + VALUE_TILE_SIZE[0], y + VALUE_TILE_SIZE[1]), z["value_tile"],
+                                {"tile_type": value_tile_type, "price_data": price_data}))
+
+    elements.extend(_packshot_elements(packshot_area, tuple(spec["packshots"] or ()), z["packshots"]))
+
+    # Appendix A: headline and subhead left-aligned
+    if spec["headline"]:
+        elements.append(_text_element("headline", "copy", z["copy"], spec["headline"], HEADLINE_STYLE,
+                                      TEXT_X, height - safe_bottom - HEADLINE_STYLE["bottom_offset"]))
+    if spec["subhead"]:
+        elements.append(_text_element("subhead", "copy", z["copy"] + 1, spec["subhead"], SUBHEAD_STYLE,
+                                      TEXT_X, height - safe_bottom - SUBHEAD_STYLE["bottom_offset"]))
+
+    # Appendix A & B: Tesco tag when the creative links to Tesco
+    if spec["tag_type"] != "None" and spec["creative_links_to_tesco"]:
+        tag = get_appropriate_tag(spec["value_tile_type"], spec["clubcard_end_date"],
+                                  spec["product_exclusivity"], spec["creative_links_to_tesco"])
+        elements.append(_text_element("tag", "tag", z["tag"], tag, TAG_STYLE,
+                                      TEXT_X, height - safe_bottom - TAG_STYLE["bottom_offset"]))
+
+    # Appendix B HARD FAIL: Drinkaware for alcohol, centred
+    if spec["product_category"].lower() == "alcohol" and spec["include_drinkaware"]:
+        left, _, right, _ = get_font(DRINKAWARE_STYLE["font_size"]).getbbox(DRINKAWARE_TEXT)
+        elements.append(_text_element("drinkaware", "drinkaware", z["drinkaware"], DRINKAWARE_TEXT,
+                                      DRINKAWARE_STYLE, (width - (right - left)) // 2,
+                                      height - safe_bottom - DRINKAWARE_STYLE["bottom_offset"]))
+
+    return Scene(width, height, elements)
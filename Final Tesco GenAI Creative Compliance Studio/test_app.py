@@ -1,5 +1,29 @@
+import atexit
+import io
+import json
+import os
+import re
+import tempfile
+import zipfile
 import pytest
-from compliance_engine import AdvancedComplianceEngine
+from compliance_engine import AdvancedComplianceEngine, RULESET_ARTIFACT_VERSION
+from rule_matcher import PatternBundle
+from violations import Violation, SEVERITY_HARD_FAIL
+from violation_log import ViolationLog
+from PIL import Image, ImageDraw
+import numpy as np
+from font_registry import FontRegistry
+import image_cache
+from image_cache import ResizeCache, image_digest
+from creative_renderer import generate_creative, render_formats, format_dimensions, LayeredCompositor, render_creative
+from scene import layout_scene
+from export_encoder import BudgetedEncoder, bundle_bytes
+from lru_cache import LRUCache
+from artifact_store import ArtifactStore, spill_root
+import background_remover
+from background_remover import (remove_background_ai, border_connected, enhance_image_quality,
+                                apply_creative_filters, process_tiled, ProcessedPackshotCache, process_packshot,
+                                process_packshots, create_placeholder_image)
 from value_tile_generator import generate_value_tile, validate_value_tile_design
 from ai_creative_generator import AICreativeSuggestor
 
@@ -74,7 +98,294 @@ class TestTescoCreativeStudio:
         assert "HARD FAIL" in result["issues"][0]
         
         print("✅ Compliance engine HARD FAIL tests passed!")
-    
+
+    def test_forbidden_term_matcher(self):
+        """Test single-scan matcher agrees with the per-term word-boundary search"""
+        terms = self.compliance_engine.hard_rules["forbidden_claims"]
+        matcher = self.compliance_engine.forbidden_matcher
+
+        for text in ["win a free prize!", "terms and conditions apply", "a winning winner",
+                     "suicide bombing jihad", "only £2.99 - act now", "new look great taste"]:
+            expected = [term for term in terms
+                        if re.search(r'\b' + re.escape(term) + r'\b', text, re.IGNORECASE)]
+            assert matcher.find_terms(text) == expected
+
+        # Duplicate guideline entries are still reported once per entry
+        assert matcher.find_terms("winning").count("winning") == 2
+
+        print("✅ Forbidden term matcher tests passed!")
+
+    def test_category_pattern_bundle(self):
+        """Test category bundles report every matching rule, including overlapping ones"""
+        bundle = PatternBundle([
+            (r'\bsuicide\b', "Suicide"),
+            (r'\bsuicide bomb\b', "Suicide bomb"),
+            (r'\bimprove\b.*\bhealth\b', "Health improvement"),
+            (r'\bhealth\b', "Health"),
+            (r'†|‡', "Reference symbol"),
+        ], template="HARD FAIL: {message}")
+
+        assert bundle.find_messages("improve your health - suicide bomb†") == [
+            "HARD FAIL: Suicide", "HARD FAIL: Suicide bomb", "HARD FAIL: Health improvement",
+            "HARD FAIL: Health", "HARD FAIL: Reference symbol"]
+        assert bundle.find_messages("new look") == []
+
+        print("✅ Category pattern bundle tests passed!")
+
+    def test_text_match_spans(self):
+        """Test every text hit carries its rule, field and offsets in the original copy"""
+        headline, subhead = "Win a  FREE prize", "Subject to terms and"
+        result = self.compliance_engine.check_text_compliance(headline, subhead)
+        matches = result["matches"]
+
+        for match in matches:
+            source = headline if match["field"] == "headline" else subhead
+            assert source[match["start"]:match["end"]] == match["text"]
+            assert self.compliance_engine.rule_catalog[match["rule_id"]][0] == match["category"]
+
+        win = next(m for m in matches if m["category"] == "forbidden_claim" and m["text"] == "Win")
+        assert (win["field"], win["start"], win["end"], win["alternative"]) == ("headline", 0, 3, "discover")
+        assert any(m["text"] == "FREE" and m["start"] == 7 for m in matches)
+
+        # Issue strings are derived from the matched rules
+        matched_rules = {m["rule_id"] for m in matches}
+        assert all(any(self.compliance_engine.rule_catalog[rule_id][2] == issue for rule_id in matched_rules)
+                   for issue in result["issues"])
+
+        # A hit across the headline/subhead join is reported in both fields
+        result = self.compliance_engine.check_text_compliance("Terms and", "conditions apply")
+        joined = [m for m in result["matches"] if m["text"] in ("Terms and", "conditions")]
+        assert {m["field"] for m in joined} == {"headline", "subhead"}
+
+        print("✅ Text match span tests passed!")
+
+    def test_violation_records(self):
+        """Test checks produce compact rule-id records that render to the reported text"""
+        engine = self.compliance_engine
+        result = engine.check_text_compliance("Win a prize*", "Healthy choice", "Alcohol")
+        violations = engine.text_violations("Win a prize*", "Healthy choice", "Alcohol")
+        assert engine.render_violations(violations) == result["issues"]
+        assert not hasattr(violations[0], "__dict__")
+        assert violations[0].span == ("headline", 0, 3) and violations[0].severity == SEVERITY_HARD_FAIL
+
+        creative_data = {"headline": "Win a prize", "subhead": "New look", "product_category": "Alcohol",
+                         "value_tile_type": "Everyday Low Price", "packshots": []}
+        formats = ["Instagram Square (1080x1080)", "Instagram Stories (1080x1920)"]
+        reports = engine.full_campaign_audit(creative_data, formats)
+        records = engine.full_campaign_violations(creative_data, formats)
+        for format_name in formats:
+            assert engine.render_violations(v for v in records[format_name] if v.is_hard_fail) == \
+                reports[format_name]["hard_fails"]
+            assert engine.render_violations(v for v in records[format_name] if not v.is_hard_fail) == \
+                reports[format_name]["warnings"]
+
+        # Analytics can group by rule id without parsing strings
+        categories = {engine.rule_info(v.rule_id)["category"] for v in records[formats[1]]}
+        assert {"forbidden_claim", "safe_zone", "drinkaware", "packshot"} <= categories
+
+        # Registered rules survive rule reloads and render their detail at display time
+        engine.register_rules([("test.end_date", "value_tile", SEVERITY_HARD_FAIL, "HARD FAIL: {detail} (Appendix A)")])
+        engine.hard_rules = engine.hard_rules
+        record = engine.rule_violation("test.end_date", detail="Month must be between 01 and 12")
+        assert record == Violation(engine.rule_keys["test.end_date"], SEVERITY_HARD_FAIL,
+                                   detail="Month must be between 01 and 12", catalog_version=engine.catalog_version)
+        assert engine.render_violation(record) == "HARD FAIL: Month must be between 01 and 12 (Appendix A)"
+
+        # Records are pinned to the catalog they index; stale ids are refused, not misread
+        engine.register_rules([("test.aaa", "value_tile", SEVERITY_HARD_FAIL, "HARD FAIL: other rule")])
+        try:
+            engine.render_violation(record)
+            assert False, "stale violation record rendered against a changed catalog"
+        except ValueError:
+            pass
+        assert engine.render_violation(engine.rule_violation("test.end_date", detail="x")) == "HARD FAIL: x (Appendix A)"
+
+        print("✅ Violation record tests passed!")
+
+    def test_incremental_text_checker(self):
+        """Test keystroke updates rescan only around the edit and match a full check"""
+        engine = self.compliance_engine
+        checker = engine.incremental_checker("Alcohol")
+        subhead = "Cheers to that"
+        typed = ""
+        for char in "Win a prize - hurry, healthy offer!":
+            typed += char
+            assert checker.update(typed, subhead) == engine.check_text_compliance(typed, subhead, "Alcohol")
+
+        # Deleting a word ending a '.*' claim removes it, inserting one mid-copy adds it back
+        for headline in ["Win a prize - hurry, healthy", "Win a prize - hurry, best healthy"]:
+            assert checker.update(headline, subhead) == engine.check_text_compliance(headline, subhead, "Alcohol")
+        assert checker.stats["full"] == 1 and checker.stats["incremental"] >= 30
+
+        # Large edits fall back to a full scan
+        checker.update("Fresh bakery " * 20, subhead)
+        assert checker.stats["full"] == 2
+
+        print("✅ Incremental text checker tests passed!")
+
+    def test_batch_text_compliance(self):
+        """Test batch API streams results in input order"""
+        pairs = [("Win a free prize!", "Limited time offer"), ("New product launch", "Great quality"),
+                 ("Healthy choice", "Good for you")] * 3
+        expected = [self.compliance_engine.check_text_compliance(h, s, "Alcohol") for h, s in pairs]
+
+        results = list(self.compliance_engine.check_text_compliance_batch(
+            pairs, product_category="Alcohol", workers=2, chunk_size=2))
+        assert results == expected
+
+        # The spawned pool is kept for later batches with the same rules
+        pool = self.compliance_engine._batch_pool
+        assert list(self.compliance_engine.check_text_compliance_batch(
+            pairs, product_category="Alcohol", workers=2, chunk_size=4)) == expected
+        assert self.compliance_engine._batch_pool is pool
+
+        print("✅ Batch text compliance tests passed!")
+
+    def test_verdict_cache(self):
+        """Test cached verdicts are reused and invalidated when the rules change"""
+        engine = AdvancedComplianceEngine(verdict_cache_size=2)
+        first = engine.check_text_compliance("Great Taste", "New look")
+        second = engine.check_text_compliance("great taste ", "NEW LOOK")
+        assert first == second and first["approved"]
+        assert engine.verdict_cache_info()["hits"] == 1
+
+        # Mutating a returned verdict must not leak into the cache
+        second["issues"].append("tampered")
+        assert engine.check_text_compliance("Great Taste", "New look")["issues"] == []
+
+        # In-place edits of the returned copy do nothing until it is assigned back
+        rules = engine.hard_rules
+        rules["forbidden_claims"] = rules["forbidden_claims"] + ["taste"]
+        assert engine.check_text_compliance("Great Taste", "New look")["approved"]
+        engine.hard_rules = rules
+        assert engine.verdict_cache_info()["size"] == 0
+        assert not engine.check_text_compliance("Great Taste", "New look")["approved"]
+
+        print("✅ Verdict cache tests passed!")
+
+    def test_compiled_rule_artifact(self):
+        """Test the compiled rule set is persisted once and reloaded by later engines"""
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cold = AdvancedComplianceEngine(rule_cache_dir=cache_dir)
+            warm = AdvancedComplianceEngine(rule_cache_dir=cache_dir)
+            assert cold.rule_load_stats["source"] == "compiled"
+            assert warm.rule_load_stats["source"] == "artifact"
+            assert warm.rules_version == cold.rules_version
+
+            for headline, subhead in [("Killer deal", "Win a prize*"), ("Healthy choice", "Cheers to that")]:
+                assert (warm.check_text_compliance(headline, subhead, "Alcohol")
+                        == cold.check_text_compliance(headline, subhead, "Alcohol"))
+
+            # Changing the guidelines changes the source hash and forces a rebuild
+            rules = warm.hard_rules
+            rules["forbidden_claims"] = rules["forbidden_claims"] + ["crunchy"]
+            warm.hard_rules = rules
+            assert warm.rule_load_stats["source"] == "compiled"
+            assert warm.rules_version != cold.rules_version
+            # Only the current version's artifact is kept
+            assert os.listdir(cache_dir) == [f"ruleset-v{RULESET_ARTIFACT_VERSION}-{warm.rules_version}.json"]
+
+            # Descriptions and alternatives baked into the catalog are part of the version too
+            class RewordedEngine(AdvancedComplianceEngine):
+                def get_rule_description(self, term):
+                    return "Reworded" if term == "win" else super().get_rule_description(term)
+
+            reworded = RewordedEngine(rule_cache_dir=cache_dir)
+            assert reworded.rule_load_stats["source"] == "compiled"
+            assert "Reworded" in reworded.check_text_compliance("Win big", "New look")["issues"][0]
+
+            # A truncated or foreign artifact with the right version is recompiled, not trusted
+            path = os.path.join(cache_dir, os.listdir(cache_dir)[0])
+            with open(path, encoding="utf-8") as f:
+                artifact = json.load(f)
+            for damaged in ({"rules_version": reworded.rules_version}, dict(artifact, text_bundles=[{"rules": []}])):
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(damaged, f)
+                rebuilt = RewordedEngine(rule_cache_dir=cache_dir)
+                assert rebuilt.rule_load_stats["source"] == "compiled"
+                assert not rebuilt.check_text_compliance("Win big", "New look")["approved"]
+
+        # Without a configured directory nothing is persisted
+        assert AdvancedComplianceEngine().rule_cache_dir is None
+
+        print("✅ Compiled rule artifact tests passed!")
+
+    def test_full_campaign_audit(self):
+        """Test campaign audit shares format-independent checks across formats"""
+        creative_data = {"headline": "Win a prize", "subhead": "New look", "product_category": "Alcohol",
+                         "value_tile_type": "Clubcard Price", "packshots": ["lead"]}
+        formats = ["Instagram Square (1080x1080)", "Instagram Stories (1080x1920)"]
+
+        reports = self.compliance_engine.full_campaign_audit(creative_data, formats)
+        assert self.compliance_engine.verdict_cache_info()["misses"] == 1
+
+        for format_name in formats:
+            design = self.compliance_engine.validate_creative_design(creative_data, format_name)
+            assert reports[format_name]["design_compliance"] == design
+            assert reports[format_name] == self.compliance_engine.full_creative_audit(creative_data, format_name)
+        assert "9:16" in reports[formats[1]]["hard_fails"][len(reports[formats[1]]["text_compliance"]["issues"])]
+        assert len(reports[formats[1]]["hard_fails"]) == len(reports[formats[0]]["hard_fails"]) + 1
+
+        print("✅ Full campaign audit tests passed!")
+
+    def test_violation_log(self):
+        """Test the violation log stays bounded, keeps rollups and persists in batches"""
+        with tempfile.TemporaryDirectory() as log_dir:
+            path = os.path.join(log_dir, "violations.sqlite3")
+            engine = AdvancedComplianceEngine(violation_log_path=path, violation_log_size=2)
+            engine.violation_log.batch_size = 4
+            creative_data = {"headline": "Win a prize", "subhead": "", "product_category": "Alcohol",
+                             "packshots": [object()]}
+            violations = engine.full_campaign_violations(creative_data, ["Instagram Square (1080x1080)"])
+            records = violations["Instagram Square (1080x1080)"]
+            for _ in range(3):
+                event = engine.log_violation(creative_data, records, "Instagram Square (1080x1080)")
+            engine.log_violation(creative_data, ["HARD FAIL: Drinkaware required for alcohol campaigns"], "Story")
+
+            # Only the newest events are held in memory, without the creative data
+            assert len(engine.violation_history) == 2 and "creative_data" not in event
+            summary = engine.violation_log.summary()
+            assert summary["total_violations"] == 3 * len(records) + 1
+            assert dict(summary["by_category"])["drinkaware"] == 4
+
+            rows = engine.violation_log.query(rule="drinkaware:design.drinkaware_required")
+            assert len(rows) == 4 and rows[0]["format"] == "Story"
+            engine.violation_log.close()
+
+            # Rollups reload from the store without reading the violation rows
+            reopened = ViolationLog(path)
+            assert reopened.rule_counts == engine.violation_log.rule_counts
+            reopened.close()
+
+            # Rows that fail to write are retried on the next flush rather than lost
+            failing = ViolationLog(log_dir, batch_size=1)
+            failing.record("Story", "Alcohol", [("drinkaware:design.drinkaware_required", "drinkaware",
+                                                  None, SEVERITY_HARD_FAIL, None)])
+            assert failing.summary()["pending_writes"] == 1
+            failing.path = os.path.join(log_dir, "retry.sqlite3")
+            assert len(failing.query()) == 1 and failing.summary()["pending_writes"] == 0
+            failing.close()
+
+            # Reconnecting does not stack exit handlers, and closing removes the handler
+            registered = []
+            register, unregister = atexit.register, atexit.unregister
+            atexit.register, atexit.unregister = registered.append, registered.remove
+            try:
+                reopened = ViolationLog(path)
+                for _ in range(2):
+                    reopened.close()
+                    reopened.query()
+                assert registered == [reopened.flush]
+                reopened.close()
+                assert registered == []
+            finally:
+                atexit.register, atexit.unregister = register, unregister
+
+        # The history only reaches disk when a path is configured
+        assert AdvancedComplianceEngine().violation_log.path is None
+
+        print("✅ Violation log tests passed!")
+
     def test_value_tile_generation_appendix_a(self):
         """Test value tile generation according to Appendix A"""
         # Test Clubcard tile - flat design, predefined
@@ -93,6 +404,444 @@ class TestTescoCreativeStudio:
         
         print("✅ Value tile generation Appendix A tests passed!")
     
+    def test_font_registry(self):
+        """Test fonts are loaded once per family and size, and fallbacks are counted"""
+        registry = FontRegistry(maxsize=2, families=("DejaVuSans.ttf", "No Such Font"))
+        if registry.paths["DejaVuSans.ttf"]:
+            font = registry.get(24, "DejaVuSans.ttf")
+            assert registry.get(24, "DejaVuSans.ttf") is font
+            assert registry.info()["hits"] == 1
+
+            # Least recently used sizes are evicted
+            registry.get(16, "DejaVuSans.ttf")
+            registry.get(14, "DejaVuSans.ttf")
+            assert len(registry.fonts) == 2 and registry.get(24, "DejaVuSans.ttf") is not font
+
+            # Sizes derived from tiny canvases are clamped instead of failing in truetype
+            assert registry.get(0, "DejaVuSans.ttf") is registry.get(1, "DejaVuSans.ttf")
+
+        assert registry.paths["No Such Font"] is None
+        assert registry.get(24, "No Such Font") is registry.get(16, "No Such Font")
+        assert registry.info()["fallbacks"] == 2
+        assert create_placeholder_image(10, 10).size == (10, 10)
+
+        print("✅ Font registry tests passed!")
+    
+    def test_parallel_format_rendering(self):
+        """Test parallel rendering matches one-at-a-time rendering, in format order"""
+        formats = ["Instagram Stories (1080x1920)", "Instagram Square (1080x1080)", "Facebook Landscape (1200x628)"]
+        spec = {
+            "packshots": [Image.new("RGBA", (900, 1400), (200, 30, 30, 255)), Image.new("RGB", (600, 600), "white")],
+            "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Clubcard Price",
+            "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": True,
+            "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "", "clubcard_end_date": "23/06",
+            "product_category": "Alcohol", "product_exclusivity": "Exclusive", "creative_links_to_tesco": True
+        }
+
+        images = render_formats(formats, spec, max_workers=3)
+        assert [image.size for image in images] == [format_dimensions(name) for name in formats]
+        for format_name, image in zip(formats, images):
+            expected = generate_creative(format_dimensions(format_name), **spec)
+            assert image.tobytes() == expected.tobytes()
+
+        print("✅ Parallel format rendering tests passed!")
+    
+    def test_packshot_resize_cache(self):
+        """Test cached packshot fits match thumbnail() and are reused for equal content"""
+        cache = ResizeCache(max_bytes=4 * 1024 * 1024)
+        packshot = Image.effect_noise((1600, 2400), 40).convert("RGBA")
+
+        expected = packshot.copy()
+        expected.thumbnail((648, 1344), Image.Resampling.LANCZOS)
+        fitted = cache.fit(packshot, (648, 1344))
+        assert fitted.size == expected.size and fitted.tobytes() == expected.tobytes()
+
+        # A re-opened upload with the same pixels hits the cache
+        assert cache.fit(packshot.copy(), (648, 1344)) is fitted
+        assert cache.info()["hits"] == 1
+        assert cache.fit(packshot, (324, 672)) is not fitted
+
+        # The cache stays within its byte budget
+        for box in [(800, 1200), (900, 1300), (1000, 1400)]:
+            cache.fit(packshot, box)
+        assert cache.info()["bytes"] <= 4 * 1024 * 1024
+
+        print("✅ Packshot resize cache tests passed!")
+    
+    def test_layered_compositor(self):
+        """Test an edit rebuilds only the layers whose inputs changed"""
+        compositor = LayeredCompositor()
+        spec = {
+            "packshots": (Image.effect_noise((600, 900), 40).convert("RGBA"),),
+            "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Everyday Low Price",
+            "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": False,
+            "clubcard_price": "", "regular_price": "", "lep_price": "£2.99", "clubcard_end_date": "",
+            "product_category": "General", "product_exclusivity": "Exclusive", "creative_links_to_tesco": True,
+            "show_logo": True
+        }
+        compositor.render((1080, 1920), spec)
+        edited = dict(spec, headline="New look, new recipe")
+        image = compositor.render((1080, 1920), edited)
+
+        layers = compositor.info()["layers"]
+        assert layers["copy"]["misses"] == 2
+        assert all(counts["hits"] == 1 for name, counts in layers.items() if name != "copy")
+        assert image.mode == "RGBA" and image.size == (1080, 1920)
+        assert image.tobytes() == LayeredCompositor().render((1080, 1920), edited).tobytes()
+
+        # Semi-transparent packshots blend over the background instead of punching holes in it
+        translucent = dict(spec, packshots=(Image.new("RGBA", (600, 900), (200, 30, 30, 191)),))
+        image = compositor.render((1080, 1920), translucent)
+        assert image.getchannel("A").getextrema() == (255, 255)
+        # Red at alpha 191 over #BFE0F5 (resampling may shift a channel by one)
+        blended = image.getpixel((540, 960))
+        assert blended[3] == 255 and all(abs(a - b) <= 1 for a, b in zip(blended, (198, 79, 84)))
+
+        print("✅ Layered compositor tests passed!")
+    
+    def test_preview_scale(self):
+        """Test previews render the same layout proportionally smaller"""
+        spec = {
+            "packshots": [Image.new("RGBA", (900, 1400), (200, 30, 30, 255))],
+            "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Clubcard Price",
+            "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": True,
+            "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "", "clubcard_end_date": "23/06",
+            "product_category": "Alcohol", "product_exclusivity": "Exclusive", "creative_links_to_tesco": True
+        }
+        full = generate_creative((1080, 1920), **spec)
+        assert generate_creative((1080, 1920), scale=1.0, **spec).tobytes() == full.tobytes()
+
+        preview = generate_creative((1080, 1920), scale=0.25, **spec)
+        assert preview.size == (270, 480)
+        # Same layout as the downscaled export, up to antialiasing of small text
+        reference = full.resize(preview.size, Image.Resampling.LANCZOS)
+        difference = sum(abs(a - b) for a, b in zip(preview.tobytes(), reference.tobytes())) / len(reference.tobytes())
+        assert difference < 4
+
+        assert [image.size for image in render_formats(["Facebook Landscape (1200x628)"], spec, scale=0.5)] == [(600, 314)]
+
+        print("✅ Preview scale tests passed!")
+    
+    def test_scene_layout_and_geometry_audit(self):
+        """Test scenes carry the rendered geometry and audits run on it without drawing"""
+        spec = {
+            "packshots": (Image.new("RGBA", (900, 1400), (200, 30, 30, 255)),),
+            "headline": "New look", "subhead": "Same great taste", "value_tile_type": "Clubcard Price",
+            "tag_type": "Auto", "bg_color": "#BFE0F5", "bg_image": None, "include_drinkaware": False,
+            "clubcard_price": "£3.50", "regular_price": "£4.50", "lep_price": "", "clubcard_end_date": "23/06",
+            "product_category": "General", "product_exclusivity": "Exclusive", "creative_links_to_tesco": True,
+            "show_logo": True
+        }
+        scene = layout_scene((1080, 1920), spec)
+        image, boxes = render_creative((1080, 1920), spec)
+        assert boxes == scene.boxes()
+        assert image.tobytes() == generate_creative((1080, 1920), **spec).tobytes()
+        # The packshot is fitted below the value tile, inside the 9:16 safe zones
+        assert boxes["value_tile"] == (50, 300, 350, 400) and boxes["packshot_1"] == (258, 607, 821, 1482)
+
+        # Layouts diff by element
+        edited = layout_scene((1080, 1920), dict(spec, headline="New look, new recipe"))
+        assert scene.diff(edited) == ["headline"]
+        # Scene keys tell reruns whether anything visible changed
+        assert layout_scene((1080, 1920), dict(spec)).key() == scene.key() != edited.key()
+
+        # The default layouts pass the geometry audit in every format and packshot count
+        engine = self.compliance_engine
+        for format_name in ["Instagram Stories (1080x1920)", "Instagram Square (1080x1080)",
+                            "Facebook Landscape (1200x628)"]:
+            for count in (1, 2, 3):
+                for tile_type in ("Clubcard Price", "Everyday Low Price"):
+                    laid_out = layout_scene(format_dimensions(format_name),
+                                            dict(spec, packshots=spec["packshots"] * count, value_tile_type=tile_type,
+                                                 product_category="Alcohol", include_drinkaware=True))
+                    assert engine.layout_violations(format_name, laid_out.boxes()) == []
+        assert engine.check_safe_zones("1080x1920", scene.element_positions())["passed"]
+
+        # Copy moved into the bottom 250px is caught by the 9:16 safe zone audit
+        violations = engine.layout_violations("Instagram Stories (1080x1920)", dict(boxes, headline=(50, 1700, 93, 1708)))
+        assert engine.render_violations(violations) == ["HARD FAIL: 9:16 format - headline is inside the bottom 250px"]
+
+        # Anything intersecting the value tile is reported by name; the square format has no safe zone
+        square = layout_scene((1080, 1080), spec)
+        boxes = dict(square.boxes(), headline=(60, 150, 200, 180), packshot_1=(300, 150, 700, 700))
+        overlaps = engine.layout_violations("Instagram Square (1080x1080)", boxes)
+        assert [violation.detail for violation in overlaps] == ["packshot_1", "headline"]
+
+        print("✅ Scene layout and geometry audit tests passed!")
+    
+    def test_budgeted_export_encoder(self):
+        """Test exports are searched down to the byte budget and report their settings"""
+        noise = Image.blend(Image.linear_gradient("L").resize((400, 400)),
+                            Image.effect_noise((400, 400), 50), 0.5).convert("RGBA")
+        encoder = BudgetedEncoder(max_bytes=60_000)
+        png, jpeg = encoder.encode_all([noise], ("PNG", "JPEG"))
+        assert (png["codec"], jpeg["codec"]) == ("PNG", "JPEG")
+        for result in (png, jpeg):
+            assert result["within_budget"] and result["bytes"] == len(result["data"]) <= 60_000
+        assert png["settings"]["colors"] < 256 and 10 < jpeg["settings"]["quality"] < 95
+        # The chosen quality is the highest that fits
+        assert len(encoder.encode(noise, "jpg")["data"]) == jpeg["bytes"]
+        assert BudgetedEncoder(max_bytes=60_000, min_quality=jpeg["settings"]["quality"] + 1).encode(
+            noise, "JPEG")["bytes"] > 60_000
+        decoded = Image.open(io.BytesIO(jpeg["data"]))
+        assert decoded.format == "JPEG" and decoded.mode == "RGB" and decoded.size == (400, 400)
+
+        # Simple creatives stay lossless, impossible budgets are flagged
+        flat = Image.new("RGB", (400, 400), "#00539F")
+        assert encoder.encode(flat, "PNG")["settings"] == {"colors": None}
+        assert not BudgetedEncoder(max_bytes=100).encode(noise, "JPEG")["within_budget"]
+
+        print("✅ Budgeted export encoder tests passed!")
+    
+    def test_encoded_artifact_cache(self):
+        """Test each image is encoded once per codec and budget"""
+        encoder = BudgetedEncoder(max_bytes=60_000, cache=LRUCache(16, sizeof=lambda result: len(result["data"])))
+        creative = Image.new("RGB", (400, 400), "#BFE0F5")
+        first = encoder.encode_all([creative], ("PNG", "JPEG"))
+        # Reruns and identical pixels in a new image object are cache hits, flagged with their own timing
+        rerun = encoder.encode_all([creative.copy()], ("png", "jpg"))
+        assert not any(result["cached"] for result in first) and all(result["cached"] for result in rerun)
+        assert [dict(result, cached=False, seconds=None) for result in rerun] == \
+            [dict(result, seconds=None) for result in first]
+        assert encoder.info()["hits"] == 2 and encoder.info()["misses"] == 2
+        assert encoder.info()["bytes"] == sum(result["bytes"] for result in first)
+
+        # New pixels, or a different budget sharing the cache, are encoded afresh
+        encoder.encode(Image.new("RGB", (400, 400), "#00539F"), "PNG")
+        assert encoder.info()["misses"] == 3
+        BudgetedEncoder(max_bytes=1000, cache=encoder.cache).encode(creative, "JPEG")
+        assert encoder.info()["misses"] == 4
+
+        print("✅ Encoded artifact cache tests passed!")
+    
+    def test_zip_bundle_export(self):
+        """Test the all-formats ZIP stores every creative and codec with a manifest"""
+        creatives = [
+            {"format": "Instagram Square (1080x1080)", "image": Image.new("RGB", (108, 108), "#BFE0F5"),
+             "dimensions": (108, 108), "elements": {"logo": (0, 0, 12, 4)}, "layout_violations": []},
+            {"format": "Facebook Landscape (1200x628)", "image": Image.new("RGBA", (120, 63), (0, 83, 159, 255)),
+             "dimensions": (120, 63), "elements": {}, "layout_violations": ["HARD FAIL: example"]}
+        ]
+        archive, manifest = bundle_bytes(creatives, ("PNG", "JPEG"), BudgetedEncoder(), max_workers=2)
+        with zipfile.ZipFile(io.BytesIO(archive)) as bundle:
+            members = {info.filename: info for info in bundle.infolist()}
+            assert list(members) == ["tesco_compliant_instagram_square_(1080x1080).png",
+                                     "tesco_compliant_instagram_square_(1080x1080).jpg",
+                                     "tesco_compliant_facebook_landscape_(1200x628).png",
+                                     "tesco_compliant_facebook_landscape_(1200x628).jpg", "manifest.json"]
+            assert all(info.compress_type == zipfile.ZIP_STORED for name, info in members.items()
+                       if name != "manifest.json")
+            assert json.loads(bundle.read("manifest.json")) == manifest
+            png = Image.open(io.BytesIO(bundle.read("tesco_compliant_facebook_landscape_(1200x628).png")))
+            assert png.size == (120, 63)
+
+        second = manifest["creatives"][1]
+        assert second["dimensions"] == [120, 63] and second["layout_violations"] == ["HARD FAIL: example"]
+        assert [entry["codec"] for entry in second["files"]] == ["PNG", "JPEG"]
+        assert all(entry["within_budget"] and entry["bytes"] > 0 for entry in second["files"])
+
+        print("✅ ZIP bundle export tests passed!")
+    
+    def test_session_artifact_store(self):
+        """Test creatives are kept encoded within a session budget, spilling the oldest to disk"""
+        creatives = [Image.effect_noise((120, 120), sigma).convert("RGB") for sigma in (20, 40, 60)]
+        with tempfile.TemporaryDirectory() as spill_dir:
+            store = ArtifactStore(max_bytes=50_000, spill_dir=spill_dir)
+            handles = [store.put_image(creative) for creative in creatives]
+            assert store.bytes <= 50_000 and store.info()["spilled"] == 1
+            # Every creative decodes losslessly, from memory or the spill directory
+            for handle, creative in zip(handles, creatives):
+                assert store.image(handle).tobytes() == creative.tobytes()
+            # Each store spills into its own private directory
+            assert os.path.dirname(store.spill_dir) == spill_dir and os.listdir(store.spill_dir) == [handles[0]]
+            assert os.stat(store.spill_dir).st_mode & 0o777 == 0o700
+            other = ArtifactStore(max_bytes=0, spill_dir=spill_dir, spill_max_bytes=0)
+            assert other.put_image(creatives[0]) == handles[0] and other.spill_dir != store.spill_dir
+            # Another store pruning to its own cap leaves this store's files alone
+            assert other.info()["evictions"] == 1 and os.listdir(other.spill_dir) == []
+            assert store.image(handles[0]).tobytes() == creatives[0].tobytes()
+            store.discard(handles[2])
+            assert handles[2] not in store and store.data(handles[2]) is None
+
+            # A spilled file that no longer matches its digest is never served
+            with open(os.path.join(store.spill_dir, handles[0]), "wb") as f:
+                f.write(b"tampered")
+            assert store.data(handles[0]) is None and handles[0] not in store
+            assert os.listdir(store.spill_dir) == []
+
+        # The default spill directory is private to this process
+        assert os.stat(spill_root()).st_mode & 0o777 == 0o700 and os.stat(spill_root()).st_uid == os.getuid()
+
+        store = ArtifactStore(max_bytes=50_000, spill=False)
+        handles = [store.put_image(creative) for creative in creatives]
+        assert store.data(handles[0]) is None and store.info()["evictions"] == 1
+        assert store.image(handles[-1]).size == (120, 120)
+
+        print("✅ Session artifact store tests passed!")
+    
+    def test_vectorized_background_removal(self):
+        """Test background removal matches the per-pixel light-background rule exactly"""
+        image = Image.effect_noise((61, 47), 60).convert("RGB")
+        image.paste((250, 250, 250), (0, 0, 20, 47))
+        image.paste((210, 230, 205), (20, 0, 30, 47))
+        image.paste((255, 200, 255), (30, 0, 40, 47))
+        for mode in ("RGB", "RGBA", "L", "P"):
+            source = image.convert(mode)
+            expected = source.convert("RGBA")
+            pixels = expected.load()
+            for x in range(expected.width):
+                for y in range(expected.height):
+                    r, g, b, a = pixels[x, y]
+                    if r > 200 and g > 200 and b > 200:
+                        pixels[x, y] = (r, g, b, 0)
+            result = remove_background_ai(source)
+            assert result.mode == "RGBA" and result.tobytes() == expected.tobytes()
+
+        # Alpha outside the light background is kept
+        assert remove_background_ai(Image.new("RGBA", (4, 4), (10, 20, 30, 77))).getpixel((0, 0)) == (10, 20, 30, 77)
+
+        print("✅ Vectorized background removal tests passed!")
+    
+    def test_border_seeded_segmentation(self):
+        """Test the border engine keeps light regions enclosed by the product"""
+        packshot = Image.new("RGB", (1200, 900), (245, 245, 245))
+        draw = ImageDraw.Draw(packshot)
+        draw.rectangle((300, 100, 900, 800), fill=(30, 90, 160))
+        draw.rectangle((400, 300, 800, 500), fill=(255, 255, 255))  # White label
+        threshold = remove_background_ai(packshot.copy(), engine="threshold")
+        border = remove_background_ai(packshot.copy(), engine="border")
+        assert threshold.getpixel((600, 400))[3] == 0
+        assert border.getpixel((600, 400))[3] == 255 and border.getpixel((650, 150))[3] == 255
+        assert border.getpixel((10, 10))[3] == 0 and border.getpixel((1190, 890))[3] == 0
+        # Edges are refined at full resolution: only light pixels ever become transparent
+        assert border.getchannel("A").crop((300, 100, 901, 801)).getextrema() == (255, 255)
+
+        # Light pixels enclosed by a ring are not background; the ring itself is
+        mask = np.ones((5, 5), dtype=bool)
+        mask[1:4, 1:4] = False
+        mask[2, 2] = True
+        expected = mask.copy()
+        expected[2, 2] = False
+        assert (border_connected(mask) == expected).all()
+
+        print("✅ Border-seeded segmentation tests passed!")
+    
+    def test_tiled_packshot_processing(self):
+        """Test tiled processing matches whole-image processing within a small memory budget"""
+        packshot = Image.blend(Image.effect_noise((530, 410), 60).convert("RGB"),
+                               Image.linear_gradient("L").resize((530, 410)).convert("RGB"), 0.5)
+        draw = ImageDraw.Draw(packshot)
+        draw.rectangle((150, 80, 400, 330), fill=(30, 90, 160))
+        draw.rectangle((200, 160, 350, 250), fill=(255, 255, 255))
+        budget = 128 * 128 * 32  # Tiles of about 128px, so every step crosses tile seams
+
+        assert enhance_image_quality(packshot, max_bytes=budget).tobytes() == enhance_image_quality(packshot).tobytes()
+        for filter_type in ("Warm", "Cool", "Vibrant"):
+            assert (apply_creative_filters(packshot, filter_type, max_bytes=budget).tobytes()
+                    == apply_creative_filters(packshot, filter_type).tobytes())
+        assert (remove_background_ai(packshot.copy(), max_bytes=budget).tobytes()
+                == remove_background_ai(packshot.copy()).tobytes())
+        # The border engine's upsampled mask may round differently at a tile seam
+        tiled = np.asarray(remove_background_ai(packshot.copy(), engine="border", max_bytes=budget))
+        whole = np.asarray(remove_background_ai(packshot.copy(), engine="border"))
+        assert (tiled != whole).any(axis=2).sum() <= 4
+
+        # Tiles are cut with their margin, clamped to the image
+        boxes = []
+        result = process_tiled(packshot, lambda tile, box: boxes.append(box) or tile, budget, margin=8)
+        assert result.tobytes() == packshot.tobytes() and boxes[0] == (0, 0, 120, 120) and len(boxes) == 20
+
+        print("✅ Tiled packshot processing tests passed!")
+    
+    def test_processed_packshot_cache(self):
+        """Test processed packshots are cached by content and parameters, in memory and on disk"""
+        packshot = Image.new("RGB", (300, 200), (245, 245, 245))
+        ImageDraw.Draw(packshot).rectangle((100, 50, 200, 150), fill=(30, 90, 160))
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ProcessedPackshotCache(directory=directory)
+            cutout, mask = cache.process(packshot, remove_bg=True, engine="border")
+            assert cutout.tobytes() == remove_background_ai(packshot, engine="border").tobytes()
+            assert mask.mode == "L" and mask.getpixel((0, 0)) == 0 and mask.getpixel((150, 100)) == 255
+
+            # Same pixels in a fresh upload hit; other parameters miss
+            assert cache.process(packshot.copy(), remove_bg=True, engine="border")[0] is cutout
+            enhanced, enhanced_mask = cache.process(packshot, remove_bg=True, enhance=True, engine="border")
+            assert enhanced.mode == "RGB" and enhanced_mask.tobytes() == mask.tobytes()
+            assert cache.process(packshot, enhance=True)[1] is None
+            assert (cache.info()["hits"], cache.info()["misses"]) == (1, 3)
+
+            # A new process (or a cold cache) reads the persisted entries back losslessly
+            restarted = ProcessedPackshotCache(directory=directory)
+            restored, restored_mask = restarted.process(packshot, remove_bg=True, engine="border")
+            assert restored.tobytes() == cutout.tobytes() and restored_mask.tobytes() == mask.tobytes()
+            assert restarted.info()["disk_hits"] == 1
+
+            # Entries persisted by an earlier processing version are not reused
+            background_remover.PACKSHOT_PROCESSING_VERSION += 1
+            try:
+                assert ProcessedPackshotCache(directory=directory).lookup(
+                    restarted.key(packshot, True, False, "border")) is None
+            finally:
+                background_remover.PACKSHOT_PROCESSING_VERSION -= 1
+
+        # Large images are digested in strips without changing the digest
+        image_cache.DIGEST_CHUNK_BYTES = 1000
+        try:
+            assert image_digest(packshot.copy()) == image_digest(packshot)
+        finally:
+            image_cache.DIGEST_CHUNK_BYTES = 4 * 1024 * 1024
+
+        # RGBA sources are not modified by background removal
+        rgba = packshot.convert("RGBA")
+        ProcessedPackshotCache().process(rgba, remove_bg=True)
+        assert rgba.getpixel((0, 0))[3] == 255
+
+        print("✅ Processed packshot cache tests passed!")
+    
+    def test_parallel_packshot_pipeline(self):
+        """Test packshots are processed in worker processes, in order, with progress"""
+        packshots = []
+        for size, colour in ((300, (30, 90, 160)), (240, (200, 40, 40)), (360, (40, 160, 60))):
+            packshot = Image.new("RGB", (size, size), (245, 245, 245))
+            ImageDraw.Draw(packshot).ellipse((size // 4, size // 4, 3 * size // 4, 3 * size // 4), fill=colour)
+            packshots.append(packshot)
+        cache = ProcessedPackshotCache()
+        progress = []
+        results = process_packshots(packshots, remove_bg=True, enhance=True, engine="border", cache=cache,
+                                    max_workers=3, progress=lambda done, total: progress.append((done, total)))
+        assert progress == [(1, 3), (2, 3), (3, 3)]
+        for (image, mask), packshot in zip(results, packshots):
+            expected, expected_mask = process_packshot(packshot, True, True, "border", cache=None)
+            assert image.tobytes() == expected.tobytes() and mask.tobytes() == expected_mask.tobytes()
+
+        # Finished packshots are cached; only new ones go to the workers
+        progress.clear()
+        extra = packshots[0].transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+        again = process_packshots(packshots + [extra], True, True, "border", cache=cache,
+                                  progress=lambda done, total: progress.append((done, total)))
+        assert all(new[0] is old[0] for new, old in zip(again, results))
+        assert progress == [(3, 4), (4, 4)] and cache.info()["hits"] == 3
+
+        # The spawned worker pool is long-lived and shared by later calls
+        pool = background_remover._packshot_pool
+        assert pool is not None
+        process_packshots(packshots[:2], True, False, "border", cache=None, max_workers=2)
+        assert background_remover._packshot_pool is pool
+
+        # Packshots over the tile budget are tiled in this process instead of shipped to workers
+        def no_pool():
+            raise AssertionError("over-budget packshot sent to the worker pool")
+        get_pool, background_remover._get_packshot_pool = background_remover._get_packshot_pool, no_pool
+        try:
+            tiled = process_packshots(packshots, True, True, "border", max_bytes=200_000, cache=None, max_workers=3)
+        finally:
+            background_remover._get_packshot_pool = get_pool
+        for (image, _), packshot in zip(tiled, packshots):
+            expected, _ = process_packshot(packshot, True, True, "border", max_bytes=200_000, cache=None)
+            assert image.tobytes() == expected.tobytes()
+
+        print("✅ Parallel packshot pipeline tests passed!")
+    
     def test_ai_suggestor(self):
         """Test AI creative suggestor"""
         # Test template loading
@@ -117,7 +866,32 @@ def run_all_tests():
     try:
         test_suite.test_comprehensive_sensitive_content_detection()
         test_suite.test_compliance_engine_hard_fail_rules()
+        test_suite.test_forbidden_term_matcher()
+        test_suite.test_category_pattern_bundle()
+        test_suite.test_text_match_spans()
+        test_suite.test_violation_records()
+        test_suite.test_incremental_text_checker()
+        test_suite.test_batch_text_compliance()
+        test_suite.test_verdict_cache()
+        test_suite.test_compiled_rule_artifact()
+        test_suite.test_full_campaign_audit()
+        test_suite.test_violation_log()
         test_suite.test_value_tile_generation_appendix_a()
+        test_suite.test_font_registry()
+        test_suite.test_parallel_format_rendering()
+        test_suite.test_packshot_resize_cache()
+        test_suite.test_layered_compositor()
+        test_suite.test_preview_scale()
+        test_suite.test_scene_layout_and_geometry_audit()
+        test_suite.test_budgeted_export_encoder()
+        test_suite.test_encoded_artifact_cache()
+        test_suite.test_zip_bundle_export()
+        test_suite.test_session_artifact_store()
+        test_suite.test_vectorized_background_removal()
+        test_suite.test_border_seeded_segmentation()
+        test_suite.test_tiled_packshot_processing()
+        test_suite.test_processed_packshot_cache()
+        test_suite.test_parallel_packshot_pipeline()
         test_suite.test_ai_suggestor()
         
         print("\n🎉 All tests passed! The system now detects ALL types of sensitive content and claims.")
@@ -1,5 +1,6 @@
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import random
+from font_registry import get_font
 
 def generate_value_tile(tile_type, price_data, dimensions=(300, 100)):
     """Generate 100% compliant value tiles based on EXACT Appendix A specifications"""
@@ -20,14 +21,9 @@ def create_clubcard_tile(price_data, width, height):
     tile = Image.new('RGBA', (width, height), (0, 83, 159, 255))
     draw = ImageDraw.Draw(tile)
     
-    try:
-        price_font = ImageFont.truetype("Arial", 28)
-        label_font = ImageFont.truetype("Arial", 16)
-        was_font = ImageFont.truetype("Arial", 14)
-    except:
-        price_font = ImageFont.load_default()
-        label_font = ImageFont.load_default()
-        was_font = ImageFont.load_default()
+    price_font = get_font(28)
+    label_font = get_font(16)
+    was_font = get_font(14)
     
     # Clubcard price (main emphasis) - Appendix A: only offer price and regular price editable
     clubcard_price = price_data.get('clubcard_price', '£3.50')
@@ -68,12 +64,8 @@ def create_lep_tile(price_data, width, height):
     # Blue border - trade-style design
     draw.rectangle([0, 0, width-1, height-1], outline=(0, 83, 159), width=2)
     
-    try:
-        price_font = ImageFont.truetype("Arial", 26)
-        label_font = ImageFont.truetype("Arial", 14)
-    except:
-        price_font = ImageFont.load_default()
-        label_font = ImageFont.load_default()
+    price_font = get_font(26)
+    label_font = get_font(14)
     
     # LEP price - Appendix A: only the price can be edited
     lep_price = price_data.get('lep_price', '£2.99')
@@ -97,10 +89,7 @@ def create_new_tile(width, height):
     tile = Image.new('RGBA', (width, height), (34, 139, 34, 255))
     draw = ImageDraw.Draw(tile)
     
-    try:
-        font = ImageFont.truetype("Arial", 32)
-    except:
-        font = ImageFont.load_default()
+    font = get_font(32)
     
     text = "NEW"
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -117,10 +106,7 @@ def create_default_tile(width, height):
     tile = Image.new('RGBA', (width, height), (200, 200, 200, 255))
     draw = ImageDraw.Draw(tile)
     
-    try:
-        font = ImageFont.truetype("Arial", 20)
-    except:
-        font = ImageFont.load_default()
+    font = get_font(20)
     
     text = "VALUE"
     bbox = draw.textbbox((0, 0), text, font=font)
@@ -0,0 +1,174 @@
+import atexit
+import os
+import sqlite3
+import threading
+from collections import Counter, deque
+from datetime import datetime
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS violations (
+    id INTEGER PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    format TEXT,
+    product_category TEXT,
+    rule TEXT NOT NULL,
+    category TEXT NOT NULL,
+    rule_id INTEGER,
+    rules_version TEXT,
+    severity INTEGER,
+    detail TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations (timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_rule ON violations (rule, timestamp);
+CREATE INDEX IF NOT EXISTS idx_violations_category ON violations (category, timestamp);
+CREATE TABLE IF NOT EXISTS rule_rollups (
+    rule TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL
+);
+"""
+
+
+class ViolationLog:
+    """Bounded log of recent violation events, backed by a batched append-only SQLite store
+
+    Each violation row is (rule, category, rule_id, severity, detail), where rule is a
+    name that stays stable across rule-set versions. Per-rule and per-category
+    counters are kept in memory and mirrored in a rollup table written in the same
+    transaction as the rows, so analytics never scan the raw history. With no path
+    the log is memory-only.
+    """
+
+    def __init__(self, path=None, capacity=1000, batch_size=100):
+        self.path = path
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.recent = deque(maxlen=capacity)
+        self.rule_counts = Counter()
+        self.category_counts = Counter()
+        self._rule_categories = {}
+        self._pending = []
+        self._connection = None
+        self._exit_flush = False
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            self._load_rollups()
+
+    def __getstate__(self):
+        # The store, connection and history stay with the owning process
+        return {"capacity": self.capacity, "batch_size": self.batch_size}
+
+    def __setstate__(self, state):
+        self.__init__(None, state["capacity"], state["batch_size"])
+
+    def record(self, format_name, product_category, rows, rules_version=None, timestamp=None):
+        """Log one event's violation rows, flushing to disk once a batch has accumulated"""
+        event = {
+            "timestamp": timestamp or datetime.now().isoformat(),
+            "format": format_name,
+            "product_category": product_category,
+            "violations": [tuple(row) for row in rows]
+        }
+        with self._lock:
+            self.recent.append(event)
+            for rule, category, rule_id, severity, detail in event["violations"]:
+                self.rule_counts[rule] += 1
+                self.category_counts[category] += 1
+                self._rule_categories[rule] = category
+                if self.path:
+                    self._pending.append((event["timestamp"], format_name, product_category, rule,
+                                          category, rule_id, rules_version, severity, detail))
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+        return event
+
+    def flush(self):
+        """Write pending rows and rollup increments to the store in one transaction"""
+        with self._lock:
+            if not self.path or not self._pending:
+                return
+            rows, self._pending = self._pending, []
+            increments = Counter(row[3] for row in rows)
+            try:
+                connection = self._connect()
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO violations (timestamp, format, product_category, rule, category, "
+                        "rule_id, rules_version, severity, detail) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    connection.executemany(
+                        "INSERT INTO rule_rollups (rule, category, count) VALUES (?, ?, ?) "
+                        "ON CONFLICT (rule) DO UPDATE SET count = count + excluded.count",
+                        [(rule, self._rule_categories[rule], count) for rule, count in increments.items()])
+            except sqlite3.Error as e:
+                # The store is best-effort: rows are kept for the next flush, up to capacity
+                print(f"Violation log write error: {e}")
+                self._pending[:0] = rows
+                del self._pending[:-max(self.capacity, self.batch_size)]
+
+    def query(self, since=None, until=None, rule=None, category=None, limit=100):
+        """Return stored violation rows (newest first) filtered on the indexed columns"""
+        self.flush()
+        if not self.path:
+            return []
+        clauses = []
+        params = []
+        for clause, value in (("timestamp >= ?", since), ("timestamp < ?", until),
+                              ("rule = ?", rule), ("category = ?", category)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        with self._lock:
+            cursor = self._connect().execute(
+                "SELECT timestamp, format, product_category, rule, category, rule_id, rules_version, "
+                f"severity, detail FROM violations {where}ORDER BY timestamp DESC LIMIT ?", params + [limit])
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def summary(self, top=10):
+        """Return running totals and the most frequent rules and categories"""
+        with self._lock:
+            return {
+                "events_in_memory": len(self.recent),
+                "total_violations": sum(self.rule_counts.values()),
+                "by_rule": self.rule_counts.most_common(top),
+                "by_category": self.category_counts.most_common(top),
+                "pending_writes": len(self._pending)
+            }
+
+    def close(self):
+        """Flush pending rows and close the store"""
+        self.flush()
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            if self._exit_flush:
+                atexit.unregister(self.flush)
+                self._exit_flush = False
+
+    def _connect(self):
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Streamlit sessions share the engine across threads; access is serialised by _lock
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.executescript(_SCHEMA)
+            if not self._exit_flush:
+                # Once per log, however often it reconnects; close() removes it again
+                atexit.register(self.flush)
+                self._exit_flush = True
+        return self._connection
+
+    def _load_rollups(self):
+        try:
+            with self._lock:
+                for rule, category, count in self._connect().execute(
+                        "SELECT rule, category, count FROM rule_rollups"):
+                    self.rule_counts[rule] += count
+                    self.category_counts[category] += count
+                    self._rule_categories[rule] = category
+        except sqlite3.Error as e:
+            print(f"Violation log read error: {e}")
@@ -0,0 +1,44 @@
+SEVERITY_WARNING = 1
+SEVERITY_HARD_FAIL = 2
+
+
+class Violation:
+    """Compact record of one rule hit, rendered to text from the engine's rule catalog on display
+
+    field/start/end locate text hits in the caller's headline or subhead; detail
+    fills the {detail} placeholder of parameterised rule messages. rule_id indexes
+    the catalog named by catalog_version; the engine refuses to resolve a record
+    against any other catalog.
+    """
+
+    __slots__ = ("rule_id", "severity", "field", "start", "end", "detail", "catalog_version")
+
+    def __init__(self, rule_id, severity=SEVERITY_HARD_FAIL, field=None, start=None, end=None, detail=None,
+                 catalog_version=None):
+        self.rule_id = rule_id
+        self.severity = severity
+        self.field = field
+        self.start = start
+        self.end = end
+        self.detail = detail
+        self.catalog_version = catalog_version
+
+    @property
+    def span(self):
+        return None if self.field is None else (self.field, self.start, self.end)
+
+    @property
+    def is_hard_fail(self):
+        return self.severity >= SEVERITY_HARD_FAIL
+
+    def _key(self):
+        return (self.rule_id, self.severity, self.field, self.start, self.end, self.detail, self.catalog_version)
+
+    def __eq__(self, other):
+        return isinstance(other, Violation) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return f"Violation(rule_id={self.rule_id}, severity={self.severity}, span={self.span}, detail={self.detail!r})"